@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Blockchain Offload Benchmark
+Measures /api/destinations latency while the submission queue works through
+certificate mints.
+
+Run against a live server:
+    BENCH_TOKEN=<jwt> BENCH_BOOKING_IDS=<id1,id2,...> python benchmark_blockchain_offload.py
+
+Each booking id must be a completed booking of the token's user without a
+certificate. The mint endpoint only queues a job and returns, so the load
+phase queues every mint up front and then samples /destinations while the
+background worker signs, sends and polls receipts for them. Without booking
+ids there is no RPC work to generate (/api/blockchain/status is served from
+the gas oracle and cached network info), so only the baseline runs.
+"""
+
+import os
+import time
+import asyncio
+import statistics
+
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000/api")
+TOKEN = os.getenv("BENCH_TOKEN", "")
+BOOKING_IDS = [b for b in os.getenv("BENCH_BOOKING_IDS", "").split(",") if b]
+DURATION_SECONDS = float(os.getenv("BENCH_DURATION", 10))
+READ_CONCURRENCY = int(os.getenv("BENCH_READERS", 10))
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+async def read_destinations(client, deadline, samples):
+    """Hit /destinations in a loop and record latency in milliseconds"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(f"{BASE_URL}/destinations")
+        if response.status_code == 200:
+            samples.append((time.perf_counter() - started) * 1000)
+
+async def queue_mints(client, counters):
+    """Queue a certificate mint for every benchmark booking"""
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    for booking_id in BOOKING_IDS:
+        response = await client.post(
+            f"{BASE_URL}/blockchain/certificates/mint",
+            json={"booking_id": booking_id, "destination_name": "Benchmark"},
+            headers=headers,
+        )
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+
+async def run_phase(label, with_mints):
+    samples = []
+    counters = {}
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        if with_mints:
+            await queue_mints(client, counters)
+        deadline = time.perf_counter() + DURATION_SECONDS
+        await asyncio.gather(*[read_destinations(client, deadline, samples) for _ in range(READ_CONCURRENCY)])
+
+    print(f"\n📊 {label}")
+    print(f"Requests: {len(samples)}")
+    if samples:
+        print(f"p50: {statistics.median(samples):.1f} ms")
+        print(f"p95: {percentile(samples, 95):.1f} ms")
+        print(f"p99: {percentile(samples, 99):.1f} ms")
+        print(f"max: {max(samples):.1f} ms")
+    if with_mints:
+        print(f"Mint requests by status: {counters}")
+    return percentile(samples, 99)
+
+async def main():
+    print("🔗 Blockchain Offload Benchmark")
+    print("=" * 50)
+    print(f"Target: {BASE_URL}")
+    print(f"Duration per phase: {DURATION_SECONDS}s, readers: {READ_CONCURRENCY}, mints: {len(BOOKING_IDS)}")
+
+    baseline_p99 = await run_phase("Baseline (no blockchain load)", with_mints=False)
+    if not BOOKING_IDS:
+        print("\n⚠️  BENCH_BOOKING_IDS not set, skipping the mint phase")
+        return
+    loaded_p99 = await run_phase("With queued mints being submitted", with_mints=True)
+
+    print("\n" + "=" * 50)
+    print(f"🎯 p99 baseline: {baseline_p99:.1f} ms, under mint load: {loaded_p99:.1f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""
+Booking Throughput Benchmark
+Measures POST /api/bookings throughput and latency at increasing concurrency.
+
+Run against a live server (this creates real pending bookings):
+    BENCH_TOKEN=<jwt> BENCH_PROVIDER_ID=<id> BENCH_DESTINATION_ID=<id> python benchmark_booking_throughput.py
+
+Set BENCH_BLOCKCHAIN=1 to exercise the loyalty path as well. Compare a run
+against the single-transaction pipeline with one against the previous
+autocommit build to see the effect of committing once per booking.
+"""
+
+import os
+import time
+import random
+import asyncio
+import statistics
+
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000/api")
+TOKEN = os.getenv("BENCH_TOKEN", "")
+PROVIDER_ID = os.getenv("BENCH_PROVIDER_ID", "")
+DESTINATION_ID = os.getenv("BENCH_DESTINATION_ID", "")
+BLOCKCHAIN = os.getenv("BENCH_BLOCKCHAIN", "0") == "1"
+DURATION_SECONDS = float(os.getenv("BENCH_DURATION", 10))
+CONCURRENCY_LEVELS = [int(c) for c in os.getenv("BENCH_CONCURRENCY", "1,5,10,25").split(",")]
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+def booking_payload():
+    return {
+        "provider_id": PROVIDER_ID,
+        "destination_id": DESTINATION_ID,
+        "booking_date": "2030-01-01",
+        "check_in": "2030-01-10",
+        "check_out": "2030-01-12",
+        "guests": 2,
+        "rooms": 1,
+        "calculated_price": 5000,
+        "booking_full_name": "Benchmark User",
+        "booking_email": "benchmark@example.com",
+        "booking_phone": "9000000000",
+        "reference_number": f"JH{random.randint(100000, 999999)}",
+        "blockchain_verification": BLOCKCHAIN,
+    }
+
+async def create_bookings(client, deadline, samples, counters):
+    """Create bookings in a loop and record latency in milliseconds"""
+    headers = {"Authorization": f"Bearer {TOKEN}"}
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post(f"{BASE_URL}/bookings", json=booking_payload(), headers=headers)
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            samples.append((time.perf_counter() - started) * 1000)
+
+async def run_level(concurrency):
+    samples = []
+    counters = {}
+    deadline = time.perf_counter() + DURATION_SECONDS
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        await asyncio.gather(*[create_bookings(client, deadline, samples, counters) for _ in range(concurrency)])
+
+    throughput = len(samples) / DURATION_SECONDS
+    print(f"\n📊 Concurrency {concurrency}")
+    print(f"Bookings: {len(samples)} ({throughput:.1f}/s)")
+    if samples:
+        print(f"p50: {statistics.median(samples):.1f} ms")
+        print(f"p95: {percentile(samples, 95):.1f} ms")
+        print(f"p99: {percentile(samples, 99):.1f} ms")
+    print(f"Responses by status: {counters}")
+    return throughput
+
+async def main():
+    print("🧾 Booking Throughput Benchmark")
+    print("=" * 50)
+    print(f"Target: {BASE_URL}")
+    print(f"Duration per level: {DURATION_SECONDS}s, concurrency levels: {CONCURRENCY_LEVELS}")
+
+    if not TOKEN or not PROVIDER_ID or not DESTINATION_ID:
+        print("❌ Set BENCH_TOKEN, BENCH_PROVIDER_ID and BENCH_DESTINATION_ID")
+        return
+
+    results = {level: await run_level(level) for level in CONCURRENCY_LEVELS}
+
+    print("\n" + "=" * 50)
+    print("🎯 Throughput: " + ", ".join(f"{level}x → {rate:.1f}/s" for level, rate in results.items()))
+
+if __name__ == "__main__":
+    asyncio.run(main())
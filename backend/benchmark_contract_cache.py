@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Contract Cache Micro-Benchmark
+Measures the per-call overhead of preparing contract calldata, without any RPC.
+
+    python benchmark_contract_cache.py
+
+"Before" rebuilds the ABI list and the web3 contract object and encodes through
+ContractFunction on every call, as the service did. "After" goes through
+BlockchainService.get_contract(), which reuses the cached contract and its
+precomputed selectors.
+"""
+
+import os
+import copy
+import timeit
+
+os.environ.setdefault("CONTRACT_ADDRESS_CERTIFICATES", "0x" + "12" * 20)
+os.environ.setdefault("CONTRACT_ADDRESS_BOOKING", "0x" + "34" * 20)
+
+from web3 import Web3
+
+from services.blockchain_service import blockchain_service, CERTIFICATE_ABI, BOOKING_ABI
+
+ITERATIONS = int(os.getenv("BENCH_ITERATIONS", 2000))
+WALLET = Web3.to_checksum_address("0x" + "ab" * 20)
+
+def mint_before():
+    contract = blockchain_service.w3.eth.contract(
+        address=blockchain_service.contracts['certificates'],
+        abi=copy.deepcopy(CERTIFICATE_ABI)
+    )
+    return contract.encodeABI(fn_name='mintCertificate', args=[WALLET, 'Netarhat', '2025-01-01'])
+
+def mint_after():
+    return blockchain_service.get_contract('certificates').encode(
+        'mintCertificate', WALLET, 'Netarhat', '2025-01-01'
+    ).data
+
+def verify_before():
+    contract = blockchain_service.w3.eth.contract(
+        address=blockchain_service.contracts['booking'],
+        abi=copy.deepcopy(BOOKING_ABI)
+    )
+    return contract.encodeABI(
+        fn_name='verifyBooking',
+        args=[WALLET, WALLET, 'Netarhat', 250000, 1735689600, 'booking_bench']
+    )
+
+def verify_after():
+    return blockchain_service.get_contract('booking').encode(
+        'verifyBooking', WALLET, WALLET, 'Netarhat', 250000, 1735689600, 'booking_bench'
+    ).data
+
+def per_call_us(func):
+    best = min(timeit.repeat(func, number=ITERATIONS, repeat=5))
+    return best / ITERATIONS * 1_000_000
+
+def main():
+    print("⚙️  Contract Cache Micro-Benchmark")
+    print("=" * 50)
+    print(f"Iterations per run: {ITERATIONS} (best of 5)")
+
+    assert mint_before() == mint_after(), "mintCertificate calldata differs"
+    assert verify_before() == verify_after(), "verifyBooking calldata differs"
+
+    for label, before, after in (
+        ("mintCertificate", mint_before, mint_after),
+        ("verifyBooking", verify_before, verify_after),
+    ):
+        before_us = per_call_us(before)
+        after_us = per_call_us(after)
+        print(f"\n📊 {label}")
+        print(f"before: {before_us:.1f} µs/call")
+        print(f"after:  {after_us:.1f} µs/call")
+        print(f"speedup: {before_us / after_us:.1f}x")
+
+if __name__ == "__main__":
+    main()
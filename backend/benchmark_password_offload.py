@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Password Hashing Offload Benchmark
+Measures login throughput and /api/destinations latency during a login burst.
+
+Run against a live server:
+    BENCH_EMAIL=<email> BENCH_PASSWORD=<password> python benchmark_password_offload.py
+
+Compare runs with PASSWORD_HASH_EXECUTOR=process (default) and =thread, or
+against a build that hashes inline, to see how much each login stalls reads.
+Logins refused with 503 are the pool shedding load past PASSWORD_MAX_PENDING.
+"""
+
+import os
+import time
+import asyncio
+import statistics
+
+import httpx
+
+BASE_URL = os.getenv("BASE_URL", "http://localhost:8000/api")
+EMAIL = os.getenv("BENCH_EMAIL", "")
+PASSWORD = os.getenv("BENCH_PASSWORD", "")
+DURATION_SECONDS = float(os.getenv("BENCH_DURATION", 10))
+READ_CONCURRENCY = int(os.getenv("BENCH_READERS", 10))
+LOGIN_CONCURRENCY = int(os.getenv("BENCH_LOGINS", 20))
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples"""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    index = max(0, int(round(pct / 100 * len(ordered))) - 1)
+    return ordered[index]
+
+async def read_destinations(client, deadline, samples):
+    """Hit /destinations in a loop and record latency in milliseconds"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.get(f"{BASE_URL}/destinations")
+        if response.status_code == 200:
+            samples.append((time.perf_counter() - started) * 1000)
+
+async def login_burst(client, deadline, login_samples, counters):
+    """Keep logins in flight until the deadline"""
+    while time.perf_counter() < deadline:
+        started = time.perf_counter()
+        response = await client.post(
+            f"{BASE_URL}/auth/login",
+            json={"email": EMAIL, "password": PASSWORD},
+        )
+        counters[response.status_code] = counters.get(response.status_code, 0) + 1
+        if response.status_code == 200:
+            login_samples.append((time.perf_counter() - started) * 1000)
+        elif response.status_code == 503:
+            # Honour Retry-After lightly so shed logins don't turn into a busy loop
+            await asyncio.sleep(0.1)
+
+def report(label, samples):
+    print(f"{label}: {len(samples)} requests")
+    if samples:
+        print(f"  p50: {statistics.median(samples):.1f} ms")
+        print(f"  p95: {percentile(samples, 95):.1f} ms")
+        print(f"  p99: {percentile(samples, 99):.1f} ms")
+        print(f"  max: {max(samples):.1f} ms")
+
+async def run_phase(label, with_logins):
+    read_samples = []
+    login_samples = []
+    counters = {}
+    deadline = time.perf_counter() + DURATION_SECONDS
+
+    async with httpx.AsyncClient(timeout=120) as client:
+        tasks = [read_destinations(client, deadline, read_samples) for _ in range(READ_CONCURRENCY)]
+        if with_logins:
+            tasks += [login_burst(client, deadline, login_samples, counters) for _ in range(LOGIN_CONCURRENCY)]
+        await asyncio.gather(*tasks)
+
+    print(f"\n📊 {label}")
+    report("Reads", read_samples)
+    if with_logins:
+        report("Successful logins", login_samples)
+        print(f"Login throughput: {len(login_samples) / DURATION_SECONDS:.1f} logins/s")
+        print(f"Login responses by status: {counters}")
+    return percentile(read_samples, 99)
+
+async def main():
+    print("🔐 Password Hashing Offload Benchmark")
+    print("=" * 50)
+    print(f"Target: {BASE_URL}")
+    print(f"Duration per phase: {DURATION_SECONDS}s, readers: {READ_CONCURRENCY}, logins: {LOGIN_CONCURRENCY}")
+
+    if not EMAIL or not PASSWORD:
+        print("❌ Set BENCH_EMAIL and BENCH_PASSWORD to an existing account")
+        return
+
+    baseline_p99 = await run_phase("Baseline (no logins)", with_logins=False)
+    loaded_p99 = await run_phase("With login burst", with_logins=True)
+
+    print("\n" + "=" * 50)
+    print(f"🎯 Read p99 baseline: {baseline_p99:.1f} ms, during login burst: {loaded_p99:.1f} ms")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -35,6 +35,8 @@ CREATE TABLE IF NOT EXISTS `handicrafts` (
   KEY `idx_handicrafts_price` (`price`),
   KEY `idx_handicrafts_featured` (`is_featured`),
   KEY `idx_handicrafts_available` (`is_available`),
+  KEY `idx_handicrafts_listing` (`is_available`, `is_featured`, `created_at`, `id`),
+  FULLTEXT KEY `ft_handicrafts_search` (`name`, `description`, `materials`),
   CONSTRAINT `handicrafts_ibfk_1` FOREIGN KEY (`seller_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -139,6 +141,9 @@ CREATE TABLE IF NOT EXISTS `cultural_events` (
   KEY `idx_events_location` (`location`),
   KEY `idx_events_featured` (`is_featured`),
   KEY `idx_events_active` (`is_active`),
+  KEY `idx_events_listing` (`is_active`, `is_featured` DESC, `start_date`, `id`),
+  FULLTEXT KEY `ft_events_search` (`title`, `description`, `location`),
+  FULLTEXT KEY `ft_events_location` (`location`),
   CONSTRAINT `cultural_events_ibfk_1` FOREIGN KEY (`organizer_id`) REFERENCES `users` (`id`) ON DELETE CASCADE
 ) ENGINE=InnoDB DEFAULT CHARSET=utf8mb4 COLLATE=utf8mb4_0900_ai_ci;
 
@@ -15,6 +15,8 @@ from models.marketplace_models_updated import (
     MarketplaceResponse, PaginatedResponse,
     HandicraftCategory, EventType, OrderStatus, PaymentStatus
 )
+from services.marketplace_search import invalidate_listing_counts
+from services.dashboard_service import seller_dashboards
 """
 
 # Add these endpoints to server.py after the existing provider endpoints
@@ -29,61 +31,35 @@ async def get_provider_marketplace_dashboard(current_user: dict = Depends(get_cu
     try:
         async with get_db_connection() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Get provider's marketplace stats
-                await cur.execute("""
-                    SELECT 
-                        COALESCE(COUNT(DISTINCT h.id), 0) as total_handicrafts,
-                        COALESCE(COUNT(DISTINCT e.id), 0) as total_events,
-                        COALESCE(COUNT(DISTINCT ho.id), 0) as total_orders,
-                        COALESCE(COUNT(DISTINCT eb.id), 0) as total_bookings,
-                        COALESCE(SUM(CASE WHEN ho.status = 'delivered' AND MONTH(ho.delivered_at) = MONTH(NOW()) THEN ho.total_price ELSE 0 END), 0) as monthly_sales,
-                        COALESCE(AVG(h.rating), 0) as avg_handicraft_rating,
-                        COALESCE(AVG(e.rating), 0) as avg_event_rating,
-                        COALESCE(SUM(h.total_reviews), 0) + COALESCE(SUM(e.total_reviews), 0) as total_reviews,
-                        COALESCE(COUNT(CASE WHEN ho.status IN ('pending', 'confirmed') THEN 1 END), 0) as pending_orders,
-                        COALESCE(COUNT(CASE WHEN h.stock_quantity <= 5 AND h.stock_quantity > 0 THEN 1 END), 0) as low_stock_items
-                    FROM users u
-                    LEFT JOIN handicrafts h ON u.id = h.seller_id AND h.is_available = 1
-                    LEFT JOIN cultural_events e ON u.id = e.organizer_id AND e.is_active = 1
-                    LEFT JOIN handicraft_orders ho ON u.id = ho.seller_id
-                    LEFT JOIN event_bookings eb ON u.id = eb.organizer_id
-                    WHERE u.id = %s AND u.role = 'provider'
-                """, (current_user['id'],))
-                
-                stats = await cur.fetchone()
+                # Stats come from the seller's snapshot row (single primary-key read)
+                snapshot = await seller_dashboards.get(cur, current_user['id'])
+                handicrafts_stats = snapshot['handicrafts_stats']
+                events_stats = snapshot['events_stats']
+                orders_stats = snapshot['orders_stats']
+                stats = {
+                    "total_handicrafts": handicrafts_stats['active_products'],
+                    "total_events": events_stats['active_events'],
+                    "total_orders": orders_stats['all_orders'],
+                    "total_bookings": snapshot['bookings_stats']['total_bookings'],
+                    "monthly_sales": orders_stats['monthly_sales'],
+                    "avg_handicraft_rating": handicrafts_stats['avg_rating'],
+                    "avg_event_rating": events_stats['avg_rating'],
+                    "total_reviews": float(handicrafts_stats['total_reviews']) + float(events_stats['total_reviews']),
+                    "pending_orders": orders_stats['open_orders'],
+                    "low_stock_items": handicrafts_stats['low_stock_items']
+                }
                 
                 # Get recent notifications
                 await cur.execute("""
                     SELECT * FROM marketplace_notifications 
-                    WHERE user_id = %s AND expires_at > NOW() OR expires_at IS NULL
+                    WHERE user_id = %s AND (expires_at > NOW() OR expires_at IS NULL)
                     ORDER BY created_at DESC LIMIT 10
                 """, (current_user['id'],))
                 
                 notifications = await cur.fetchall()
                 
-                # Get recent orders
-                await cur.execute("""
-                    SELECT ho.*, h.name as handicraft_name, u.name as buyer_name
-                    FROM handicraft_orders ho
-                    JOIN handicrafts h ON ho.handicraft_id = h.id
-                    JOIN users u ON ho.user_id = u.id
-                    WHERE ho.seller_id = %s
-                    ORDER BY ho.created_at DESC LIMIT 5
-                """, (current_user['id'],))
-                
-                recent_orders = await cur.fetchall()
-                
-                # Get recent event bookings
-                await cur.execute("""
-                    SELECT eb.*, e.title as event_title, u.name as participant_name
-                    FROM event_bookings eb
-                    JOIN cultural_events e ON eb.event_id = e.id
-                    JOIN users u ON eb.user_id = u.id
-                    WHERE eb.organizer_id = %s
-                    ORDER BY eb.created_at DESC LIMIT 5
-                """, (current_user['id'],))
-                
-                recent_bookings = await cur.fetchall()
+                recent_orders = snapshot['recent_orders']
+                recent_bookings = snapshot['recent_bookings']
                 
                 return {
                     "success": True,
@@ -91,7 +67,8 @@ async def get_provider_marketplace_dashboard(current_user: dict = Depends(get_cu
                         "stats": stats,
                         "notifications": notifications,
                         "recent_orders": recent_orders,
-                        "recent_bookings": recent_bookings
+                        "recent_bookings": recent_bookings,
+                        "snapshot_at": snapshot['snapshot_at']
                     }
                 }
     
@@ -215,6 +192,8 @@ async def create_handicraft(
                     json.dumps(handicraft_data.tags) if handicraft_data.tags else None,
                     handicraft_data.is_featured
                 ))
+                invalidate_listing_counts('handicrafts')
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 await conn.commit()
                 
@@ -328,6 +307,8 @@ async def create_event(
                     json.dumps(event_data.tags) if event_data.tags else None,
                     event_data.is_featured
                 ))
+                invalidate_listing_counts('cultural_events')
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 await conn.commit()
                 
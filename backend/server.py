@@ -1,19 +1,35 @@
-from fastapi import FastAPI, APIRouter, HTTPException, Depends, status
+from fastapi import FastAPI, APIRouter, HTTPException, Depends, Query, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from dotenv import load_dotenv
 from pydantic import BaseModel, Field, EmailStr, field_validator, model_validator
 from typing import List, Optional, Dict, Any
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
-import bcrypt
 from jose import jwt, JWTError
 import json
 import uuid
 from pathlib import Path
-from services.gemini_service import GeminiService
+from services.gemini_service import GeminiService, FallbackReply, CHAT_MODEL
 from models.blockchain_models import BlockchainStatus
 from services.blockchain_service import blockchain_service
+from services.cache_service import user_cache
+from services.stats_service import admin_stats_service
+from services.rating_service import rating_aggregates
+from services.marketplace_search import ensure_search_indexes
+from services.dashboard_service import seller_dashboards
+from services.catalog_service import destination_catalog
+from services.itinerary_cache import itinerary_cache, itinerary_cache_key
+from services.conversation_service import conversation_contexts
+from services.llm_guard import llm_guard
+from services.password_service import password_hasher, PasswordHasherBusy
+from services.token_service import token_revocations, token_claims, load_provider_ids
+from services.write_behind import chat_log_writer, itinerary_writer
+from services.pagination import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE, keyset_condition, page_of
+from services.export_service import EXPORT_FORMATS, stream_query
+from services.db_pool import create_db_pool
+from services.request_db import RequestConnection
 import aiomysql
 
 ROOT_DIR = Path(__file__).parent
@@ -38,7 +54,7 @@ JWT_EXPIRE_MINUTES = int(os.getenv('JWT_EXPIRE_MINUTES', 1440))
 app = FastAPI(title="Jharkhand Tourism API", version="1.0.0")
 @app.get("/api/blockchain/status", response_model=BlockchainStatus)
 async def blockchain_status():
-    info = blockchain_service.get_network_info()  # Returns dict with keys: connected, network, chain_id, etc.
+    info = await blockchain_service.get_network_info()  # Returns dict with keys: connected, network, chain_id, etc.
 
     # Ensure 'contracts' key exists for Pydantic validation
     contracts_dict = info.get("contracts") or {}
@@ -74,13 +90,28 @@ db_pool = None
 
 async def init_db():
     global db_pool
-    db_pool = await aiomysql.create_pool(**DB_CONFIG)
+    db_pool = await create_db_pool(**DB_CONFIG)
 
 async def get_db():
     if not db_pool:
         await init_db()
     return db_pool
 
+async def get_request_db():
+    """Dependency lending the request one pooled connection at a time; auth and handler share it"""
+    db = RequestConnection(get_db)
+    try:
+        yield db
+    except Exception:
+        await db.close(commit=False)
+        raise
+    await db.close(commit=True)
+
+async def get_request_transaction(db: RequestConnection = Depends(get_request_db)):
+    """Like get_request_db, with a transaction open for the whole request"""
+    await db.begin()
+    return db
+
 # Pydantic models
 class UserCreate(BaseModel):
     name: str
@@ -141,11 +172,26 @@ class Review(BaseModel):
 
 
 # Utility functions
-def hash_password(password: str) -> str:
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+def password_service_busy() -> HTTPException:
+    return HTTPException(
+        status_code=503,
+        detail="Too many sign-in attempts in progress, please retry shortly",
+        headers={"Retry-After": "1"}
+    )
 
-def verify_password(password: str, hashed: str) -> bool:
-    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+async def hash_password(password: str) -> str:
+    """bcrypt hash computed on the password worker pool"""
+    try:
+        return await password_hasher.hash(password)
+    except PasswordHasherBusy:
+        raise password_service_busy()
+
+async def verify_password(password: str, hashed: str) -> bool:
+    """bcrypt check computed on the password worker pool"""
+    try:
+        return await password_hasher.verify(password, hashed)
+    except PasswordHasherBusy:
+        raise password_service_busy()
 
 def create_access_token(data: dict):
     to_encode = data.copy()
@@ -154,25 +200,85 @@ def create_access_token(data: dict):
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)):
+def decode_access_token(token: str) -> dict:
+    """Verify a bearer token's signature, expiry and version; returns its payload"""
     try:
-        payload = jwt.decode(credentials.credentials, JWT_SECRET, algorithms=[JWT_ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        
-        pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
-                user_data = await cur.fetchone()
-                if user_data is None:
-                    raise HTTPException(status_code=401, detail="User not found")
-                return user_data
+        payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.JWTError:
         raise HTTPException(status_code=401, detail="Invalid token")
+    
+    user_id: str = payload.get("sub")
+    if user_id is None:
+        raise HTTPException(status_code=401, detail="Invalid authentication credentials")
+    if token_revocations.is_revoked(user_id, payload.get("ver", 0)):
+        raise HTTPException(status_code=401, detail="Token revoked")
+    return payload
+
+async def load_user(user_id: str, db: RequestConnection) -> dict:
+    """User row from the cache, or from the request's connection on a miss
+    
+    Unless the request already opened a transaction, the connection goes back
+    to the pool as soon as the lookup is done: handlers still on pool.acquire()
+    then hold one connection at a time instead of the auth one plus their own.
+    """
+    cached_user = user_cache.get(user_id)
+    if cached_user is not None:
+        return dict(cached_user)
+    
+    try:
+        async with db.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("SELECT * FROM users WHERE id = %s", (user_id,))
+                user_data = await cur.fetchone()
+    finally:
+        if not db.in_transaction:
+            await db.release()
+    if user_data is None:
+        raise HTTPException(status_code=401, detail="User not found")
+    user_cache.set(user_id, dict(user_data))
+    return user_data
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: RequestConnection = Depends(get_request_db)
+):
+    payload = decode_access_token(credentials.credentials)
+    return await load_user(payload["sub"], db)
+
+async def get_token_claims(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: RequestConnection = Depends(get_request_db)
+):
+    """Authorize from the signed token alone: id, role and owned provider ids, no database read
+    
+    Tokens issued before role claims existed fall back to the user row.
+    """
+    payload = decode_access_token(credentials.credentials)
+    if "role" not in payload:
+        user = await load_user(payload["sub"], db)
+        payload["role"] = user["role"]
+    return {
+        "id": payload["sub"],
+        "role": payload["role"],
+        "provider_ids": payload.get("pids", [])
+    }
+
+async def require_provider_owner(cur, claims: dict, provider_id: str,
+                                 detail: str = "Provider not found or access denied"):
+    """404 unless the caller owns the provider; the token's provider ids are checked before the database
+    
+    Providers created after the token was issued are not in its claims, so
+    those fall back to a lookup.
+    """
+    if provider_id in claims.get("provider_ids", []):
+        return
+    await cur.execute("SELECT user_id FROM providers WHERE id = %s", (provider_id,))
+    provider = await cur.fetchone()
+    owner_id = (provider['user_id'] if isinstance(provider, dict) else provider[0]) if provider else None
+    if owner_id != claims["id"]:
+        raise HTTPException(status_code=404, detail=detail)
 
 # API Routes
 @api_router.get("/")
@@ -190,9 +296,12 @@ async def register_user(user_data: UserCreate):
         if user_data.role not in ["tourist", "provider"]:
             raise HTTPException(status_code=400, detail="Invalid role. Only 'tourist' and 'provider' roles are allowed")
         
+        if password_hasher.saturated():
+            raise password_service_busy()
+        
         pool = await get_db()
         user_id = str(uuid.uuid4())
-        hashed_password = hash_password(user_data.password)
+        hashed_password = await hash_password(user_data.password)
         
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
@@ -206,9 +315,10 @@ async def register_user(user_data: UserCreate):
                     INSERT INTO users (id, name, email, password, role, phone)
                     VALUES (%s, %s, %s, %s, %s, %s)
                 """, (user_id, user_data.name, user_data.email, hashed_password, user_data.role, user_data.phone))
+                await admin_stats_service.record_user_registered(cur)
                 
                 # Create access token
-                access_token = create_access_token(data={"sub": user_id})
+                access_token = create_access_token(data=token_claims({"id": user_id, "role": user_data.role}))
                 
                 return {
                     "access_token": access_token,
@@ -229,17 +339,29 @@ async def register_user(user_data: UserCreate):
 @api_router.post("/auth/login")
 async def login_user(user_credentials: UserLogin):
     try:
+        # Shed the login before touching the database when bcrypt is backed up
+        if password_hasher.saturated():
+            raise password_service_busy()
+        
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 await cur.execute("SELECT * FROM users WHERE email = %s", (user_credentials.email,))
                 user_data = await cur.fetchone()
                 
-                if not user_data or not verify_password(user_credentials.password, user_data['password']):
+                if not user_data or not await verify_password(user_credentials.password, user_data['password']):
                     raise HTTPException(status_code=401, detail="Invalid credentials")
                 
-                # Create access token
-                access_token = create_access_token(data={"sub": user_data['id']})
+                # Upgrade hashes created with a lower BCRYPT_ROUNDS
+                try:
+                    if await password_hasher.upgrade(cur, user_data['id'], user_credentials.password, user_data['password']):
+                        user_cache.invalidate(user_data['id'])
+                except Exception as e:
+                    print(f"Error upgrading password hash: {str(e)}")
+                
+                # Role, token version and owned providers travel in the token
+                provider_ids = await load_provider_ids(cur, user_data['id']) if user_data['role'] == 'provider' else []
+                access_token = create_access_token(data=token_claims(user_data, provider_ids))
                 
                 return {
                     "access_token": access_token,
@@ -271,37 +393,8 @@ async def get_current_user_info(current_user: dict = Depends(get_current_user)):
 async def get_regions():
     """Get all regions in Jharkhand with user-friendly names"""
     try:
-        pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM regions ORDER BY name")
-                regions = await cur.fetchall()
-                
-                # Add user-friendly region mapping
-                region_mapping = {
-                    'kolhan': 'east',
-                    'north_chotanagpur': 'north', 
-                    'south_chotanagpur': 'south',
-                    'santhal_pargana': 'central',  # Keep as central for now, but user wanted east
-                    'palamu': 'west'
-                }
-                
-                # Parse JSON highlights and add user-friendly names
-                for region in regions:
-                    if region['highlights']:
-                        region['highlights'] = json.loads(region['highlights'])
-                    else:
-                        region['highlights'] = []
-                    
-                    # Add user-friendly region code
-                    region['region_code'] = region_mapping.get(region['id'], region['id'])
-                    
-                    # Override specific regions based on user request (central -> east)
-                    if region['id'] == 'santhal_pargana':
-                        region['region_code'] = 'east'  # User specifically requested east instead of central
-                        region['user_friendly_name'] = 'East Jharkhand'
-                
-                return regions
+        catalog = await destination_catalog.get(await get_db())
+        return catalog.regions
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -309,96 +402,21 @@ async def get_regions():
 async def get_destinations(category: Optional[str] = None, region: Optional[str] = None, limit: int = 50):
     """Get destinations with optional category and region filtering"""
     try:
-        pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Build query with filters
-                query = "SELECT * FROM destinations WHERE 1=1"
-                params = []
-                
-                if category:
-                    query += " AND category = %s"
-                    params.append(category)
-                
-                if region:
-                    # Create region mapping for better filtering - Updated per user request
-                    region_mapping = {
-                        # User-friendly names to database values (east instead of central as requested)
-                        'east': ['Santhal Pargana Division'],  # User requested east instead of central
-                        'west': ['Palamu Division'], 
-                        'north': ['North Chhotanagpur Division'],
-                        'south': ['South Chhotanagpur Division'],
-                        'central': ['Kolhan Division'],  # Move Kolhan to central
-                        # Handle variations and full names
-                        'kolhan': ['Kolhan Division'],
-                        'north_chotanagpur': ['North Chhotanagpur Division'],
-                        'south_chotanagpur': ['South Chhotanagpur Division'],
-                        'santhal_pargana': ['Santhal Pargana Division'],
-                        'palamu': ['Palamu Division'],
-                        # Direct matches
-                        'Kolhan Division': ['Kolhan Division'],
-                        'North Chhotanagpur Division': ['North Chhotanagpur Division'],
-                        'South Chhotanagpur Division': ['South Chhotanagpur Division'],
-                        'Santhal Pargana Division': ['Santhal Pargana Division'],
-                        'Palamu Division': ['Palamu Division']
-                    }
-                    
-                    region_lower = region.lower()
-                    matched_regions = None
-                    
-                    # Try to find a matching region
-                    for key, values in region_mapping.items():
-                        if key.lower() == region_lower or region.lower() in key.lower():
-                            matched_regions = values
-                            break
-                    
-                    if matched_regions:
-                        # Use the mapped region values
-                        placeholders = ', '.join(['%s'] * len(matched_regions))
-                        query += f" AND region IN ({placeholders})"
-                        params.extend(matched_regions)
-                    else:
-                        # Fallback: try direct match or LIKE match
-                        query += " AND (region = %s OR region LIKE %s)"
-                        params.append(region)
-                        params.append(f"%{region}%")
-                
-                query += " ORDER BY name LIMIT %s"
-                params.append(limit)
-                
-                await cur.execute(query, params)
-                destinations = await cur.fetchall()
-                
-                # Parse JSON highlights
-                for dest in destinations:
-                    if dest['highlights']:
-                        dest['highlights'] = json.loads(dest['highlights'])
-                    else:
-                        dest['highlights'] = []
-                
-                return destinations
+        catalog = await destination_catalog.get(await get_db())
+        return catalog.filter_destinations(category=category, region=region, limit=limit)
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/destinations/{destination_id}")
 async def get_destination_detail(destination_id: str):
     try:
-        pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM destinations WHERE id = %s", (destination_id,))
-                destination = await cur.fetchone()
-                
-                if not destination:
-                    raise HTTPException(status_code=404, detail="Destination not found")
-                
-                # Parse JSON highlights
-                if destination['highlights']:
-                    destination['highlights'] = json.loads(destination['highlights'])
-                else:
-                    destination['highlights'] = []
-                
-                return destination
+        catalog = await destination_catalog.get(await get_db())
+        destination = catalog.by_id.get(destination_id)
+        
+        if not destination:
+            raise HTTPException(status_code=404, detail="Destination not found")
+        
+        return destination
     except HTTPException:
         raise
     except Exception as e:
@@ -408,16 +426,8 @@ async def get_destination_detail(destination_id: str):
 async def get_destinations_for_dropdown():
     """Get simplified list of destinations for dropdown selection"""
     try:
-        pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT id, name, location 
-                    FROM destinations 
-                    ORDER BY name ASC
-                """)
-                destinations = await cur.fetchall()
-                return destinations
+        catalog = await destination_catalog.get(await get_db())
+        return catalog.dropdown
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -433,11 +443,9 @@ async def get_providers(category: Optional[str] = None, location: Optional[str]
                         SELECT p.*, 
                                d.name as destination_name,
                                d.location as destination_location,
-                               AVG(r.rating) as avg_rating,
-                               COUNT(r.id) as review_count
+                               IF(p.review_count > 0, p.rating_sum / p.review_count, NULL) as avg_rating
                         FROM providers p
                         LEFT JOIN destinations d ON p.destination_id = d.id
-                        LEFT JOIN reviews r ON p.id = r.provider_id
                         WHERE p.is_active = 1 AND p.destination_id = %s
                     """
                     params = [destination_id]
@@ -446,7 +454,7 @@ async def get_providers(category: Optional[str] = None, location: Optional[str]
                         query += " AND p.category = %s"
                         params.append(category)
                         
-                    query += " GROUP BY p.id ORDER BY avg_rating DESC, p.rating DESC LIMIT %s"
+                    query += " ORDER BY p.review_count > 0 DESC, p.rating DESC LIMIT %s"
                     params.append(limit)
                 else:
                     # Get all providers with optional filters
@@ -454,11 +462,9 @@ async def get_providers(category: Optional[str] = None, location: Optional[str]
                         SELECT p.*, 
                                d.name as destination_name,
                                d.location as destination_location,
-                               AVG(r.rating) as avg_rating,
-                               COUNT(r.id) as review_count
+                               IF(p.review_count > 0, p.rating_sum / p.review_count, NULL) as avg_rating
                         FROM providers p
                         LEFT JOIN destinations d ON p.destination_id = d.id
-                        LEFT JOIN reviews r ON p.id = r.provider_id
                         WHERE p.is_active = 1
                     """
                     params = []
@@ -471,7 +477,7 @@ async def get_providers(category: Optional[str] = None, location: Optional[str]
                         query += " AND (p.location LIKE %s OR d.location LIKE %s)"
                         params.extend([f"%{location}%", f"%{location}%"])
                     
-                    query += " GROUP BY p.id ORDER BY avg_rating DESC, p.rating DESC LIMIT %s"
+                    query += " ORDER BY p.review_count > 0 DESC, p.rating DESC LIMIT %s"
                     params.append(limit)
                 
                 await cur.execute(query, params)
@@ -519,7 +525,7 @@ async def get_reviews(destination_id: Optional[str] = None, provider_id: Optiona
 @api_router.post("/planner")
 async def generate_itinerary(
     request_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Generate AI-powered travel itinerary using Deepseek"""
     try:
@@ -533,36 +539,49 @@ async def generate_itinerary(
             "group_size": request_data.get("group_size", 2)
         }
         
-        # Generate itinerary using Gemini
-        itinerary = await gemini_service.generate_itinerary(preferences)
-        
-        # Optionally save to database
+        # Generate itinerary using Gemini (served from cache for repeated preferences)
         pool = await get_db()
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    INSERT INTO itineraries (id, user_id, destination, days, budget, content, preferences, generated_at)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-                """, (
-                    itinerary["id"],
-                    current_user["id"],
-                    itinerary["destination"],
-                    itinerary["days"],
-                    itinerary["budget"],
-                    itinerary["content"],
-                    json.dumps(itinerary["preferences"]),
-                    itinerary["generated_at"]
-                ))
+        itinerary = await itinerary_cache.get_or_generate(preferences, gemini_service.generate_itinerary, pool)
+        
+        # Save to database in the background (batched write-behind)
+        itinerary_writer.add((
+            itinerary["id"],
+            current_user["id"],
+            itinerary["destination"],
+            itinerary["days"],
+            itinerary["budget"],
+            itinerary["content"],
+            json.dumps(itinerary["preferences"]),
+            itinerary["generated_at"],
+            itinerary_cache_key(preferences)
+        ))
         
         return itinerary
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error generating itinerary: {str(e)}")
 
+def chat_turn_loader(pool, user_id: str, session_id: str):
+    """Loader for the most recent chat turns of a session, oldest first (pool or RequestConnection)"""
+    async def load_turns(limit: int):
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("""
+                    SELECT message, response, created_at 
+                    FROM chat_logs 
+                    WHERE user_id = %s AND session_id = %s 
+                    ORDER BY created_at DESC 
+                    LIMIT %s
+                """, (user_id, session_id, limit))
+                history = await cur.fetchall()
+        return list(reversed(history))
+    return load_turns
+
 @api_router.post("/chatbot")
 async def chatbot_message(
     request_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims),
+    db: RequestConnection = Depends(get_request_db)
 ):
     """Handle chatbot conversation using Deepseek"""
     try:
@@ -572,45 +591,29 @@ async def chatbot_message(
         if not user_message:
             raise HTTPException(status_code=400, detail="Message is required")
         
-        # Get conversation history (optional)
-        pool = await get_db()
-        conversation_history = []
-        
-        async with pool.acquire() as conn:
-            async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Get recent conversation history
-                await cur.execute("""
-                    SELECT message, response, created_at 
-                    FROM chat_logs 
-                    WHERE user_id = %s AND session_id = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT 5
-                """, (current_user["id"], session_id))
-                
-                history = await cur.fetchall()
-                for chat in reversed(history):
-                    conversation_history.extend([
-                        {"role": "user", "content": chat["message"]},
-                        {"role": "assistant", "content": chat["response"]}
-                    ])
+        # Get conversation history (kept in memory, seeded from chat_logs on first use)
+        conversation_history = await conversation_contexts.get_history(
+            current_user["id"], session_id, chat_turn_loader(db, current_user["id"], session_id)
+        )
+        # Don't hold a connection for the length of the LLM call
+        await db.release()
         
         # Generate response using Gemini
         response = await gemini_service.chat_response(user_message, conversation_history)
         
-        # Save conversation to database
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
-                await cur.execute("""
-                    INSERT INTO chat_logs (id, user_id, session_id, message, response, created_at)
-                    VALUES (%s, %s, %s, %s, %s, %s)
-                """, (
-                    str(uuid.uuid4()),
-                    current_user["id"],
-                    session_id,
-                    user_message,
-                    response["message"],
-                    datetime.utcnow()
-                ))
+        # Only real model output is recorded; chat_logs seeds the context again later
+        if response["model"] != "fallback":
+            conversation_contexts.record_turn(current_user["id"], session_id, user_message, response["message"])
+            
+            # Save conversation to database in the background (batched write-behind)
+            chat_log_writer.add((
+                str(uuid.uuid4()),
+                current_user["id"],
+                session_id,
+                user_message,
+                response["message"],
+                datetime.utcnow()
+            ))
         
         return {
             "response": response["message"],
@@ -622,28 +625,95 @@ async def chatbot_message(
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
 
+@api_router.post("/chatbot/stream")
+async def chatbot_message_stream(
+    request_data: dict,
+    current_user: dict = Depends(get_token_claims),
+    db: RequestConnection = Depends(get_request_db)
+):
+    """Stream the chatbot reply as Server-Sent Events"""
+    user_message = request_data.get("message", "")
+    session_id = request_data.get("session_id", str(uuid.uuid4()))
+    
+    if not user_message:
+        raise HTTPException(status_code=400, detail="Message is required")
+    
+    try:
+        # Get conversation history (kept in memory, seeded from chat_logs on first use)
+        conversation_history = await conversation_contexts.get_history(
+            current_user["id"], session_id, chat_turn_loader(db, current_user["id"], session_id)
+        )
+        await db.release()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error processing chat message: {str(e)}")
+    
+    async def event_stream():
+        parts = []
+        model = CHAT_MODEL
+        try:
+            async for delta in gemini_service.stream_chat_response(user_message, conversation_history):
+                if isinstance(delta, FallbackReply):
+                    model = "fallback"
+                else:
+                    parts.append(delta)
+                yield f"data: {json.dumps({'delta': delta})}\n\n"
+        finally:
+            # Save the model's reply once the stream ends (also when the client disconnects
+            # early); the fallback apology is never recorded
+            if parts:
+                conversation_contexts.record_turn(current_user["id"], session_id, user_message, "".join(parts))
+                chat_log_writer.add((
+                    str(uuid.uuid4()),
+                    current_user["id"],
+                    session_id,
+                    user_message,
+                    "".join(parts),
+                    datetime.utcnow()
+                ))
+        
+        done = {
+            "session_id": session_id,
+            "timestamp": datetime.utcnow().isoformat(),
+            "model": model
+        }
+        yield f"event: done\ndata: {json.dumps(done)}\n\n"
+    
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 @api_router.get("/chatbot/history/{session_id}")
 async def get_chat_history(
     session_id: str,
-    current_user: dict = Depends(get_current_user)
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_token_claims)
 ):
-    """Get chat history for a session"""
+    """Get chat history for a session, newest page first (pass next_cursor for older turns)"""
     try:
+        try:
+            after_cursor, cursor_params = keyset_condition(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
-                    SELECT message, response, created_at 
+                await cur.execute(f"""
+                    SELECT id, message, response, created_at 
                     FROM chat_logs 
-                    WHERE user_id = %s AND session_id = %s 
-                    ORDER BY created_at ASC
-                """, (current_user["id"], session_id))
+                    WHERE user_id = %s AND session_id = %s{after_cursor}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, [current_user["id"], session_id] + cursor_params + [limit + 1])
                 
-                history = await cur.fetchall()
+                history, next_cursor = page_of(await cur.fetchall(), limit)
                 
-                # Format for frontend
+                # Format for frontend, oldest first within the page
                 formatted_history = []
-                for chat in history:
+                for chat in reversed(history):
                     formatted_history.extend([
                         {
                             "id": f"user_{chat['created_at'].timestamp()}",
@@ -659,8 +729,14 @@ async def get_chat_history(
                         }
                     ])
                 
-                return formatted_history
+                return {
+                    "messages": formatted_history,
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None
+                }
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
@@ -718,43 +794,90 @@ class BookingCreate(BaseModel):
             
         return self
 
+async def credit_loyalty_points(cur, user_id: str, points: int, description: str,
+                                booking_id: Optional[str] = None):
+    """Credit off-chain loyalty points and log the award
+
+    loyalty_points has no unique key on user_id, so the balance row is
+    looked up under a lock and only created when the user has none yet
+    (rowcount can't tell: MySQL reports changed rows, not matched ones).
+    Two concurrent first awards then deadlock instead of both inserting.
+    The log row has no blockchain_status: nothing is sent on chain for it.
+    """
+    if points <= 0:
+        return
+    
+    await cur.execute("SELECT id FROM loyalty_points WHERE user_id = %s LIMIT 1 FOR UPDATE", (user_id,))
+    balance = await cur.fetchone()
+    if balance:
+        await cur.execute("""
+            UPDATE loyalty_points
+            SET points_balance = points_balance + %s, total_earned = total_earned + %s
+            WHERE id = %s
+        """, (points, points, balance['id'] if isinstance(balance, dict) else balance[0]))
+    else:
+        await cur.execute("""
+            INSERT INTO loyalty_points (
+                id, user_id, wallet_address, points_balance,
+                total_earned, total_redeemed, contract_address
+            )
+            SELECT %s, id, COALESCE(wallet_address, ''), %s, %s, 0, %s
+            FROM users WHERE id = %s
+        """, (str(uuid.uuid4()), points, points, blockchain_service.contracts['loyalty'] or '', user_id))
+
+    await cur.execute("""
+        INSERT INTO loyalty_transactions (
+            id, user_id, transaction_type, points_amount,
+            booking_id, description, blockchain_status
+        ) VALUES (%s, %s, 'earned', %s, %s, %s, NULL)
+    """, (str(uuid.uuid4()), user_id, points, booking_id, description))
+
 @api_router.post("/bookings")
 async def create_booking(
     booking_data: BookingCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: RequestConnection = Depends(get_request_transaction)
 ):
-    """Create a new booking with blockchain integration"""
+    """Create a new booking with blockchain integration
+    
+    Every write below runs in the request's transaction and commits once
+    when the handler returns; any failure rolls the whole booking back.
+    """
     try:
-        pool = await get_db()
         booking_id = str(uuid.uuid4())
         
-        async with pool.acquire() as conn:
+        async with db.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Get provider and destination details
-                await cur.execute("SELECT name, price FROM providers WHERE id = %s", (booking_data.provider_id,))
-                provider = await cur.fetchone()
-                if not provider:
+                # Provider and destination in one round trip
+                await cur.execute("""
+                    SELECT p.name as provider_name, p.price as provider_price,
+                           d.name as destination_name, d.price as destination_price
+                    FROM providers p
+                    LEFT JOIN destinations d ON d.id = %s
+                    WHERE p.id = %s
+                """, (booking_data.destination_id, booking_data.provider_id))
+                details = await cur.fetchone()
+                if not details:
                     raise HTTPException(status_code=404, detail="Provider not found")
-                
-                await cur.execute("SELECT name FROM destinations WHERE id = %s", (booking_data.destination_id,))
-                destination = await cur.fetchone()
-                if not destination:
+                if details['destination_name'] is None:
                     raise HTTPException(status_code=404, detail="Destination not found")
                 
                 # Use calculated price from frontend if provided, otherwise calculate from provider/destination
                 if booking_data.calculated_price and booking_data.calculated_price > 0:
                     total_price = booking_data.calculated_price
                 else:
-                    total_price = (provider['price'] + destination['price']) * booking_data.guests
+                    total_price = float((details['provider_price'] + details['destination_price']) * booking_data.guests)
                 
                 # 🔗 PHASE 6.1: Blockchain Integration - Check if user wants blockchain verification
                 blockchain_verified = False
                 blockchain_hash = None
-                certificate_eligible = False
                 
                 # Check if blockchain verification was requested (from frontend)
                 blockchain_verification_requested = getattr(booking_data, 'blockchain_verification', False)
                 
+                # Blockchain bookings are certificate eligible once the tour completes
+                certificate_eligible = bool(blockchain_verification_requested)
+                
                 # Create booking with personal information and package details
                 await cur.execute("""
                     INSERT INTO bookings (id, user_id, provider_id, destination_id, user_name, 
@@ -766,7 +889,7 @@ async def create_booking(
                     VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                 """, (
                     booking_id, current_user['id'], booking_data.provider_id, booking_data.destination_id,
-                    current_user['name'], provider['name'], destination['name'], booking_data.booking_date,
+                    current_user['name'], details['provider_name'], details['destination_name'], booking_data.booking_date,
                     booking_data.check_in, booking_data.check_out, booking_data.guests, booking_data.rooms,
                     total_price, booking_data.special_requests, 'pending',
                     booking_data.addons, booking_data.package_type, booking_data.package_name, 
@@ -778,34 +901,23 @@ async def create_booking(
                 # 🔗 PHASE 6.1: Auto-Award Initial Loyalty Points for Booking
                 loyalty_points_awarded = 0
                 if blockchain_verification_requested:
+                    # Award base loyalty points for booking (10% of price in points).
+                    # The savepoint keeps a failed award from rolling the booking back.
+                    booking_reward = int(total_price * 0.1)
+                    await cur.execute("SAVEPOINT loyalty_award")
                     try:
-                        # Award base loyalty points for booking (10% of price in points)
-                        loyalty_points_awarded = int(total_price * 0.1)
-                        
-                        # Award points in database first
-                        await cur.execute("""
-                            INSERT INTO loyalty_points (id, user_id, points_balance, total_earned, total_redeemed)
-                            VALUES (UUID(), %s, %s, %s, 0)
-                            ON DUPLICATE KEY UPDATE 
-                            points_balance = points_balance + VALUES(points_balance),
-                            total_earned = total_earned + VALUES(total_earned)
-                        """, (current_user['id'], loyalty_points_awarded, loyalty_points_awarded))
-                        
-                        # Log loyalty transaction
-                        await cur.execute("""
-                            INSERT INTO loyalty_transactions (id, user_id, transaction_type, points_amount, 
-                                                           description, booking_id, status)
-                            VALUES (UUID(), %s, 'earned', %s, %s, %s, 'completed')
-                        """, (current_user['id'], loyalty_points_awarded, 
-                             f"Booking reward for {destination['name']}", booking_id))
-                        
-                        # Mark booking as certificate eligible for completed tours
-                        await cur.execute("""
-                            UPDATE bookings SET certificate_eligible = TRUE WHERE id = %s
-                        """, (booking_id,))
-                        
+                        await credit_loyalty_points(
+                            cur, current_user['id'], booking_reward,
+                            f"Booking reward for {details['destination_name']}", booking_id
+                        )
+                        loyalty_points_awarded = booking_reward
                     except Exception as loyalty_error:
-                        print(f"Failed to award loyalty points: {loyalty_error}")
+                        await cur.execute("ROLLBACK TO SAVEPOINT loyalty_award")
+                        print(f"Failed to award booking loyalty points: {loyalty_error}")
+                
+                # Every booking updates the same monthly_stats row, so take that lock
+                # last to keep it held only for the commit
+                await admin_stats_service.record_booking_created(cur, total_price)
                 
                 response = {
                     "id": booking_id,
@@ -834,7 +946,7 @@ async def create_booking(
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/bookings")
-async def get_user_bookings(current_user: dict = Depends(get_current_user)):
+async def get_user_bookings(current_user: dict = Depends(get_token_claims)):
     """Get all bookings for current user"""
     try:
         pool = await get_db()
@@ -849,7 +961,7 @@ async def get_user_bookings(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/provider/bookings")
-async def get_provider_bookings(current_user: dict = Depends(get_current_user)):
+async def get_provider_bookings(current_user: dict = Depends(get_token_claims)):
     """Get all bookings for current provider"""
     try:
         if current_user['role'] != 'provider':
@@ -873,7 +985,7 @@ async def get_provider_bookings(current_user: dict = Depends(get_current_user)):
 @api_router.get("/provider/bookings/search")
 async def search_bookings_by_reference(
     reference_number: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Search bookings by reference number for providers"""
     try:
@@ -932,7 +1044,7 @@ async def search_bookings_by_reference(
 async def update_booking_status(
     booking_id: str,
     status_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Update booking status with blockchain integration"""
     try:
@@ -944,14 +1056,7 @@ async def update_booking_status(
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 # Check if user has permission to update this booking
-                if current_user['role'] == 'provider':
-                    await cur.execute("""
-                        SELECT b.*, d.name as destination_name FROM bookings b 
-                        JOIN providers p ON b.provider_id = p.id 
-                        JOIN destinations d ON b.destination_id = d.id
-                        WHERE b.id = %s AND p.user_id = %s
-                    """, (booking_id, current_user['id']))
-                elif current_user['role'] == 'admin':
+                if current_user['role'] in ('provider', 'admin'):
                     await cur.execute("""
                         SELECT b.*, d.name as destination_name FROM bookings b
                         JOIN destinations d ON b.destination_id = d.id
@@ -967,9 +1072,15 @@ async def update_booking_status(
                 booking = await cur.fetchone()
                 if not booking:
                     raise HTTPException(status_code=404, detail="Booking not found or access denied")
+                if current_user['role'] == 'provider':
+                    await require_provider_owner(cur, current_user, booking['provider_id'],
+                                                 detail="Booking not found or access denied")
                 
                 # Update booking status
                 await cur.execute("UPDATE bookings SET status = %s WHERE id = %s", (new_status, booking_id))
+                await admin_stats_service.record_booking_status_change(
+                    cur, booking['created_at'], booking['total_price'], booking['status'], new_status
+                )
                 
                 response = {"message": "Booking status updated successfully"}
                 
@@ -981,14 +1092,16 @@ async def update_booking_status(
                         existing_cert = await cur.fetchone()
                         
                         if not existing_cert:
-                            # Create certificate record
+                            # Create certificate record; no mint_status, since it is
+                            # not queued for minting (a 'pending' one would read as
+                            # waiting on the submission queue)
                             cert_id = str(uuid.uuid4())
                             await cur.execute("""
                                 INSERT INTO certificates (
                                     id, user_id, booking_id, certificate_type, contract_address,
                                     certificate_title, certificate_description, destination_name,
-                                    completion_date, is_minted
-                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                                    completion_date, is_minted, mint_status
+                                ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, NULL)
                             """, (
                                 cert_id, booking['user_id'], booking_id, 'tour_completion',
                                 os.getenv('CONTRACT_ADDRESS_CERTIFICATES', 'pending'),
@@ -1005,21 +1118,10 @@ async def update_booking_status(
                             # 🔗 PHASE 6.1: Award bonus loyalty points for completion
                             completion_bonus = 50  # Fixed bonus points for completing a tour
                             
-                            await cur.execute("""
-                                INSERT INTO loyalty_points (id, user_id, points_balance, total_earned, total_redeemed)
-                                VALUES (UUID(), %s, %s, %s, 0)
-                                ON DUPLICATE KEY UPDATE 
-                                points_balance = points_balance + VALUES(points_balance),
-                                total_earned = total_earned + VALUES(total_earned)
-                            """, (booking['user_id'], completion_bonus, completion_bonus))
-                            
-                            # Log completion bonus transaction
-                            await cur.execute("""
-                                INSERT INTO loyalty_transactions (id, user_id, transaction_type, points_amount, 
-                                                               description, booking_id, status)
-                                VALUES (UUID(), %s, 'earned', %s, %s, %s, 'completed')
-                            """, (booking['user_id'], completion_bonus, 
-                                 f"Tour completion bonus - {booking['destination_name']}", booking_id))
+                            await credit_loyalty_points(
+                                cur, booking['user_id'], completion_bonus,
+                                f"Tour completion bonus - {booking['destination_name']}", booking_id
+                            )
                             
                             response["certificate_issued"] = True
                             response["certificate_id"] = cert_id
@@ -1042,7 +1144,7 @@ class WishlistItemCreate(BaseModel):
     destination_id: str
 
 @api_router.get("/wishlist")
-async def get_user_wishlist(current_user: dict = Depends(get_current_user)):
+async def get_user_wishlist(current_user: dict = Depends(get_token_claims)):
     """Get all wishlist items for current user"""
     try:
         if current_user['role'] != 'tourist':
@@ -1103,7 +1205,7 @@ async def get_user_wishlist(current_user: dict = Depends(get_current_user)):
 @api_router.post("/wishlist")
 async def add_to_wishlist(
     wishlist_item: WishlistItemCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Add destination to user's wishlist"""
     try:
@@ -1142,7 +1244,7 @@ async def add_to_wishlist(
 @api_router.delete("/wishlist/{destination_id}")
 async def remove_from_wishlist(
     destination_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Remove destination from user's wishlist"""
     try:
@@ -1174,7 +1276,7 @@ async def remove_from_wishlist(
 @api_router.get("/wishlist/check/{destination_id}")
 async def check_wishlist_status(
     destination_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Check if destination is in user's wishlist"""
     try:
@@ -1207,7 +1309,7 @@ class ProviderCreate(BaseModel):
 @api_router.post("/providers")
 async def create_provider(
     provider_data: ProviderCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Create a new provider service"""
     try:
@@ -1252,7 +1354,7 @@ async def create_provider(
 async def add_provider_to_destination(
     provider_id: str,
     destination_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Link provider to a destination"""
     try:
@@ -1267,10 +1369,7 @@ async def add_provider_to_destination(
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 # Check if provider belongs to current user
-                await cur.execute("SELECT user_id FROM providers WHERE id = %s", (provider_id,))
-                provider = await cur.fetchone()
-                if not provider or provider[0] != current_user['id']:
-                    raise HTTPException(status_code=404, detail="Provider not found or access denied")
+                await require_provider_owner(cur, current_user, provider_id)
                 
                 # Check if destination exists
                 await cur.execute("SELECT id FROM destinations WHERE id = %s", (destination_id,))
@@ -1303,7 +1402,7 @@ async def add_provider_to_destination(
 async def remove_provider_from_destination(
     provider_id: str,
     destination_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Remove provider from destination"""
     try:
@@ -1314,10 +1413,7 @@ async def remove_provider_from_destination(
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 # Check if provider belongs to current user
-                await cur.execute("SELECT user_id FROM providers WHERE id = %s", (provider_id,))
-                provider = await cur.fetchone()
-                if not provider or provider[0] != current_user['id']:
-                    raise HTTPException(status_code=404, detail="Provider not found or access denied")
+                await require_provider_owner(cur, current_user, provider_id)
                 
                 # Remove the relationship
                 await cur.execute("""
@@ -1332,7 +1428,7 @@ async def remove_provider_from_destination(
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/user/providers")
-async def get_user_providers(current_user: dict = Depends(get_current_user)):
+async def get_user_providers(current_user: dict = Depends(get_token_claims)):
     """Get all providers for current user"""
     try:
         if current_user['role'] != 'provider':
@@ -1352,7 +1448,7 @@ async def get_user_providers(current_user: dict = Depends(get_current_user)):
 @api_router.get("/providers/{provider_id}")
 async def get_provider_by_id(
     provider_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Get provider by ID - for editing purposes"""
     try:
@@ -1360,10 +1456,7 @@ async def get_provider_by_id(
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 # Check ownership
-                await cur.execute("SELECT user_id FROM providers WHERE id = %s", (provider_id,))
-                provider_check = await cur.fetchone()
-                if not provider_check or provider_check['user_id'] != current_user['id']:
-                    raise HTTPException(status_code=404, detail="Provider not found or access denied")
+                await require_provider_owner(cur, current_user, provider_id)
                 
                 # Get provider details with destination info
                 query = """
@@ -1391,7 +1484,7 @@ async def get_provider_by_id(
 async def update_provider(
     provider_id: str,
     provider_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Update provider service"""
     try:
@@ -1399,10 +1492,7 @@ async def update_provider(
         async with pool.acquire() as conn:
             async with conn.cursor() as cur:
                 # Check ownership
-                await cur.execute("SELECT user_id FROM providers WHERE id = %s", (provider_id,))
-                provider = await cur.fetchone()
-                if not provider or provider[0] != current_user['id']:
-                    raise HTTPException(status_code=404, detail="Provider not found or access denied")
+                await require_provider_owner(cur, current_user, provider_id)
                 
                 # Update provider  
                 update_fields = []
@@ -1444,7 +1534,8 @@ class ReviewCreate(BaseModel):
 @api_router.post("/reviews")
 async def create_review(
     review_data: ReviewCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims),
+    db: RequestConnection = Depends(get_request_transaction)
 ):
     """Create a new review with optional blockchain verification"""
     try:
@@ -1454,13 +1545,12 @@ async def create_review(
         if review_data.rating < 1 or review_data.rating > 5:
             raise HTTPException(status_code=400, detail="Rating must be between 1 and 5")
         
-        pool = await get_db()
         review_id = str(uuid.uuid4())
         
         # 🔗 PHASE 6.2: Verify user eligibility for blockchain-verified reviews
         verified_booking = None
         if review_data.blockchain_verification and review_data.booking_id:
-            async with pool.acquire() as conn:
+            async with db.acquire() as conn:
                 async with conn.cursor(aiomysql.DictCursor) as cur:
                     # Check if user has a completed booking for this destination/provider
                     await cur.execute("""
@@ -1477,8 +1567,9 @@ async def create_review(
                             detail="Blockchain-verified reviews require a completed booking for this destination/provider"
                         )
         
-        async with pool.acquire() as conn:
-            async with conn.cursor() as cur:
+        # Same connection and transaction as the eligibility check above
+        async with db.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
                 await cur.execute("""
                     INSERT INTO reviews (id, user_id, destination_id, provider_id, rating, comment)
                     VALUES (%s, %s, %s, %s, %s, %s)
@@ -1492,6 +1583,9 @@ async def create_review(
                 loyalty_bonus_awarded = 0
                 
                 if review_data.blockchain_verification and verified_booking:
+                    # The savepoint keeps a failed record or award from being
+                    # committed half-applied with the review
+                    await cur.execute("SAVEPOINT blockchain_review")
                     try:
                         # Create blockchain review record
                         blockchain_review_id = str(uuid.uuid4())
@@ -1515,56 +1609,42 @@ async def create_review(
                         
                         # 🔗 PHASE 6.2: Award bonus loyalty points for verified reviews
                         review_bonus = 25  # Bonus points for verified review
-                        loyalty_bonus_awarded = review_bonus
-                        
-                        await cur.execute("""
-                            INSERT INTO loyalty_points (id, user_id, points_balance, total_earned, total_redeemed)
-                            VALUES (UUID(), %s, %s, %s, 0)
-                            ON DUPLICATE KEY UPDATE 
-                            points_balance = points_balance + VALUES(points_balance),
-                            total_earned = total_earned + VALUES(total_earned)
-                        """, (current_user['id'], review_bonus, review_bonus))
                         
-                        # Log verified review bonus transaction
-                        await cur.execute("""
-                            INSERT INTO loyalty_transactions (id, user_id, transaction_type, points_amount, 
-                                                           description, review_id, status)
-                            VALUES (UUID(), %s, 'earned', %s, %s, %s, 'completed')
-                        """, (current_user['id'], review_bonus, 
-                             f"Verified review bonus - {verified_booking.get('destination_name', 'Unknown')}", 
-                             review_id))
+                        await credit_loyalty_points(
+                            cur, current_user['id'], review_bonus,
+                            f"Verified review bonus - {verified_booking.get('destination_name', 'Unknown')}",
+                            review_data.booking_id
+                        )
                         
+                        loyalty_bonus_awarded = review_bonus
                         blockchain_created = True
                         
                     except Exception as blockchain_error:
+                        await cur.execute("ROLLBACK TO SAVEPOINT blockchain_review")
                         print(f"Failed to create blockchain review: {blockchain_error}")
                 
-                # Update average rating
-                if review_data.destination_id:
-                    await cur.execute("""
-                        UPDATE destinations SET rating = (
-                            SELECT AVG(rating) FROM reviews WHERE destination_id = %s
-                        ) WHERE id = %s
-                    """, (review_data.destination_id, review_data.destination_id))
-                
-                if review_data.provider_id:
-                    await cur.execute("""
-                        UPDATE providers SET rating = (
-                            SELECT AVG(rating) FROM reviews WHERE provider_id = %s
-                        ) WHERE id = %s
-                    """, (review_data.provider_id, review_data.provider_id))
-                
-                response = {
-                    "id": review_id,
-                    "message": "Review created successfully",
-                    "blockchain_verified": blockchain_created,
-                    "loyalty_bonus_awarded": loyalty_bonus_awarded
-                }
-                
-                if blockchain_created:
-                    response["blockchain_message"] = f"Review verified on blockchain! Earned {loyalty_bonus_awarded} bonus points."
-                
-                return response
+                # Update average rating (incremental aggregates, no scan of reviews)
+                await rating_aggregates.record_review(
+                    cur, review_data.destination_id, review_data.provider_id, review_data.rating
+                )
+        
+        # Commit before dropping the cached catalog, so a reload in between
+        # cannot cache the old rating for another CATALOG_MAX_AGE_SECONDS
+        await db.release()
+        if review_data.destination_id:
+            destination_catalog.invalidate()
+        
+        response = {
+            "id": review_id,
+            "message": "Review created successfully",
+            "blockchain_verified": blockchain_created,
+            "loyalty_bonus_awarded": loyalty_bonus_awarded
+        }
+        
+        if blockchain_created:
+            response["blockchain_message"] = f"Review verified on blockchain! Earned {loyalty_bonus_awarded} bonus points."
+        
+        return response
                 
     except HTTPException:
         raise
@@ -1573,7 +1653,7 @@ async def create_review(
 
 # Admin API
 @api_router.get("/admin/stats")
-async def get_admin_stats(current_user: dict = Depends(get_current_user)):
+async def get_admin_stats(current_user: dict = Depends(get_token_claims)):
     """Get comprehensive admin dashboard statistics with time-series data"""
     try:
         if current_user['role'] != 'admin':
@@ -1582,126 +1662,26 @@ async def get_admin_stats(current_user: dict = Depends(get_current_user)):
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Basic statistics
-                stats = {}
-                
-                await cur.execute("SELECT COUNT(*) as total FROM users")
-                stats['total_users'] = (await cur.fetchone())['total']
-                
-                await cur.execute("SELECT COUNT(*) as total FROM destinations")
-                stats['total_destinations'] = (await cur.fetchone())['total']
-                
-                await cur.execute("SELECT COUNT(*) as total FROM providers")
-                stats['total_providers'] = (await cur.fetchone())['total']
-                
-                await cur.execute("SELECT COUNT(*) as total FROM providers WHERE is_active = 1")
-                stats['active_providers'] = (await cur.fetchone())['total']
-                
-                await cur.execute("SELECT COUNT(*) as total FROM bookings")
-                stats['total_bookings'] = (await cur.fetchone())['total']
-                
-                await cur.execute("SELECT SUM(total_price) as revenue FROM bookings WHERE status IN ('completed', 'paid')")
-                revenue_result = await cur.fetchone()
-                stats['total_revenue'] = float(revenue_result['revenue']) if revenue_result['revenue'] else 0
-                
-                # Monthly revenue for the last 6 months
-                await cur.execute("""
-                    SELECT 
-                        DATE_FORMAT(created_at, '%Y-%m') as month,
-                        SUM(total_price) as revenue,
-                        COUNT(*) as bookings
-                    FROM bookings 
-                    WHERE created_at >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                        AND status IN ('completed', 'paid')
-                    GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-                    ORDER BY month ASC
-                """)
-                monthly_revenue = await cur.fetchall()
-                stats['monthly_revenue'] = monthly_revenue
-                
-                # User growth - last 6 months
-                await cur.execute("""
-                    SELECT 
-                        DATE_FORMAT(created_at, '%Y-%m') as month,
-                        COUNT(*) as new_users
-                    FROM users 
-                    WHERE created_at >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-                    ORDER BY month ASC
-                """)
-                user_growth = await cur.fetchall()
-                stats['user_growth'] = user_growth
-                
-                # Booking growth - last 6 months
-                await cur.execute("""
-                    SELECT 
-                        DATE_FORMAT(created_at, '%Y-%m') as month,
-                        COUNT(*) as bookings
-                    FROM bookings 
-                    WHERE created_at >= DATE_SUB(NOW(), INTERVAL 6 MONTH)
-                    GROUP BY DATE_FORMAT(created_at, '%Y-%m')
-                    ORDER BY month ASC
-                """)
-                booking_growth = await cur.fetchall()
-                stats['booking_growth'] = booking_growth
-                
-                # Recent bookings with details
-                await cur.execute("""
-                    SELECT 
-                        b.id,
-                        b.booking_date,
-                        b.total_price,
-                        b.status,
-                        b.package_type,
-                        b.guests,
-                        u.name as customer_name,
-                        u.email as customer_email,
-                        d.name as destination_name,
-                        p.name as provider_name,
-                        b.created_at
-                    FROM bookings b
-                    JOIN users u ON b.user_id = u.id
-                    LEFT JOIN destinations d ON b.destination_id = d.id
-                    LEFT JOIN providers p ON b.provider_id = p.id
-                    ORDER BY b.created_at DESC
-                    LIMIT 10
-                """)
-                recent_bookings = await cur.fetchall()
-                stats['recent_bookings'] = recent_bookings
-                
-                # Booking status distribution
-                await cur.execute("""
-                    SELECT status, COUNT(*) as count FROM bookings GROUP BY status
-                """)
-                booking_stats = await cur.fetchall()
-                stats['booking_by_status'] = {stat['status']: stat['count'] for stat in booking_stats}
-                
-                # Revenue by destination
-                await cur.execute("""
-                    SELECT 
-                        d.name as destination_name,
-                        SUM(b.total_price) as revenue,
-                        COUNT(b.id) as bookings
-                    FROM bookings b
-                    JOIN destinations d ON b.destination_id = d.id
-                    WHERE b.status IN ('completed', 'paid')
-                    GROUP BY d.id, d.name
-                    ORDER BY revenue DESC
-                    LIMIT 5
-                """)
-                revenue_by_destination = await cur.fetchall()
-                stats['revenue_by_destination'] = revenue_by_destination
-                
-                # Average booking value
-                await cur.execute("""
-                    SELECT AVG(total_price) as avg_booking_value 
-                    FROM bookings 
-                    WHERE status IN ('completed', 'paid')
-                """)
-                avg_result = await cur.fetchone()
-                stats['avg_booking_value'] = float(avg_result['avg_booking_value']) if avg_result['avg_booking_value'] else 0
-                
-                return stats
+                return await admin_stats_service.get_stats(cur)
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@api_router.post("/admin/ratings/reconcile")
+async def reconcile_ratings(current_user: dict = Depends(get_token_claims)):
+    """Recompute destination/provider rating aggregates from reviews (Admin only)"""
+    try:
+        if current_user['role'] != 'admin':
+            raise HTTPException(status_code=403, detail="Admin access required")
+        
+        pool = await get_db()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                repaired = await rating_aggregates.reconcile(cur)
+        if repaired.get('destinations'):
+            destination_catalog.invalidate()
+        return {"message": "Rating aggregates reconciled", "repaired": repaired}
     except HTTPException:
         raise
     except Exception as e:
@@ -1729,7 +1709,7 @@ class DestinationUpdate(BaseModel):
     highlights: Optional[List[str]] = None
 
 @api_router.post("/admin/destinations")
-async def create_destination(destination_data: DestinationCreate, current_user: dict = Depends(get_current_user)):
+async def create_destination(destination_data: DestinationCreate, current_user: dict = Depends(get_token_claims)):
     """Create a new destination (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1756,18 +1736,20 @@ async def create_destination(destination_data: DestinationCreate, current_user:
                     datetime.now()
                 ))
                 await conn.commit()
-                
-                return {
-                    "id": destination_id,
-                    "message": "Destination created successfully"
-                }
+        
+        await destination_catalog.refresh(pool)
+        
+        return {
+            "id": destination_id,
+            "message": "Destination created successfully"
+        }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/admin/destinations/{destination_id}")
-async def update_destination(destination_id: str, destination_data: DestinationUpdate, current_user: dict = Depends(get_current_user)):
+async def update_destination(destination_id: str, destination_data: DestinationUpdate, current_user: dict = Depends(get_token_claims)):
     """Update a destination (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1818,15 +1800,17 @@ async def update_destination(destination_id: str, destination_data: DestinationU
                 
                 await cur.execute(query, values)
                 await conn.commit()
-                
-                return {"message": "Destination updated successfully"}
+        
+        await destination_catalog.refresh(pool)
+        
+        return {"message": "Destination updated successfully"}
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/admin/destinations/{destination_id}")
-async def delete_destination(destination_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_destination(destination_id: str, current_user: dict = Depends(get_token_claims)):
     """Delete a destination (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1847,10 +1831,13 @@ async def delete_destination(destination_id: str, current_user: dict = Depends(g
                     raise HTTPException(status_code=400, detail="Cannot delete destination with active bookings")
                 
                 # Delete destination
+                # Bookings keep their destination_id, so the rollups are unaffected
                 await cur.execute("DELETE FROM destinations WHERE id = %s", (destination_id,))
                 await conn.commit()
-                
-                return {"message": "Destination deleted successfully"}
+        
+        await destination_catalog.refresh(pool)
+        
+        return {"message": "Destination deleted successfully"}
     except HTTPException:
         raise
     except Exception as e:
@@ -1858,7 +1845,7 @@ async def delete_destination(destination_id: str, current_user: dict = Depends(g
 
 # Admin Provider/Service Management
 @api_router.delete("/admin/providers/{provider_id}")
-async def delete_provider(provider_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_provider(provider_id: str, current_user: dict = Depends(get_token_claims)):
     """Delete a provider/service (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1867,20 +1854,26 @@ async def delete_provider(provider_id: str, current_user: dict = Depends(get_cur
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Check if provider exists
-                await cur.execute("SELECT id FROM providers WHERE id = %s", (provider_id,))
-                if not await cur.fetchone():
-                    raise HTTPException(status_code=404, detail="Provider not found")
-                
-                # Check if provider has active bookings
-                await cur.execute("SELECT COUNT(*) as count FROM bookings WHERE provider_id = %s AND status IN ('pending', 'confirmed')", (provider_id,))
-                result = await cur.fetchone()
-                if result['count'] > 0:
-                    raise HTTPException(status_code=400, detail="Cannot delete provider with active bookings")
-                
-                # Delete provider
-                await cur.execute("DELETE FROM providers WHERE id = %s", (provider_id,))
-                await conn.commit()
+                await conn.begin()
+                try:
+                    # Check if provider exists; the lock keeps new bookings out until the delete commits
+                    await cur.execute("SELECT id FROM providers WHERE id = %s FOR UPDATE", (provider_id,))
+                    if not await cur.fetchone():
+                        raise HTTPException(status_code=404, detail="Provider not found")
+                    
+                    # Check if provider has active bookings
+                    await cur.execute("SELECT COUNT(*) as count FROM bookings WHERE provider_id = %s AND status IN ('pending', 'confirmed')", (provider_id,))
+                    result = await cur.fetchone()
+                    if result['count'] > 0:
+                        raise HTTPException(status_code=400, detail="Cannot delete provider with active bookings")
+                    
+                    # Delete provider; its bookings cascade, so take them out of the rollups first
+                    await admin_stats_service.record_provider_deleted(cur, provider_id)
+                    await cur.execute("DELETE FROM providers WHERE id = %s", (provider_id,))
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
                 
                 return {"message": "Provider deleted successfully"}
     except HTTPException:
@@ -1889,7 +1882,7 @@ async def delete_provider(provider_id: str, current_user: dict = Depends(get_cur
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/admin/providers/{provider_id}/status")
-async def toggle_provider_status(provider_id: str, current_user: dict = Depends(get_current_user)):
+async def toggle_provider_status(provider_id: str, current_user: dict = Depends(get_token_claims)):
     """Toggle provider active status (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1919,7 +1912,7 @@ async def toggle_provider_status(provider_id: str, current_user: dict = Depends(
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/admin/users")
-async def get_all_users(current_user: dict = Depends(get_current_user)):
+async def get_all_users(current_user: dict = Depends(get_token_claims)):
     """Get all users for admin"""
     try:
         if current_user['role'] != 'admin':
@@ -1937,7 +1930,7 @@ async def get_all_users(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.put("/admin/users/{user_id}/ban")
-async def ban_user(user_id: str, current_user: dict = Depends(get_current_user)):
+async def ban_user(user_id: str, current_user: dict = Depends(get_token_claims)):
     """Ban a user (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1970,7 +1963,10 @@ async def ban_user(user_id: str, current_user: dict = Depends(get_current_user))
                     SET is_active = 0, updated_at = CURRENT_TIMESTAMP 
                     WHERE id = %s
                 """, (user_id,))
+                # Tokens already issued to the user stop working immediately
+                await token_revocations.revoke_user(cur, user_id)
                 await conn.commit()
+                user_cache.invalidate(user_id)
                 
                 return {"message": f"User {user['name']} has been banned"}
     except HTTPException:
@@ -1979,7 +1975,7 @@ async def ban_user(user_id: str, current_user: dict = Depends(get_current_user))
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.delete("/admin/users/{user_id}")
-async def delete_user(user_id: str, current_user: dict = Depends(get_current_user)):
+async def delete_user(user_id: str, current_user: dict = Depends(get_token_claims)):
     """Delete a user (Admin only)"""
     try:
         if current_user['role'] != 'admin':
@@ -1988,19 +1984,28 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Check if user exists
-                await cur.execute("SELECT id, name, role FROM users WHERE id = %s", (user_id,))
-                user = await cur.fetchone()
-                if not user:
-                    raise HTTPException(status_code=404, detail="User not found")
-                
-                # Don't allow deleting admin users
-                if user['role'] == 'admin':
-                    raise HTTPException(status_code=403, detail="Cannot delete admin users")
-                
-                # Delete user (this will cascade to related records due to foreign keys)
-                await cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
-                await conn.commit()
+                await conn.begin()
+                try:
+                    # Check if user exists; the lock keeps new bookings out until the delete commits
+                    await cur.execute("SELECT id, name, role FROM users WHERE id = %s FOR UPDATE", (user_id,))
+                    user = await cur.fetchone()
+                    if not user:
+                        raise HTTPException(status_code=404, detail="User not found")
+                    
+                    # Don't allow deleting admin users
+                    if user['role'] == 'admin':
+                        raise HTTPException(status_code=403, detail="Cannot delete admin users")
+                    
+                    # Delete user (this will cascade to related records due to foreign keys);
+                    # the user and its cascaded bookings come out of the rollups first
+                    await token_revocations.revoke_user(cur, user_id)
+                    await admin_stats_service.record_user_deleted(cur, user_id)
+                    await cur.execute("DELETE FROM users WHERE id = %s", (user_id,))
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+                user_cache.invalidate(user_id)
                 
                 return {"message": f"User {user['name']} has been deleted"}
     except HTTPException:
@@ -2008,24 +2013,132 @@ async def delete_user(user_id: str, current_user: dict = Depends(get_current_use
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def admin_booking_filters(booking_status: Optional[str], provider_id: Optional[str],
+                          from_date: Optional[date], to_date: Optional[date]):
+    """WHERE clause and params for the admin booking filters (dates are inclusive, on created_at)"""
+    conditions = []
+    params = []
+    if booking_status:
+        conditions.append("status = %s")
+        params.append(booking_status)
+    if provider_id:
+        conditions.append("provider_id = %s")
+        params.append(provider_id)
+    if from_date:
+        conditions.append("created_at >= %s")
+        params.append(from_date)
+    if to_date:
+        conditions.append("created_at < %s")
+        params.append(to_date + timedelta(days=1))
+    where = "WHERE " + " AND ".join(conditions) if conditions else "WHERE 1 = 1"
+    return where, params
+
 @api_router.get("/admin/bookings")
-async def get_all_bookings(current_user: dict = Depends(get_current_user)):
-    """Get all bookings for admin"""
+async def get_all_bookings(
+    booking_status: Optional[str] = Query(None, alias="status"),
+    provider_id: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_token_claims)
+):
+    """Get bookings for admin, newest first, one page at a time"""
     try:
         if current_user['role'] != 'admin':
             raise HTTPException(status_code=403, detail="Admin access required")
         
+        try:
+            after_cursor, cursor_params = keyset_condition(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        where, params = admin_booking_filters(booking_status, provider_id, from_date, to_date)
+        
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("SELECT * FROM bookings ORDER BY created_at DESC")
-                bookings = await cur.fetchall()
-                return bookings
+                await cur.execute(f"""
+                    SELECT * FROM bookings
+                    {where}{after_cursor}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, params + cursor_params + [limit + 1])
+                bookings, next_cursor = page_of(await cur.fetchall(), limit)
+                return {
+                    "bookings": bookings,
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None
+                }
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/admin/bookings/export")
+async def export_bookings(
+    format: str = "ndjson",
+    booking_status: Optional[str] = Query(None, alias="status"),
+    provider_id: Optional[str] = None,
+    from_date: Optional[date] = None,
+    to_date: Optional[date] = None,
+    current_user: dict = Depends(get_token_claims)
+):
+    """Stream all matching bookings as NDJSON or CSV (Admin only)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    if format not in EXPORT_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported format, use one of: {', '.join(EXPORT_FORMATS)}")
+    
+    where, params = admin_booking_filters(booking_status, provider_id, from_date, to_date)
+    pool = await get_db()
+    return StreamingResponse(
+        stream_query(pool, f"SELECT * FROM bookings {where} ORDER BY created_at DESC, id DESC", params, format),
+        media_type=EXPORT_FORMATS[format],
+        headers={"Content-Disposition": f'attachment; filename="bookings.{format}"'}
+    )
+
+@api_router.get("/admin/cache/stats")
+async def get_cache_stats(current_user: dict = Depends(get_token_claims)):
+    """Get in-process cache hit/miss counters (Admin only)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return {
+        "user_cache": user_cache.stats(),
+        "itinerary_cache": itinerary_cache.stats(),
+        "conversation_contexts": conversation_contexts.stats(),
+        "write_behind": {
+            "chat_logs": chat_log_writer.stats(),
+            "itineraries": itinerary_writer.stats()
+        },
+        "token_revocations": token_revocations.stats()
+    }
+
+@api_router.get("/admin/llm/stats")
+async def get_llm_stats(current_user: dict = Depends(get_token_claims)):
+    """Get LLM concurrency, timeout and circuit breaker metrics (Admin only)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return llm_guard.stats()
+
+@api_router.get("/admin/db/pool")
+async def get_db_pool_stats(current_user: dict = Depends(get_token_claims)):
+    """Get DB pool occupancy, waiters and acquire-wait/hold-time histograms (Admin only)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    pool = await get_db()
+    return pool.stats()
+
+@api_router.get("/admin/auth/stats")
+async def get_password_hasher_stats(current_user: dict = Depends(get_token_claims)):
+    """Get password hashing pool depth and counters (Admin only)"""
+    if current_user['role'] != 'admin':
+        raise HTTPException(status_code=403, detail="Admin access required")
+    
+    return password_hasher.stats()
+
 # Payment API - Import payment models and service
 from models.payment_models import (
     PaymentCreate, PaymentVerification, PaymentStatusUpdate, 
@@ -2040,18 +2153,18 @@ payment_service = PaymentService()
 @api_router.post("/payments/create")
 async def create_payment(
     payment_data: PaymentCreate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    db: RequestConnection = Depends(get_request_transaction)
 ):
     """Create a new payment request for a booking"""
     try:
-        pool = await get_db()
         payment_id = str(uuid.uuid4())
         
-        async with pool.acquire() as conn:
+        async with db.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 # Verify booking exists and belongs to user
                 await cur.execute("""
-                    SELECT id, total_price, status, booking_full_name, booking_phone 
+                    SELECT id, total_price, status, booking_full_name, booking_phone, created_at 
                     FROM bookings 
                     WHERE id = %s AND user_id = %s
                 """, (payment_data.booking_id, current_user['id']))
@@ -2097,6 +2210,9 @@ async def create_payment(
                         payment_amount = %s, payment_deadline = %s
                     WHERE id = %s
                 """, (payment_data.amount, qr_data['expires_at'], payment_data.booking_id))
+                await admin_stats_service.record_booking_status_change(
+                    cur, booking['created_at'], booking['total_price'], booking['status'], 'payment_required'
+                )
                 
                 return {
                     "id": payment_id,
@@ -2119,7 +2235,7 @@ async def create_payment(
 @api_router.post("/payments/generate-qr")
 async def generate_payment_qr(
     qr_request: UPIQRRequest,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Generate UPI QR code for payment"""
     try:
@@ -2164,7 +2280,7 @@ async def generate_payment_qr(
 @api_router.post("/payments/verify")
 async def verify_payment(
     verification_data: PaymentVerification,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Submit payment verification with transaction ID"""
     try:
@@ -2173,7 +2289,8 @@ async def verify_payment(
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 # Get payment details
                 await cur.execute("""
-                    SELECT p.*, b.user_id, b.booking_full_name 
+                    SELECT p.*, b.user_id, b.booking_full_name, b.status as booking_status,
+                           b.total_price as booking_total_price, b.created_at as booking_created_at
                     FROM payments p 
                     JOIN bookings b ON p.booking_id = b.id 
                     WHERE p.id = %s
@@ -2213,6 +2330,10 @@ async def verify_payment(
                     SET status = 'payment_pending', payment_status = 'pending'
                     WHERE id = %s
                 """, (payment['booking_id'],))
+                await admin_stats_service.record_booking_status_change(
+                    cur, payment['booking_created_at'], payment['booking_total_price'],
+                    payment['booking_status'], 'payment_pending'
+                )
                 
                 # Log the verification attempt
                 await cur.execute("""
@@ -2244,7 +2365,7 @@ async def verify_payment(
 @api_router.get("/payments/{payment_id}")
 async def get_payment_details(
     payment_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Get payment details"""
     try:
@@ -2280,7 +2401,7 @@ async def get_payment_details(
 @api_router.get("/payments/booking/{booking_id}")
 async def get_payment_by_booking(
     booking_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Get payment details for a booking"""
     try:
@@ -2323,7 +2444,7 @@ async def get_payment_by_booking(
 async def get_all_payments(
     status: Optional[str] = None,
     limit: int = 50,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Get all payments for admin review"""
     try:
@@ -2362,7 +2483,7 @@ async def get_all_payments(
 @api_router.post("/admin/payments/approve")
 async def approve_payment(
     approval_data: AdminPaymentApproval,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Approve or reject payment verification"""
     try:
@@ -2374,7 +2495,8 @@ async def approve_payment(
             async with conn.cursor(aiomysql.DictCursor) as cur:
                 # Get payment details
                 await cur.execute("""
-                    SELECT p.*, b.booking_id 
+                    SELECT p.*, b.status as booking_status, b.total_price as booking_total_price,
+                           b.created_at as booking_created_at
                     FROM payments p 
                     JOIN bookings b ON p.booking_id = b.id 
                     WHERE p.id = %s
@@ -2430,6 +2552,10 @@ async def approve_payment(
                     SET status = %s, payment_status = %s
                     WHERE id = %s
                 """, (booking_status, booking_payment_status, payment['booking_id']))
+                await admin_stats_service.record_booking_status_change(
+                    cur, payment['booking_created_at'], payment['booking_total_price'],
+                    payment['booking_status'], booking_status
+                )
                 
                 # Log admin action
                 await cur.execute("""
@@ -2459,7 +2585,7 @@ async def approve_payment(
         raise HTTPException(status_code=500, detail=f"Failed to process payment approval: {str(e)}")
 
 @api_router.get("/admin/payments/pending")
-async def get_pending_payments(current_user: dict = Depends(get_current_user)):
+async def get_pending_payments(current_user: dict = Depends(get_token_claims)):
     """Get payments pending admin approval"""
     try:
         if current_user['role'] != 'admin':
@@ -2501,7 +2627,7 @@ from models import (
 async def get_blockchain_status():
     """Get blockchain network status and configuration"""
     try:
-        network_info = blockchain_service.get_network_info()
+        network_info = await blockchain_service.get_network_info()
         # Map the fields correctly to match BlockchainStatus model
         contracts_dict = network_info.get("contracts") or {}
         
@@ -2516,7 +2642,7 @@ async def get_blockchain_status():
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/blockchain/wallet/connect", response_model=WalletResponse)
-async def connect_wallet(wallet_data: WalletConnect, current_user: dict = Depends(get_current_user)):
+async def connect_wallet(wallet_data: WalletConnect, current_user: dict = Depends(get_token_claims)):
     """Connect user's Web3 wallet"""
     try:
         pool = await get_db()
@@ -2552,6 +2678,7 @@ async def connect_wallet(wallet_data: WalletConnect, current_user: dict = Depend
                         SET wallet_address = %s, wallet_connected = %s 
                         WHERE id = %s
                     """, (wallet_data.wallet_address, True, current_user['id']))
+                    user_cache.invalidate(current_user['id'])
                     
                     return WalletResponse(
                         user_id=current_user['id'],
@@ -2566,7 +2693,7 @@ async def connect_wallet(wallet_data: WalletConnect, current_user: dict = Depend
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/blockchain/wallet/status", response_model=WalletResponse)
-async def get_wallet_status(current_user: dict = Depends(get_current_user)):
+async def get_wallet_status(current_user: dict = Depends(get_token_claims)):
     """Get user's wallet connection status"""
     try:
         pool = await get_db()
@@ -2596,96 +2723,115 @@ async def get_wallet_status(current_user: dict = Depends(get_current_user)):
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def require_submission_queue():
+    """Reject blockchain writes while the background submission queue is down"""
+    if not blockchain_service.submission_queue.is_running:
+        raise HTTPException(
+            status_code=503,
+            detail="Blockchain transaction queue is not available"
+        )
+
 @api_router.post("/blockchain/certificates/mint")
-async def mint_certificate(cert_data: CertificateCreate, current_user: dict = Depends(get_current_user)):
-    """Mint a certificate NFT for completed tour"""
+async def mint_certificate(cert_data: CertificateCreate, current_user: dict = Depends(get_token_claims)):
+    """Queue a certificate NFT mint for a completed tour"""
     try:
+        require_submission_queue()
+        
         # Get user's wallet address
         pool = await get_db()
         async with pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cur:
-                    await cur.execute(
-                        "SELECT wallet_address FROM users WHERE id = %s",
-                        (current_user['id'],)
-                    )
-                    user_data = await cur.fetchone()
-                    
-                    if not user_data or not user_data['wallet_address']:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Please connect your wallet first"
-                        )
-                    
-                    # Check if booking exists and is completed
-                    await cur.execute(
-                        "SELECT * FROM bookings WHERE id = %s AND user_id = %s AND status = 'completed'",
-                        (cert_data.booking_id, current_user['id'])
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    "SELECT wallet_address FROM users WHERE id = %s",
+                    (current_user['id'],)
+                )
+                user_data = await cur.fetchone()
+                
+                if not user_data or not user_data['wallet_address']:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Please connect your wallet first"
                     )
-                    booking = await cur.fetchone()
-                    
-                    if not booking:
-                        raise HTTPException(
-                            status_code=404,
-                            detail="Completed booking not found"
-                        )
-                    
-                    # Check if certificate already exists
-                    await cur.execute(
-                        "SELECT id FROM certificates WHERE booking_id = %s",
-                        (cert_data.booking_id,)
+                
+                # Check if booking exists and is completed
+                await cur.execute(
+                    "SELECT * FROM bookings WHERE id = %s AND user_id = %s AND status = 'completed'",
+                    (cert_data.booking_id, current_user['id'])
+                )
+                booking = await cur.fetchone()
+                
+                if not booking:
+                    raise HTTPException(
+                        status_code=404,
+                        detail="Completed booking not found"
                     )
-                    existing_cert = await cur.fetchone()
-                    
-                    if existing_cert:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Certificate already exists for this booking"
-                        )
-                    
-                    # Mint certificate on blockchain
-                    mint_result = await blockchain_service.mint_certificate(
-                        user_wallet=user_data['wallet_address'],
-                        booking_id=cert_data.booking_id,
-                        destination_name=cert_data.destination_name,
-                        certificate_type=cert_data.certificate_type
+                
+                # Check if certificate already exists (unminted failed mints, and pending
+                # ones that were never sent and have no live job, can be retried)
+                await cur.execute("""
+                    SELECT c.id FROM certificates c
+                    WHERE c.booking_id = %s
+                        AND NOT (c.is_minted = FALSE AND (
+                            c.mint_status = 'failed'
+                            OR (c.mint_status = 'pending' AND c.transaction_hash IS NULL AND NOT EXISTS (
+                                SELECT 1 FROM blockchain_jobs j
+                                WHERE j.record_id = c.id AND j.status IN ('queued', 'submitting', 'submitted')
+                            ))
+                        ))
+                """, (cert_data.booking_id,))
+                existing_cert = await cur.fetchone()
+                
+                if existing_cert:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Certificate already exists for this booking"
                     )
-                    
-                    if not mint_result['success']:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to mint certificate: {mint_result['error']}"
-                        )
-                    
-                    # Save certificate to database
-                    cert_id = str(uuid.uuid4())
+                
+                # Save certificate as pending together with its job; the submission
+                # queue fills in the chain data
+                cert_id = str(uuid.uuid4())
+                await conn.begin()
+                try:
                     await cur.execute("""
                         INSERT INTO certificates (
-                            id, user_id, booking_id, certificate_type, nft_token_id,
-                            contract_address, transaction_hash, blockchain_network,
-                            metadata_url, certificate_title, certificate_description,
-                            destination_name, completion_date, is_minted
-                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+                            id, user_id, booking_id, certificate_type,
+                            contract_address, blockchain_network,
+                            certificate_title, certificate_description,
+                            destination_name, completion_date, is_minted, mint_status
+                        ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
                     """, (
                         cert_id, current_user['id'], cert_data.booking_id, cert_data.certificate_type,
-                        mint_result['token_id'], blockchain_service.contracts['certificates'],
-                        mint_result['transaction_hash'], blockchain_service.network,
-                        mint_result['metadata_url'], f"Tourism Certificate - {cert_data.destination_name}",
+                        blockchain_service.contracts['certificates'], blockchain_service.network,
+                        f"Tourism Certificate - {cert_data.destination_name}",
                         f"Certificate of {cert_data.certificate_type} for visiting {cert_data.destination_name}",
-                        cert_data.destination_name, datetime.now().date(), True
+                        cert_data.destination_name, datetime.now().date(), False, 'pending'
                     ))
-                    
-                    # Update booking certificate status
-                    await cur.execute(
-                        "UPDATE bookings SET certificate_issued = %s WHERE id = %s",
-                        (True, cert_data.booking_id)
+                    job = await blockchain_service.submission_queue.create_job(
+                        cur,
+                        'mint_certificate',
+                        record_id=cert_id,
+                        user_id=current_user['id'],
+                        call_args={
+                            'user_wallet': user_data['wallet_address'],
+                            'destination_name': cert_data.destination_name,
+                            'tour_date': datetime.now().strftime("%Y-%m-%d")
+                        },
+                        context={'booking_id': cert_data.booking_id}
                     )
-                    
-                    return {
-                        "success": True,
-                        "certificate_id": cert_id,
-                        "transaction_hash": mint_result['transaction_hash'],
-                        "token_id": mint_result['token_id']
-                    }
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        
+        # Mint certificate on blockchain in the background
+        blockchain_service.submission_queue.enqueue(job)
+        
+        return {
+            "success": True,
+            "certificate_id": cert_id,
+            "job_id": job['job_id'],
+            "status": job['status']
+        }
                     
     except HTTPException:
         raise
@@ -2693,7 +2839,7 @@ async def mint_certificate(cert_data: CertificateCreate, current_user: dict = De
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/blockchain/certificates/my", response_model=List[Certificate])
-async def get_my_certificates(current_user: dict = Depends(get_current_user)):
+async def get_my_certificates(current_user: dict = Depends(get_token_claims)):
     """Get user's certificates"""
     try:
         async with get_db() as pool:
@@ -2710,7 +2856,7 @@ async def get_my_certificates(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/blockchain/loyalty/balance", response_model=LoyaltyPointsBalance)
-async def get_loyalty_balance(current_user: dict = Depends(get_current_user)):
+async def get_loyalty_balance(current_user: dict = Depends(get_token_claims)):
     """Get user's loyalty points balance"""
     try:
         async with get_db() as pool:
@@ -2763,67 +2909,68 @@ async def get_loyalty_balance(current_user: dict = Depends(get_current_user)):
 async def award_loyalty_points(
     booking_id: str, 
     points: int, 
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
-    """Award loyalty points for a booking (internal use)"""
+    """Queue a loyalty points award for a booking (internal use)"""
     try:
+        require_submission_queue()
+        
         # This endpoint would typically be called internally after booking completion
-        async with get_db() as pool:
-            async with pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cur:
-                    # Get user wallet
-                    await cur.execute(
-                        "SELECT wallet_address FROM users WHERE id = %s",
-                        (current_user['id'],)
-                    )
-                    user_data = await cur.fetchone()
-                    
-                    if not user_data or not user_data['wallet_address']:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Please connect your wallet first"
-                        )
-                    
-                    # Award points on blockchain
-                    award_result = await blockchain_service.award_loyalty_points(
-                        user_wallet=user_data['wallet_address'],
-                        points=points,
-                        booking_id=booking_id
+        pool = await get_db()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                # Get user wallet
+                await cur.execute(
+                    "SELECT wallet_address FROM users WHERE id = %s",
+                    (current_user['id'],)
+                )
+                user_data = await cur.fetchone()
+                
+                if not user_data or not user_data['wallet_address']:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Please connect your wallet first"
                     )
-                    
-                    if not award_result['success']:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to award points: {award_result['error']}"
-                        )
-                    
-                    # Update database
-                    await cur.execute("""
-                        UPDATE loyalty_points 
-                        SET points_balance = points_balance + %s, 
-                            total_earned = total_earned + %s,
-                            updated_at = CURRENT_TIMESTAMP
-                        WHERE user_id = %s
-                    """, (points, points, current_user['id']))
-                    
-                    # Log transaction
-                    tx_id = str(uuid.uuid4())
+                
+                # Log transaction as pending with its job; the balance is credited once the award is mined
+                tx_id = str(uuid.uuid4())
+                await conn.begin()
+                try:
                     await cur.execute("""
                         INSERT INTO loyalty_transactions (
                             id, user_id, transaction_type, points_amount, 
-                            booking_id, transaction_hash, description
+                            booking_id, description, blockchain_status
                         ) VALUES (%s, %s, %s, %s, %s, %s, %s)
                     """, (
                         tx_id, current_user['id'], 'earned', points,
-                        booking_id, award_result['transaction_hash'],
-                        f"Points awarded for booking {booking_id}"
+                        booking_id, f"Points awarded for booking {booking_id}", 'pending'
                     ))
-                    
-                    return {
-                        "success": True,
-                        "points_awarded": points,
-                        "transaction_hash": award_result['transaction_hash']
-                    }
+                    job = await blockchain_service.submission_queue.create_job(
+                        cur,
+                        'award_points',
+                        record_id=tx_id,
+                        user_id=current_user['id'],
+                        call_args={
+                            'user_wallet': user_data['wallet_address'],
+                            'points': points,
+                            'booking_id': booking_id
+                        },
+                        context={'booking_id': booking_id, 'points': points}
+                    )
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        
+        # Award points on blockchain in the background
+        blockchain_service.submission_queue.enqueue(job)
+        
+        return {
+            "success": True,
+            "points_awarded": points,
+            "job_id": job['job_id'],
+            "status": job['status']
+        }
                     
     except HTTPException:
         raise
@@ -2834,7 +2981,7 @@ async def award_loyalty_points(
 @api_router.post("/loyalty/redeem")
 async def redeem_loyalty_points(
     redeem_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Redeem loyalty points for booking discount"""
     try:
@@ -2935,104 +3082,148 @@ async def redeem_loyalty_points(
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/loyalty/transactions")
-async def get_loyalty_transactions(current_user: dict = Depends(get_current_user)):
-    """Get user's loyalty transaction history"""
+async def get_loyalty_transactions(
+    cursor: Optional[str] = None,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    current_user: dict = Depends(get_token_claims)
+):
+    """Get user's loyalty transaction history, newest first (pass next_cursor for the next page)"""
     try:
+        try:
+            after_cursor, cursor_params = keyset_condition(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                await cur.execute("""
+                await cur.execute(f"""
                     SELECT * FROM loyalty_transactions 
-                    WHERE user_id = %s 
-                    ORDER BY created_at DESC 
-                    LIMIT 50
-                """, (current_user['id'],))
-                transactions = await cur.fetchall()
+                    WHERE user_id = %s{after_cursor}
+                    ORDER BY created_at DESC, id DESC
+                    LIMIT %s
+                """, [current_user['id']] + cursor_params + [limit + 1])
+                transactions, next_cursor = page_of(await cur.fetchall(), limit)
                 
-                return {"transactions": transactions}
+                return {
+                    "transactions": transactions,
+                    "next_cursor": next_cursor,
+                    "has_more": next_cursor is not None
+                }
                 
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.post("/blockchain/bookings/verify/{booking_id}")
-async def verify_booking_blockchain(booking_id: str, current_user: dict = Depends(get_current_user)):
-    """Verify booking on blockchain"""
+async def verify_booking_blockchain(booking_id: str, current_user: dict = Depends(get_token_claims)):
+    """Queue on-chain verification of a booking"""
     try:
-        async with get_db() as pool:
-            async with pool.acquire() as conn:
-                async with conn.cursor(aiomysql.DictCursor) as cur:
-                    # Get booking details
-                    await cur.execute(
-                        "SELECT * FROM bookings WHERE id = %s AND user_id = %s",
-                        (booking_id, current_user['id'])
-                    )
-                    booking = await cur.fetchone()
-                    
-                    if not booking:
-                        raise HTTPException(status_code=404, detail="Booking not found")
-                    
-                    # Get user wallet
-                    await cur.execute(
-                        "SELECT wallet_address FROM users WHERE id = %s",
-                        (current_user['id'],)
-                    )
-                    user_data = await cur.fetchone()
-                    
-                    if not user_data or not user_data['wallet_address']:
-                        raise HTTPException(
-                            status_code=400,
-                            detail="Please connect your wallet first"
-                        )
-                    
-                    # Verify booking on blockchain
-                    verify_result = await blockchain_service.verify_booking_on_blockchain(
-                        booking_id=booking_id,
-                        booking_data=booking,
-                        user_wallet=user_data['wallet_address']
+        require_submission_queue()
+        
+        pool = await get_db()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                # Get booking details
+                await cur.execute(
+                    "SELECT * FROM bookings WHERE id = %s AND user_id = %s",
+                    (booking_id, current_user['id'])
+                )
+                booking = await cur.fetchone()
+                
+                if not booking:
+                    raise HTTPException(status_code=404, detail="Booking not found")
+                
+                # Get user wallet
+                await cur.execute(
+                    "SELECT wallet_address FROM users WHERE id = %s",
+                    (current_user['id'],)
+                )
+                user_data = await cur.fetchone()
+                
+                if not user_data or not user_data['wallet_address']:
+                    raise HTTPException(
+                        status_code=400,
+                        detail="Please connect your wallet first"
                     )
-                    
-                    if not verify_result['success']:
-                        raise HTTPException(
-                            status_code=500,
-                            detail=f"Failed to verify booking: {verify_result['error']}"
-                        )
-                    
-                    # Save blockchain booking record
-                    blockchain_booking_id = str(uuid.uuid4())
+                
+                # Save blockchain booking record as pending (booking_id is unique, so
+                # re-verifying reuses the row and keeps its id)
+                await conn.begin()
+                try:
                     await cur.execute("""
                         INSERT INTO blockchain_bookings (
                             id, booking_id, user_wallet, booking_hash,
-                            contract_address, transaction_hash, verification_status,
+                            contract_address, verification_status, transaction_status,
                             blockchain_network
                         ) VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+                        ON DUPLICATE KEY UPDATE
+                            user_wallet = VALUES(user_wallet),
+                            transaction_hash = NULL,
+                            verification_status = VALUES(verification_status),
+                            transaction_status = VALUES(transaction_status)
                     """, (
-                        blockchain_booking_id, booking_id, user_data['wallet_address'],
-                        verify_result['booking_hash'], blockchain_service.contracts['booking'],
-                        verify_result['transaction_hash'], 'verified', blockchain_service.network
-                    ))
-                    
-                    # Update booking blockchain status
-                    await cur.execute("""
-                        UPDATE bookings 
-                        SET blockchain_verified = %s, blockchain_hash = %s, 
-                            smart_contract_address = %s, certificate_eligible = %s
-                        WHERE id = %s
-                    """, (
-                        True, verify_result['booking_hash'], 
-                        blockchain_service.contracts['booking'], True, booking_id
+                        str(uuid.uuid4()), booking_id, user_data['wallet_address'], '',
+                        blockchain_service.contracts['booking'], 'pending', 'pending',
+                        blockchain_service.network
                     ))
+                    await cur.execute("SELECT id FROM blockchain_bookings WHERE booking_id = %s", (booking_id,))
+                    blockchain_booking_id = (await cur.fetchone())['id']
                     
-                    return {
-                        "success": True,
-                        "booking_hash": verify_result['booking_hash'],
-                        "transaction_hash": verify_result['transaction_hash']
-                    }
+                    job = await blockchain_service.submission_queue.create_job(
+                        cur,
+                        'verify_booking',
+                        record_id=blockchain_booking_id,
+                        user_id=current_user['id'],
+                        call_args={
+                            'booking_id': booking_id,
+                            'booking_data': {
+                                'destination_name': booking['destination_name'],
+                                'total_price': float(booking['total_price'] or 0)
+                            },
+                            'user_wallet': user_data['wallet_address']
+                        },
+                        context={'booking_id': booking_id}
+                    )
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
+        
+        # Verify booking on blockchain in the background
+        blockchain_service.submission_queue.enqueue(job)
+        
+        return {
+            "success": True,
+            "blockchain_booking_id": blockchain_booking_id,
+            "job_id": job['job_id'],
+            "status": job['status']
+        }
                     
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@api_router.get("/blockchain/jobs/{job_id}")
+async def get_blockchain_job(job_id: str, current_user: dict = Depends(get_token_claims)):
+    """Status of a queued blockchain transaction"""
+    try:
+        pool = await get_db()
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                job = await blockchain_service.submission_queue.load_job(cur, job_id)
+        
+        if not job or (job['user_id'] != current_user['id'] and current_user['role'] != 'admin'):
+            raise HTTPException(status_code=404, detail="Job not found")
+        return blockchain_service.submission_queue.public_view(job)
+        
+    except HTTPException:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
 @api_router.get("/blockchain/gas/estimate/{operation}")
 async def estimate_gas_cost(operation: str):
     """Estimate gas cost for blockchain operations"""
@@ -3040,7 +3231,7 @@ async def estimate_gas_cost(operation: str):
         if operation not in ['mint_certificate', 'award_points', 'redeem_points', 'verify_booking', 'verify_review']:
             raise HTTPException(status_code=400, detail="Invalid operation")
         
-        estimate = blockchain_service.estimate_gas_cost(operation)
+        estimate = await blockchain_service.estimate_gas_cost(operation)
         return estimate
         
     except HTTPException:
@@ -3050,7 +3241,7 @@ async def estimate_gas_cost(operation: str):
 
 # Additional blockchain endpoints that frontend expects
 @api_router.get("/blockchain/certificates")
-async def get_certificates(current_user: dict = Depends(get_current_user)):
+async def get_certificates(current_user: dict = Depends(get_token_claims)):
     """Get user's certificates (alias for /blockchain/certificates/my)"""
     try:
         pool = await get_db()
@@ -3067,7 +3258,7 @@ async def get_certificates(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/blockchain/loyalty/points")  
-async def get_loyalty_points(current_user: dict = Depends(get_current_user)):
+async def get_loyalty_points(current_user: dict = Depends(get_token_claims)):
     """Get user's loyalty points (alias for /blockchain/loyalty/balance)"""
     try:
         pool = await get_db()
@@ -3117,7 +3308,7 @@ async def get_loyalty_points(current_user: dict = Depends(get_current_user)):
         raise HTTPException(status_code=500, detail=str(e))
 
 @api_router.get("/blockchain/bookings/status/{booking_id}")
-async def get_booking_blockchain_status(booking_id: str, current_user: dict = Depends(get_current_user)):
+async def get_booking_blockchain_status(booking_id: str, current_user: dict = Depends(get_token_claims)):
     """Get blockchain verification status for a booking"""
     try:
         pool = await get_db()
@@ -3167,7 +3358,7 @@ async def get_booking_blockchain_status(booking_id: str, current_user: dict = De
 @api_router.post("/blockchain/loyalty/redeem")
 async def redeem_blockchain_points(
     redeem_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Redeem loyalty points for booking discount (blockchain version)"""
     try:
@@ -3270,7 +3461,7 @@ async def redeem_blockchain_points(
 @api_router.post("/blockchain/reviews/verify")
 async def verify_review_blockchain(
     review_data: dict,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_token_claims)
 ):
     """Verify review on blockchain"""
     try:
@@ -3362,8 +3553,31 @@ app.include_router(api_router)
 
 @app.on_event("startup")
 async def startup_event():
+    password_hasher.start()
     await init_db()
     await create_missing_tables()
+    # Token version floors checked by every authenticated request; without them
+    # revoked tokens would be accepted, so a failure here stops startup
+    async with db_pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await token_revocations.ensure_schema(cur)
+            await token_revocations.load(cur)
+    try:
+        await destination_catalog.reload(db_pool)
+    except Exception as e:
+        # Loaded lazily on the first catalog request
+        print(f"Error warming destination catalog: {e}")
+    try:
+        warmed = await itinerary_cache.prewarm(db_pool)
+        print(f"Pre-warmed {warmed} cached itineraries")
+    except Exception as e:
+        print(f"Error pre-warming itinerary cache: {e}")
+    await blockchain_service.submission_queue.start(db_pool)
+    await blockchain_service.event_indexer.start(db_pool)
+    blockchain_service.gas_oracle.start()
+    await chat_log_writer.start(db_pool)
+    await itinerary_writer.start(db_pool)
+    rating_aggregates.start(db_pool)
     print("Database connection initialized and tables created")
 
 async def create_missing_tables():
@@ -3429,6 +3643,20 @@ async def create_missing_tables():
                     )
                 """)
                 
+                # Keyset pagination indexes for chat history, loyalty transactions and admin bookings
+                for index_name, index_def in (
+                    ('idx_chat_logs_session_page', 'chat_logs(user_id, session_id, created_at, id)'),
+                    ('idx_loyalty_transactions_page', 'loyalty_transactions(user_id, created_at, id)'),
+                    ('idx_bookings_created_page', 'bookings(created_at, id)'),
+                    ('idx_bookings_status_page', 'bookings(status, created_at, id)'),
+                    ('idx_bookings_provider_page', 'bookings(provider_id, created_at, id)'),
+                ):
+                    try:
+                        await cur.execute(f"CREATE INDEX {index_name} ON {index_def}")
+                    except Exception as idx_e:
+                        if "Duplicate key name" not in str(idx_e):
+                            print(f"Warning: Could not create index {index_name}: {str(idx_e)}")
+                
                 # Update itineraries table structure if needed
                 await cur.execute("""
                     CREATE TABLE IF NOT EXISTS itineraries (
@@ -3446,6 +3674,26 @@ async def create_missing_tables():
                     )
                 """)
                 
+                # Status columns written back by the blockchain submission queue
+                await blockchain_service.submission_queue.ensure_schema(cur)
+                await blockchain_service.event_indexer.ensure_schema(cur)
+                
+                # Cache key lookups for /planner
+                await itinerary_cache.ensure_schema(cur)
+                
+                # FULLTEXT indexes behind marketplace search
+                await ensure_search_indexes(cur)
+                
+                # Snapshot rows behind the artisan/provider marketplace dashboards
+                await seller_dashboards.ensure_schema(cur)
+                
+                # Rating aggregates behind /providers and /reviews writes
+                await rating_aggregates.ensure_schema(cur)
+                
+                # Monthly rollups behind /admin/stats
+                await admin_stats_service.ensure_schema(cur)
+                await admin_stats_service.rebuild_if_empty(cur)
+                
                 print("Missing tables created successfully")
     except Exception as e:
         print(f"Error creating tables: {str(e)}")
@@ -3453,8 +3701,17 @@ async def create_missing_tables():
 @app.on_event("shutdown")  
 async def shutdown_event():
     global db_pool
+    # Flush buffered chat and itinerary rows while the pool is still open
+    await chat_log_writer.stop()
+    await itinerary_writer.stop()
+    await rating_aggregates.stop()
+    await blockchain_service.submission_queue.stop()
+    await blockchain_service.event_indexer.stop()
+    await blockchain_service.gas_oracle.stop()
     if db_pool:
         db_pool.close()
         await db_pool.wait_closed()
+    blockchain_service.close()
+    password_hasher.close()
     print("Database connection closed")
     
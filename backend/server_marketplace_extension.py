@@ -7,6 +7,11 @@ from models.marketplace_models_updated import (
     CulturalEventCreate, CulturalEventUpdate, CulturalEvent,
     HandicraftCategory, EventType, OrderStatus, PaymentStatus
 )
+from services.marketplace_search import (
+    search_condition, price_bucket_sql, build_facets, listing_total, invalidate_listing_counts
+)
+from services.pagination import keyset_after, keyset_page_of
+from services.dashboard_service import seller_dashboards
 
 # Add these helper functions after get_current_user function
 
@@ -28,79 +33,18 @@ async def get_artisan_dashboard(current_user: dict = Depends(get_current_user)):
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                # Get artisan's handicrafts stats
-                await cur.execute("""
-                    SELECT 
-                        COUNT(*) as total_products,
-                        COALESCE(SUM(CASE WHEN is_available = 1 THEN 1 ELSE 0 END), 0) as active_products,
-                        COALESCE(SUM(CASE WHEN stock_quantity <= 5 AND stock_quantity > 0 THEN 1 ELSE 0 END), 0) as low_stock_items,
-                        COALESCE(AVG(rating), 0) as avg_rating,
-                        COALESCE(SUM(total_reviews), 0) as total_reviews
-                    FROM handicrafts 
-                    WHERE seller_id = %s
-                """, (current_user['id'],))
-                
-                handicrafts_stats = await cur.fetchone()
-                
-                # Get artisan's events stats
-                await cur.execute("""
-                    SELECT 
-                        COUNT(*) as total_events,
-                        COALESCE(SUM(CASE WHEN is_active = 1 AND start_date > NOW() THEN 1 ELSE 0 END), 0) as upcoming_events,
-                        COALESCE(SUM(CASE WHEN start_date < NOW() AND end_date > NOW() THEN 1 ELSE 0 END), 0) as ongoing_events
-                    FROM cultural_events 
-                    WHERE organizer_id = %s
-                """, (current_user['id'],))
-                
-                events_stats = await cur.fetchone()
-                
-                # Get orders stats for this month
-                await cur.execute("""
-                    SELECT 
-                        COUNT(*) as total_orders,
-                        COALESCE(SUM(total_price), 0) as total_revenue,
-                        COALESCE(COUNT(CASE WHEN status = 'pending' THEN 1 END), 0) as pending_orders,
-                        COALESCE(COUNT(CASE WHEN status = 'delivered' THEN 1 END), 0) as completed_orders
-                    FROM handicraft_orders 
-                    WHERE seller_id = %s AND MONTH(order_date) = MONTH(NOW()) AND YEAR(order_date) = YEAR(NOW())
-                """, (current_user['id'],))
-                
-                orders_stats = await cur.fetchone()
-                
-                # Get recent orders (last 5)
-                await cur.execute("""
-                    SELECT ho.*, h.name as product_name, u.name as buyer_name
-                    FROM handicraft_orders ho
-                    JOIN handicrafts h ON ho.handicraft_id = h.id
-                    JOIN users u ON ho.user_id = u.id
-                    WHERE ho.seller_id = %s
-                    ORDER BY ho.order_date DESC
-                    LIMIT 5
-                """, (current_user['id'],))
-                
-                recent_orders = await cur.fetchall()
-                
-                # Get recent event bookings (last 5)
-                await cur.execute("""
-                    SELECT eb.*, e.title as event_title, u.name as participant_name
-                    FROM event_bookings eb
-                    JOIN cultural_events e ON eb.event_id = e.id
-                    JOIN users u ON eb.user_id = u.id
-                    WHERE eb.organizer_id = %s
-                    ORDER BY eb.booking_date DESC
-                    LIMIT 5
-                """, (current_user['id'],))
-                
-                recent_bookings = await cur.fetchall()
+                # Single primary-key read; rebuilt only after writes or when it ages out
+                snapshot = await seller_dashboards.get(cur, current_user['id'])
                 
                 return {
                     "success": True,
                     "data": {
-                        "handicrafts_stats": handicrafts_stats,
-                        "events_stats": events_stats,
-                        "orders_stats": orders_stats,
-                        "recent_orders": recent_orders,
-                        "recent_bookings": recent_bookings,
+                        "handicrafts_stats": snapshot['handicrafts_stats'],
+                        "events_stats": snapshot['events_stats'],
+                        "orders_stats": snapshot['orders_stats'],
+                        "recent_orders": snapshot['recent_orders'],
+                        "recent_bookings": snapshot['recent_bookings'],
+                        "snapshot_at": snapshot['snapshot_at'],
                         "artisan_info": {
                             "id": current_user['id'],
                             "name": current_user['name'],
@@ -211,6 +155,9 @@ async def create_handicraft(
                     handicraft_data.is_featured
                 ))
                 
+                invalidate_listing_counts('handicrafts')
+                await seller_dashboards.invalidate(cur, current_user['id'])
+                
                 return {
                     "success": True,
                     "message": "Handicraft created successfully",
@@ -275,6 +222,8 @@ async def update_handicraft(
                     SET {', '.join(update_fields)} 
                     WHERE id = %s
                 """, params)
+                invalidate_listing_counts('handicrafts')
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 return {
                     "success": True,
@@ -305,6 +254,8 @@ async def delete_handicraft(
                 
                 if cur.rowcount == 0:
                     raise HTTPException(status_code=404, detail="Handicraft not found or access denied")
+                invalidate_listing_counts('handicrafts')
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 return {
                     "success": True,
@@ -415,6 +366,8 @@ async def create_event(
                     json.dumps(event_data.tags) if event_data.tags else None,
                     event_data.is_featured
                 ))
+                invalidate_listing_counts('cultural_events')
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 return {
                     "success": True,
@@ -516,6 +469,7 @@ async def update_order_status(
                 
                 if cur.rowcount == 0:
                     raise HTTPException(status_code=404, detail="Order not found or access denied")
+                await seller_dashboards.invalidate(cur, current_user['id'])
                 
                 return {
                     "success": True,
@@ -605,23 +559,50 @@ async def get_artisan_analytics(
 
 @api_router.get("/marketplace/handicrafts")
 async def get_marketplace_handicrafts(
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     category: Optional[str] = Query(None),
     min_price: Optional[float] = Query(None),
     max_price: Optional[float] = Query(None),
-    search: Optional[str] = Query(None)
+    search: Optional[str] = Query(None),
+    total_mode: str = Query("cached", pattern="^(cached|estimate)$")
 ):
-    """Get handicrafts from marketplace (public endpoint)"""
+    """Get handicrafts from marketplace (public endpoint)
+
+    search matches name, description and materials through the FULLTEXT index,
+    with prefix matching on every word; results are then ranked by relevance.
+    Pages are keyset-paginated: pass next_cursor back as cursor. facets holds
+    counts by category and price bucket and is only computed for the first page.
+    """
     try:
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                offset = (page - 1) * limit
+                # Search predicate shared by the listing and the facet counts
+                search_conditions = ["h.is_available = 1"]
+                search_params = []
+                relevance = "0"
+                relevance_params = []
+                
+                if search:
+                    match_sql, match_params = search_condition("h.name, h.description, h.materials", search)
+                    search_conditions.append(match_sql)
+                    search_params.extend(match_params)
+                    if match_sql.startswith("MATCH"):
+                        # Fixed-precision relevance so the cursor can compare it exactly
+                        relevance = f"CAST({match_sql} AS DECIMAL(20,6))"
+                        relevance_params = match_params
+                
+                # Keyset order: relevance first when ranking a search
+                order_columns = [('h.is_featured', 'DESC'), ('h.created_at', 'DESC'), ('h.id', 'DESC')]
+                key_fields = ['is_featured', 'created_at', 'id']
+                if relevance_params:
+                    order_columns.insert(0, (relevance, 'DESC', relevance_params))
+                    key_fields.insert(0, 'relevance')
                 
                 # Build query with filters
-                where_conditions = ["h.is_available = 1"]
-                params = []
+                where_conditions = list(search_conditions)
+                params = list(search_params)
                 
                 if category:
                     where_conditions.append("h.category = %s")
@@ -635,62 +616,81 @@ async def get_marketplace_handicrafts(
                     where_conditions.append("h.price <= %s")
                     params.append(max_price)
                 
-                if search:
-                    where_conditions.append("(h.name LIKE %s OR h.description LIKE %s)")
-                    params.extend([f"%{search}%", f"%{search}%"])
-                
                 where_clause = "WHERE " + " AND ".join(where_conditions)
                 
-                # Get total count
-                await cur.execute(f"""
-                    SELECT COUNT(*) as total FROM handicrafts h 
-                    {where_clause}
-                """, params)
-                
-                total_result = await cur.fetchone()
-                total = total_result['total'] if total_result else 0
+                try:
+                    after_cursor, cursor_params = keyset_after(order_columns, cursor)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
                 
-                # Get handicrafts with pagination
-                query_params = params + [limit, offset]
+                # Get one page of handicrafts after the cursor
+                order_by = "h.is_featured DESC, h.created_at DESC, h.id DESC"
+                if relevance_params:
+                    order_by = "relevance DESC, " + order_by
                 await cur.execute(f"""
-                    SELECT h.*, u.name as artisan_name
+                    SELECT h.*, u.name as artisan_name, {relevance} as relevance
                     FROM handicrafts h
                     JOIN users u ON h.seller_id = u.id
-                    {where_clause}
-                    ORDER BY h.is_featured DESC, h.created_at DESC
-                    LIMIT %s OFFSET %s
-                """, query_params)
-                
-                handicrafts = await cur.fetchall()
+                    {where_clause}{after_cursor}
+                    ORDER BY {order_by}
+                    LIMIT %s
+                """, relevance_params + params + cursor_params + [limit + 1])
+                
+                handicrafts, next_cursor = keyset_page_of(await cur.fetchall(), limit, key_fields)
+                
+                total = await listing_total(
+                    cur, 'handicrafts', f"FROM handicrafts h {where_clause}", params,
+                    (category, min_price, max_price, search), estimate=total_mode == "estimate"
+                )
+                
+                facets = None
+                if not cursor:
+                    # Faceted counts by category and price bucket
+                    await cur.execute(f"""
+                        SELECT h.category, {price_bucket_sql('h.price')} as price_bucket, COUNT(*) as count
+                        FROM handicrafts h
+                        WHERE {' AND '.join(search_conditions)}
+                        GROUP BY h.category, price_bucket
+                    """, search_params)
+                    facets = build_facets(await cur.fetchall(), category)
                 
                 return {
                     "success": True,
                     "data": {
                         "items": handicrafts,
                         "total": total,
-                        "page": page,
+                        "total_is_estimate": total_mode == "estimate",
                         "limit": limit,
-                        "pages": (total + limit - 1) // limit if total > 0 else 1
+                        "next_cursor": next_cursor,
+                        "has_more": next_cursor is not None,
+                        "facets": facets
                     }
                 }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching marketplace handicrafts: {str(e)}")
 
 @api_router.get("/marketplace/events")
 async def get_marketplace_events(
-    page: int = Query(1, ge=1),
+    cursor: Optional[str] = Query(None),
     limit: int = Query(20, ge=1, le=100),
     event_type: Optional[str] = Query(None),
-    location: Optional[str] = Query(None)
+    location: Optional[str] = Query(None),
+    search: Optional[str] = Query(None),
+    total_mode: str = Query("cached", pattern="^(cached|estimate)$")
 ):
-    """Get cultural events from marketplace (public endpoint)"""
+    """Get cultural events from marketplace (public endpoint)
+
+    location and search go through FULLTEXT indexes (location alone, and
+    title/description/location respectively) with prefix matching. Pages are
+    keyset-paginated on (is_featured, start_date, id).
+    """
     try:
         pool = await get_db()
         async with pool.acquire() as conn:
             async with conn.cursor(aiomysql.DictCursor) as cur:
-                offset = (page - 1) * limit
-                
                 # Build query with filters
                 where_conditions = ["e.is_active = 1", "e.start_date > NOW()"]
                 params = []
@@ -700,44 +700,55 @@ async def get_marketplace_events(
                     params.append(event_type)
                 
                 if location:
-                    where_conditions.append("e.location LIKE %s")
-                    params.append(f"%{location}%")
+                    match_sql, match_params = search_condition("e.location", location)
+                    where_conditions.append(match_sql)
+                    params.extend(match_params)
                 
-                where_clause = "WHERE " + " AND ".join(where_conditions)
+                if search:
+                    match_sql, match_params = search_condition("e.title, e.description, e.location", search)
+                    where_conditions.append(match_sql)
+                    params.extend(match_params)
                 
-                # Get total count
-                await cur.execute(f"""
-                    SELECT COUNT(*) as total FROM cultural_events e 
-                    {where_clause}
-                """, params)
+                where_clause = "WHERE " + " AND ".join(where_conditions)
                 
-                total_result = await cur.fetchone()
-                total = total_result['total'] if total_result else 0
+                try:
+                    after_cursor, cursor_params = keyset_after(
+                        [('e.is_featured', 'DESC'), ('e.start_date', 'ASC'), ('e.id', 'ASC')], cursor
+                    )
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
                 
-                # Get events with pagination
-                query_params = params + [limit, offset]
+                # Get one page of events after the cursor
                 await cur.execute(f"""
                     SELECT e.*, u.name as organizer_name
                     FROM cultural_events e
                     JOIN users u ON e.organizer_id = u.id
-                    {where_clause}
-                    ORDER BY e.is_featured DESC, e.start_date ASC
-                    LIMIT %s OFFSET %s
-                """, query_params)
+                    {where_clause}{after_cursor}
+                    ORDER BY e.is_featured DESC, e.start_date ASC, e.id ASC
+                    LIMIT %s
+                """, params + cursor_params + [limit + 1])
                 
-                events = await cur.fetchall()
+                events, next_cursor = keyset_page_of(await cur.fetchall(), limit, ['is_featured', 'start_date', 'id'])
+                
+                total = await listing_total(
+                    cur, 'cultural_events', f"FROM cultural_events e {where_clause}", params,
+                    (event_type, location, search), estimate=total_mode == "estimate"
+                )
                 
                 return {
                     "success": True,
                     "data": {
                         "items": events,
                         "total": total,
-                        "page": page,
+                        "total_is_estimate": total_mode == "estimate",
                         "limit": limit,
-                        "pages": (total + limit - 1) // limit if total > 0 else 1
+                        "next_cursor": next_cursor,
+                        "has_more": next_cursor is not None
                     }
                 }
     
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error fetching marketplace events: {str(e)}")
 
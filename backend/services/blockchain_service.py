@@ -1,157 +1,1220 @@
 import os
 import json
+import time
 import uuid
+import heapq
 import hashlib
 import asyncio
+import statistics
+import functools
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, date
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, List, NamedTuple
 from decimal import Decimal
 
+import aiomysql
+import eth_abi
 from web3 import Web3
 from web3.exceptions import TransactionNotFound, ContractLogicError
 from eth_account import Account
+from eth_utils import event_abi_to_log_topic, function_abi_to_4byte_selector
 from hexbytes import HexBytes
 from dotenv import load_dotenv
 
 load_dotenv()
 
-class BlockchainEventMonitor:
-    """Real-time blockchain event monitoring for data synchronization"""
+# Certificate NFT contract ABI - CORRECTED to match deployed contract
+CERTIFICATE_ABI = [
+    {
+        "inputs": [
+            {"name": "_tourist", "type": "address"},
+            {"name": "_destination", "type": "string"},
+            {"name": "_tourDate", "type": "string"}
+        ],
+        "name": "mintCertificate",
+        "outputs": [{"name": "", "type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_user", "type": "address"}],
+        "name": "getUserCertificates",
+        "outputs": [{"type": "uint256[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_user", "type": "address"}],
+        "name": "getUserCertificateCount",
+        "outputs": [{"type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_tokenId", "type": "uint256"}],
+        "name": "getCertificate",
+        "outputs": [{
+            "components": [
+                {"name": "tokenId", "type": "uint256"},
+                {"name": "tourist", "type": "address"},
+                {"name": "destination", "type": "string"},
+                {"name": "tourDate", "type": "string"},
+                {"name": "issuedDate", "type": "uint256"},
+                {"name": "isActive", "type": "bool"}
+            ],
+            "type": "tuple"
+        }],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_tokenId", "type": "uint256"}],
+        "name": "isCertificateValid",
+        "outputs": [{"type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "tokenId", "type": "uint256"},
+            {"indexed": True, "name": "tourist", "type": "address"},
+            {"indexed": False, "name": "destination", "type": "string"}
+        ],
+        "name": "CertificateIssued",
+        "type": "event"
+    }
+]
+
+# Loyalty points contract ABI - CORRECTED to match deployed contract
+LOYALTY_ABI = [
+    {
+        "inputs": [
+            {"name": "_user", "type": "address"},
+            {"name": "_bookingAmount", "type": "uint256"},
+            {"name": "_description", "type": "string"}
+        ],
+        "name": "earnPoints",
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [
+            {"name": "_user", "type": "address"},
+            {"name": "_pointsToRedeem", "type": "uint256"},
+            {"name": "_description", "type": "string"}
+        ],
+        "name": "redeemPoints",
+        "outputs": [{"type": "uint256"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_user", "type": "address"}],
+        "name": "getPointBalance",
+        "outputs": [{"type": "uint256"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_user", "type": "address"}],
+        "name": "getUserTransactions",
+        "outputs": [{
+            "components": [
+                {"name": "user", "type": "address"},
+                {"name": "amount", "type": "int256"},
+                {"name": "transactionType", "type": "string"},
+                {"name": "description", "type": "string"},
+                {"name": "timestamp", "type": "uint256"}
+            ],
+            "type": "tuple[]"
+        }],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_user", "type": "address"}],
+        "name": "getUserStats",
+        "outputs": [
+            {"name": "balance", "type": "uint256"},
+            {"name": "earned", "type": "uint256"},
+            {"name": "redeemed", "type": "uint256"},
+            {"name": "transactionCount", "type": "uint256"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_points", "type": "uint256"}],
+        "name": "calculateDiscountValue",
+        "outputs": [{"type": "uint256"}],
+        "stateMutability": "pure",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "user", "type": "address"},
+            {"indexed": False, "name": "amount", "type": "uint256"},
+            {"indexed": False, "name": "description", "type": "string"}
+        ],
+        "name": "PointsEarned",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "user", "type": "address"},
+            {"indexed": False, "name": "amount", "type": "uint256"},
+            {"indexed": False, "name": "description", "type": "string"}
+        ],
+        "name": "PointsRedeemed",
+        "type": "event"
+    }
+]
+
+# Booking verification contract ABI - CORRECTED to match deployed contract
+BOOKING_ABI = [
+    {
+        "inputs": [
+            {"name": "_tourist", "type": "address"},
+            {"name": "_provider", "type": "address"},
+            {"name": "_destination", "type": "string"},
+            {"name": "_amount", "type": "uint256"},
+            {"name": "_bookingDate", "type": "uint256"},
+            {"name": "_ipfsHash", "type": "string"}
+        ],
+        "name": "verifyBooking",
+        "outputs": [{"type": "bytes32"}],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_bookingHash", "type": "bytes32"}],
+        "name": "isBookingValid",
+        "outputs": [{"type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_bookingHash", "type": "bytes32"}],
+        "name": "getBookingDetails",
+        "outputs": [
+            {"name": "tourist", "type": "address"},
+            {"name": "provider", "type": "address"},
+            {"name": "destination", "type": "string"},
+            {"name": "amount", "type": "uint256"},
+            {"name": "bookingDate", "type": "uint256"},
+            {"name": "verificationDate", "type": "uint256"},
+            {"name": "status", "type": "uint8"},
+            {"name": "ipfsHash", "type": "string"}
+        ],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_tourist", "type": "address"}],
+        "name": "getTouristBookings",
+        "outputs": [{"type": "bytes32[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "_provider", "type": "address"}],
+        "name": "getProviderBookings",
+        "outputs": [{"type": "bytes32[]"}],
+        "stateMutability": "view",
+        "type": "function"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "bookingHash", "type": "bytes32"},
+            {"indexed": True, "name": "tourist", "type": "address"},
+            {"indexed": True, "name": "provider", "type": "address"}
+        ],
+        "name": "BookingCreated",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "bookingHash", "type": "bytes32"},
+            {"indexed": True, "name": "verifier", "type": "address"}
+        ],
+        "name": "BookingVerified",
+        "type": "event"
+    },
+    {
+        "anonymous": False,
+        "inputs": [
+            {"indexed": True, "name": "bookingHash", "type": "bytes32"}
+        ],
+        "name": "BookingCompleted",
+        "type": "event"
+    }
+]
+
+# Reviews verification contract ABI
+REVIEWS_ABI = [
+    {
+        "inputs": [
+            {"name": "reviewId", "type": "string"},
+            {"name": "reviewHash", "type": "bytes32"},
+            {"name": "user", "type": "address"},
+            {"name": "destinationId", "type": "string"}
+        ],
+        "name": "verifyReview", 
+        "outputs": [],
+        "stateMutability": "nonpayable",
+        "type": "function"
+    },
+    {
+        "inputs": [{"name": "reviewId", "type": "string"}],
+        "name": "isReviewVerified",
+        "outputs": [{"type": "bool"}],
+        "stateMutability": "view",
+        "type": "function"
+    }
+]
+
+# Contract name -> ABI for tourism functions
+CONTRACT_ABIS = {
+    'certificates': CERTIFICATE_ABI,
+    'loyalty': LOYALTY_ABI,
+    'booking': BOOKING_ABI,
+    'reviews': REVIEWS_ABI
+}
+
+# Contract name -> environment variable holding its deployed address
+CONTRACT_ADDRESS_ENV = {
+    'certificates': 'CONTRACT_ADDRESS_CERTIFICATES',
+    'loyalty': 'CONTRACT_ADDRESS_LOYALTY',
+    'booking': 'CONTRACT_ADDRESS_BOOKING',
+    'reviews': 'CONTRACT_ADDRESS_REVIEWS'
+}
+
+class EncodedCall(NamedTuple):
+    """Contract call with its calldata already ABI-encoded"""
+    to: str
+    data: str
+
+class CachedContract:
+    """web3 contract built once per (name, address) with selectors precomputed
+
+    Holds the checksummed address, the contract object for reads and event
+    decoding, and each function's 4-byte selector and input types so
+    transaction calldata can be encoded without re-deriving them per call.
+    """
+    
+    def __init__(self, w3: Web3, name: str, raw_address: str, abi: List[Dict]):
+        self.name = name
+        self.raw_address = raw_address
+        self.abi = abi
+        self.address = Web3.to_checksum_address(raw_address)
+        self.contract = w3.eth.contract(address=self.address, abi=abi)
+        self.selectors: Dict[str, bytes] = {}
+        self.input_types: Dict[str, List[str]] = {}
+        for item in abi:
+            if item.get('type') == 'function':
+                self.selectors[item['name']] = function_abi_to_4byte_selector(item)
+                self.input_types[item['name']] = [arg['type'] for arg in item.get('inputs', [])]
+    
+    @property
+    def functions(self):
+        return self.contract.functions
+    
+    @property
+    def events(self):
+        return self.contract.events
+    
+    def encode(self, function_name: str, *args) -> EncodedCall:
+        """ABI-encode a function call against the precomputed selector"""
+        types = self.input_types[function_name]
+        # Accept hex strings for bytes arguments the way ContractFunction does
+        values = [
+            HexBytes(value) if abi_type.startswith('bytes') and isinstance(value, str) else value
+            for abi_type, value in zip(types, args)
+        ]
+        data = self.selectors[function_name] + eth_abi.encode(types, values)
+        return EncodedCall(to=self.address, data=Web3.to_hex(data))
+
+class BlockchainEventIndexer:
+    """Checkpointed indexer for tourism contract events
+
+    Scans block ranges with a single eth_getLogs call covering every contract
+    address and event topic, applies the decoded events to certificates,
+    blockchain_bookings and loyalty_transactions in bulk, and stores the last
+    processed block in blockchain_sync_state in the same transaction. After a
+    restart the indexer resumes from the checkpoint, so downtime is backfilled
+    by range scans instead of being lost.
+    """
+    
+    CHECKPOINT_KEY = 'tourism_contracts'
     
-    def __init__(self, blockchain_service, db_pool):
+    def __init__(self, blockchain_service):
         self.blockchain_service = blockchain_service
-        self.db_pool = db_pool
         self.w3 = blockchain_service.w3
+        self.db_pool = None
+        self.enabled = os.getenv('BLOCKCHAIN_INDEXER_ENABLED', 'true').lower() == 'true'
+        self.batch_blocks = int(os.getenv('BLOCKCHAIN_INDEXER_BATCH_BLOCKS', 2000))
+        self.confirmations = int(os.getenv('BLOCKCHAIN_INDEXER_CONFIRMATIONS', 3))
+        self.poll_interval = float(os.getenv('BLOCKCHAIN_INDEXER_POLL_SECONDS', 15))
+        self.start_block = os.getenv('BLOCKCHAIN_INDEXER_START_BLOCK')
+        self.last_block: Optional[int] = None
         self.running = False
-        
-    async def start_monitoring(self):
-        """Start monitoring blockchain events"""
+        self._task: Optional[asyncio.Task] = None
+    
+    async def ensure_schema(self, cur):
+        """Create the checkpoint table"""
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS blockchain_sync_state (
+                sync_key VARCHAR(64) PRIMARY KEY,
+                last_block BIGINT UNSIGNED NOT NULL,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+    
+    async def start(self, db_pool):
+        """Start indexing in the background when contracts are configured"""
+        if not self.enabled or self._task:
+            return
+        if not any(self.blockchain_service.contracts.values()):
+            print("Blockchain indexer disabled: no contract addresses configured")
+            return
+        self.db_pool = db_pool
         self.running = True
-        await asyncio.gather(
-            self.monitor_certificate_events(),
-            self.monitor_loyalty_events(),
-            self.monitor_booking_events()
-        )
+        self._task = asyncio.create_task(self._run())
     
-    async def stop_monitoring(self):
-        """Stop monitoring blockchain events"""
+    async def stop(self):
         self.running = False
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
     
-    async def monitor_certificate_events(self):
-        """Monitor certificate minting events"""
-        try:
-            contract = self.w3.eth.contract(
-                address=self.blockchain_service.contracts['certificates'],
-                abi=self.blockchain_service.contract_abis['certificates']
-            )
-            
-            # Create event filter for CertificateIssued events
-            event_filter = contract.events.CertificateIssued.createFilter(fromBlock='latest')
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'running': self.running,
+            'last_block': self.last_block,
+            'batch_blocks': self.batch_blocks,
+            'confirmations': self.confirmations
+        }
+    
+    def _event_map(self) -> Dict[tuple, tuple]:
+        """(contract address, topic0) -> (contract name, ContractEvent) for every indexed event"""
+        events = {}
+        for name in CONTRACT_ABIS:
+            try:
+                cached = self.blockchain_service.get_contract(name)
+            except Exception:
+                continue
+            for item in cached.abi:
+                if item.get('type') != 'event':
+                    continue
+                topic = Web3.to_hex(event_abi_to_log_topic(item))
+                events[(cached.address.lower(), topic)] = (name, getattr(cached.events, item['name'])())
+        return events
+    
+    async def _load_checkpoint(self) -> int:
+        async with self.db_pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute(
+                    "SELECT last_block FROM blockchain_sync_state WHERE sync_key = %s",
+                    (self.CHECKPOINT_KEY,)
+                )
+                row = await cur.fetchone()
+        if row:
+            return int(row['last_block'])
+        if self.start_block:
+            return int(self.start_block) - 1
+        # First run without a configured start block: index from the current head
+        head = await self.blockchain_service._run_rpc(lambda: self.w3.eth.block_number)
+        return max(head - self.confirmations, 0)
+    
+    async def _run(self):
+        while self.running:
+            try:
+                if self.last_block is None:
+                    self.last_block = await self._load_checkpoint()
+                
+                head = await self.blockchain_service._run_rpc(lambda: self.w3.eth.block_number)
+                safe_head = head - self.confirmations
+                
+                # Catch up range by range; each range is one get_logs call and one DB transaction
+                while self.running and self.last_block < safe_head:
+                    from_block = self.last_block + 1
+                    to_block = min(from_block + self.batch_blocks - 1, safe_head)
+                    await self._index_range(from_block, to_block)
+                    self.last_block = to_block
+                
+                await asyncio.sleep(self.poll_interval)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                error_msg = str(e).lower()
+                if any(hint in error_msg for hint in ('block range', 'more than', 'too many', 'limit exceeded')) and self.batch_blocks > 1:
+                    # Provider rejected the range size; retry with smaller ranges
+                    self.batch_blocks = max(self.batch_blocks // 2, 1)
+                    print(f"Blockchain indexer shrinking range to {self.batch_blocks} blocks: {e}")
+                    continue
+                print(f"Error in blockchain indexer: {e}")
+                await asyncio.sleep(self.poll_interval * 2)  # Wait longer on error
+    
+    async def _index_range(self, from_block: int, to_block: int):
+        event_map = self._event_map()
+        addresses = sorted({Web3.to_checksum_address(address) for address, _ in event_map})
+        topics = sorted({topic for _, topic in event_map})
+        
+        logs = []
+        if addresses:
+            logs = await self.blockchain_service._run_rpc(self.w3.eth.get_logs, {
+                'fromBlock': from_block,
+                'toBlock': to_block,
+                'address': addresses,
+                'topics': [topics]
+            })
+        
+        certificates, bookings_created, booking_statuses, loyalty = [], [], [], []
+        for log in logs:
+            key = (log['address'].lower(), Web3.to_hex(log['topics'][0]))
+            if key not in event_map:
+                continue
+            contract_name, contract_event = event_map[key]
+            try:
+                event = contract_event.process_log(log)
+            except Exception as e:
+                print(f"Error decoding {contract_name} log in block {log['blockNumber']}: {e}")
+                continue
             
-            while self.running:
-                try:
-                    for event in event_filter.get_new_entries():
-                        await self.handle_certificate_event(event)
-                    await asyncio.sleep(10)  # Check every 10 seconds
-                except Exception as e:
-                    print(f"Error in certificate monitoring: {e}")
-                    await asyncio.sleep(30)  # Wait longer on error
-                    
-        except Exception as e:
-            print(f"Error setting up certificate monitoring: {e}")
+            args = event['args']
+            tx_hash = event['transactionHash'].hex()
+            if event['event'] == 'CertificateIssued':
+                certificates.append((args['tokenId'], tx_hash))
+            elif event['event'] == 'BookingCreated':
+                bookings_created.append((args['bookingHash'].hex(), tx_hash))
+            elif event['event'] in ('BookingVerified', 'BookingCompleted'):
+                status = 'verified' if event['event'] == 'BookingVerified' else 'completed'
+                booking_statuses.append((status, args['bookingHash'].hex()))
+            elif event['event'] in ('PointsEarned', 'PointsRedeemed'):
+                transaction_type = 'earned' if event['event'] == 'PointsEarned' else 'redeemed'
+                loyalty.append((
+                    str(uuid.uuid4()), transaction_type, args['amount'], tx_hash,
+                    args['description'], args['user'], tx_hash, transaction_type
+                ))
+        
+        async with self.db_pool.acquire() as conn:
+            await conn.begin()
+            try:
+                async with conn.cursor() as cur:
+                    if certificates:
+                        # Rows are created by the mint endpoint; fill in the token id
+                        await cur.executemany("""
+                            UPDATE certificates
+                            SET nft_token_id = %s
+                            WHERE transaction_hash = %s AND nft_token_id IS NULL
+                        """, certificates)
+                    if bookings_created:
+                        await cur.executemany(
+                            "UPDATE blockchain_bookings SET booking_hash = %s WHERE transaction_hash = %s",
+                            bookings_created
+                        )
+                    if booking_statuses:
+                        await cur.executemany("""
+                            UPDATE blockchain_bookings
+                            SET verification_status = %s, verified_at = COALESCE(verified_at, NOW())
+                            WHERE booking_hash = %s
+                        """, booking_statuses)
+                    if loyalty:
+                        # Record awards and redemptions made outside this app (e.g. after downtime)
+                        await cur.executemany("""
+                            INSERT INTO loyalty_transactions (
+                                id, user_id, transaction_type, points_amount,
+                                transaction_hash, description, blockchain_status
+                            )
+                            SELECT %s, u.id, %s, %s, %s, %s, 'confirmed'
+                            FROM users u
+                            WHERE u.wallet_address = %s
+                                AND NOT EXISTS (
+                                    SELECT 1 FROM loyalty_transactions
+                                    WHERE transaction_hash = %s AND transaction_type = %s
+                                )
+                            LIMIT 1
+                        """, loyalty)
+                    await cur.execute("""
+                        INSERT INTO blockchain_sync_state (sync_key, last_block)
+                        VALUES (%s, %s)
+                        ON DUPLICATE KEY UPDATE last_block = VALUES(last_block)
+                    """, (self.CHECKPOINT_KEY, to_block))
+                await conn.commit()
+            except Exception:
+                await conn.rollback()
+                raise
+        
+        if logs:
+            print(f"Blockchain indexer processed blocks {from_block}-{to_block}: {len(logs)} events")
+
+class NonceManager:
+    """Hands out transaction nonces for one sending address without an RPC per send
+
+    The next nonce is read from the pending transaction count once and then
+    incremented locally under a lock, so concurrent sends from the service wallet
+    never race on get_transaction_count. A nonce whose transaction never reached
+    the node is returned with release() and reused before new ones are issued.
+    """
+    
+    def __init__(self, blockchain_service, address: str):
+        self.blockchain_service = blockchain_service
+        self.address = address
+        self._lock = asyncio.Lock()
+        self._next_nonce: Optional[int] = None
+        self._released: List[int] = []
+    
+    async def _pending_count(self, block_identifier: str = 'pending') -> int:
+        return await self.blockchain_service._run_rpc(
+            self.blockchain_service.w3.eth.get_transaction_count, self.address, block_identifier
+        )
+    
+    async def allocate(self) -> int:
+        """Reserve the next nonce for this address"""
+        async with self._lock:
+            if self._next_nonce is None:
+                self._next_nonce = await self._pending_count()
+            
+            # Fill gaps left by failed sends first so later transactions are not stuck
+            if self._released:
+                return heapq.heappop(self._released)
+            
+            nonce = self._next_nonce
+            self._next_nonce += 1
+            return nonce
+    
+    async def release(self, nonce: int):
+        """Return a nonce whose transaction was never broadcast"""
+        async with self._lock:
+            if self._next_nonce is None or nonce >= self._next_nonce:
+                return
+            if nonce == self._next_nonce - 1:
+                self._next_nonce = nonce
+            elif nonce not in self._released:
+                heapq.heappush(self._released, nonce)
+    
+    async def resync(self):
+        """Realign the local counter with the node after a nonce error"""
+        async with self._lock:
+            latest = await self._pending_count('latest')
+            pending = await self._pending_count('pending')
+            
+            if self._next_nonce is None or (pending == latest and self._next_nonce > pending):
+                # Nothing of ours is in the mempool, so anything past pending was dropped
+                self._next_nonce = pending
+                self._released = []
+            else:
+                self._next_nonce = max(self._next_nonce, pending)
+                self._released = [n for n in self._released if n >= pending]
+                heapq.heapify(self._released)
+            print(f"Nonce resync for {self.address}: latest={latest}, pending={pending}, next={self._next_nonce}")
+    
+    async def handle_failure(self, nonce: int, error: Exception):
+        """Release or resync after a send failed with the given nonce"""
+        error_msg = str(error).lower()
+        if 'nonce' in error_msg or 'already known' in error_msg or 'underpriced' in error_msg:
+            await self.resync()
+        else:
+            await self.release(nonce)
+
+class TransactionSubmissionQueue:
+    """Background pipeline for service-wallet transactions
+
+    API handlers record a job in blockchain_jobs next to the row it is for
+    and get its id back immediately. One submitter task signs and broadcasts
+    jobs in order, relying on NonceManager for back-to-back nonces instead of
+    waiting for each receipt. A single poll loop then tracks every in-flight
+    hash and writes the final status into certificates, loyalty_transactions
+    or blockchain_bookings. Job state lives in the table, so any worker can
+    report it and queued or submitted jobs survive restarts.
+    """
+    
+    # Job kind -> (BlockchainService call builder, gas limit operation)
+    JOB_CALLS = {
+        'mint_certificate': ('_mint_certificate_call', 'mint_certificate'),
+        'award_points': ('_award_points_call', 'earn_points'),
+        'verify_booking': ('_verify_booking_call', 'verify_booking'),
+    }
+    
+    def __init__(self, blockchain_service):
+        self.blockchain_service = blockchain_service
+        self.db_pool = None
+        self.poll_interval = float(os.getenv('BLOCKCHAIN_RECEIPT_POLL_SECONDS', 5))
+        self.receipt_timeout = float(os.getenv('BLOCKCHAIN_RECEIPT_TIMEOUT_SECONDS', 600))
+        # Queued jobs no worker picked up, submissions cut off mid-send and
+        # records left pending by a failed job are swept after this long
+        self.stale_after = int(os.getenv('BLOCKCHAIN_JOB_STALE_SECONDS', 300))
+        self._queue: Optional[asyncio.Queue] = None
+        self._in_flight: Dict[str, Dict] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._last_sweep = 0.0
+    
+    async def ensure_schema(self, cur):
+        """Create the job table and add the status columns the write-back relies on"""
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS blockchain_jobs (
+                job_id VARCHAR(36) PRIMARY KEY,
+                kind VARCHAR(32) NOT NULL,
+                record_id VARCHAR(255) NOT NULL,
+                user_id VARCHAR(255) NOT NULL,
+                status ENUM('queued','submitting','submitted','confirmed','failed') NOT NULL DEFAULT 'queued',
+                transaction_hash VARCHAR(66),
+                error TEXT,
+                call_args JSON NOT NULL,
+                context JSON NOT NULL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+                INDEX idx_blockchain_jobs_status (status, updated_at),
+                INDEX idx_blockchain_jobs_record (record_id, status)
+            )
+        """)
+        for table, column in (
+            ('certificates', "mint_status ENUM('pending','minting','minted','failed') DEFAULT 'pending'"),
+            ('certificates', "retry_count INT DEFAULT 0"),
+            ('loyalty_transactions', "blockchain_status ENUM('pending','confirmed','failed') DEFAULT 'pending'"),
+            ('loyalty_transactions', "retry_count INT DEFAULT 0"),
+            ('blockchain_bookings', "transaction_status ENUM('pending','confirmed','failed') DEFAULT 'pending'"),
+            ('blockchain_bookings', "retry_count INT DEFAULT 0"),
+        ):
+            try:
+                await cur.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+            except Exception as e:
+                if "Duplicate column name" not in str(e):
+                    print(f"Error adding {column.split()[0]} to {table}: {str(e)}")
+        for statement in self.STATUS_BACKFILLS:
+            try:
+                await cur.execute(statement)
+            except Exception as e:
+                print(f"Error backfilling blockchain statuses: {str(e)}")
+    
+    async def start(self, db_pool):
+        """Start the submitter and receipt poller and resume jobs left by the last run"""
+        if self._tasks:
+            return
+        self.db_pool = db_pool
+        self._queue = asyncio.Queue()
+        await self._recover_jobs(startup=True)
+        self._tasks = [
+            asyncio.create_task(self._submit_loop()),
+            asyncio.create_task(self._receipt_loop())
+        ]
+    
+    async def stop(self):
+        """Stop the background tasks; queued and submitted jobs are picked up again on the next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
     
-    async def handle_certificate_event(self, event):
-        """Handle certificate minting event"""
+    async def create_job(self, cur, kind: str, record_id: str, user_id: str, call_args: Dict,
+                         context: Optional[Dict] = None) -> Dict:
+        """Record a queued job with the caller's cursor; hand it to enqueue() once committed"""
+        if kind not in self.JOB_CALLS:
+            raise ValueError(f"Unknown blockchain job kind: {kind}")
+        
+        job = {
+            'job_id': str(uuid.uuid4()),
+            'kind': kind,
+            'record_id': record_id,
+            'user_id': user_id,
+            'status': 'queued',
+            'transaction_hash': None,
+            'error': None,
+            'call_args': call_args,
+            'context': context or {}
+        }
+        await cur.execute("""
+            INSERT INTO blockchain_jobs (job_id, kind, record_id, user_id, status, call_args, context)
+            VALUES (%s, %s, %s, %s, 'queued', %s, %s)
+        """, (
+            job['job_id'], kind, record_id, user_id,
+            json.dumps(call_args, default=str), json.dumps(job['context'], default=str)
+        ))
+        return job
+    
+    def enqueue(self, job: Dict):
+        """Queue a recorded job for submission"""
+        if self._queue is None:
+            raise RuntimeError("Blockchain submission queue is not running")
+        self._queue.put_nowait(job)
+    
+    @property
+    def is_running(self) -> bool:
+        return self._queue is not None and bool(self._tasks)
+    
+    async def load_job(self, cur, job_id: str) -> Optional[Dict]:
+        await cur.execute("""
+            SELECT job_id, kind, record_id, user_id, status, transaction_hash, error, created_at
+            FROM blockchain_jobs WHERE job_id = %s
+        """, (job_id,))
+        return await cur.fetchone()
+    
+    def public_view(self, job: Dict) -> Dict:
+        """Job fields safe to return from the API"""
+        return {key: job[key] for key in (
+            'job_id', 'kind', 'record_id', 'status', 'transaction_hash', 'error', 'created_at'
+        )}
+    
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'queued': self._queue.qsize() if self._queue else 0,
+            'in_flight': len(self._in_flight),
+            'running': self.is_running
+        }
+    
+    async def _claim(self, job: Dict) -> bool:
+        """Mark a queued job as being sent; False if another worker already took it"""
+        async with self.db_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.execute(
+                    "UPDATE blockchain_jobs SET status = 'submitting' WHERE job_id = %s AND status = 'queued'",
+                    (job['job_id'],)
+                )
+                claimed = cur.rowcount == 1
+            await conn.commit()
+        return claimed
+    
+    async def _submit_loop(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                if await self._claim(job):
+                    await self._submit(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Left queued; the next sweep offers it again
+                print(f"Error claiming {job['kind']} job {job['job_id']}: {e}")
+            finally:
+                self._queue.task_done()
+    
+    async def _submit(self, job: Dict):
+        service = self.blockchain_service
         try:
-            token_id = event['args']['tokenId']
-            tourist_address = event['args']['tourist']
-            destination = event['args']['destination']
-            tx_hash = event['transactionHash'].hex()
-            
-            # Update database
-            # Note: In real implementation, this would use the actual database connection
-            print(f"✅ Certificate minted: TokenID={token_id}, Tourist={tourist_address}, Destination={destination}")
-            
+            builder, gas_operation = self.JOB_CALLS[job['kind']]
+            contract_function = getattr(service, builder)(**job['call_args'])
+            tx_hash = await service._transact(contract_function, {
+                'from': service.wallet_address,
+                'gas': await service.get_dynamic_gas_limit(gas_operation),
+                'gasPrice': await service.get_dynamic_gas_price()
+            })
+            job['transaction_hash'] = tx_hash.hex()
+            job['status'] = 'submitted'
+            job['submitted_at'] = time.monotonic()
+            self._in_flight[job['transaction_hash']] = job
+            await self._write_back(job, 'submitted')
+        except asyncio.CancelledError:
+            raise
         except Exception as e:
-            print(f"Error handling certificate event: {e}")
+            job['status'] = 'failed'
+            job['error'] = str(e)
+            print(f"Error submitting {job['kind']} job {job['job_id']}: {e}")
+            await self._write_back(job, 'failed')
+    
+    async def _receipt_loop(self):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if time.monotonic() - self._last_sweep >= self.stale_after:
+                await self._recover_jobs(startup=False)
+            if not self._in_flight:
+                continue
+            try:
+                jobs = list(self._in_flight.values())
+                receipts = await asyncio.gather(
+                    *[self._fetch_receipt(job['transaction_hash']) for job in jobs],
+                    return_exceptions=True
+                )
+                for job, receipt in zip(jobs, receipts):
+                    await self._settle(job, receipt)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Error polling transaction receipts: {e}")
     
-    async def monitor_loyalty_events(self):
-        """Monitor loyalty point events"""
+    async def _fetch_receipt(self, tx_hash: str):
         try:
-            contract = self.w3.eth.contract(
-                address=self.blockchain_service.contracts['loyalty'],
-                abi=self.blockchain_service.contract_abis['loyalty']
+            return await self.blockchain_service._run_rpc(
+                self.blockchain_service.w3.eth.get_transaction_receipt, tx_hash
             )
-            
-            # Monitor both PointsEarned and PointsRedeemed events
-            earned_filter = contract.events.PointsEarned.createFilter(fromBlock='latest')
-            redeemed_filter = contract.events.PointsRedeemed.createFilter(fromBlock='latest')
-            
-            while self.running:
-                try:
-                    for event in earned_filter.get_new_entries():
-                        await self.handle_loyalty_event(event, 'earned')
-                    for event in redeemed_filter.get_new_entries():
-                        await self.handle_loyalty_event(event, 'redeemed')
-                    await asyncio.sleep(10)
-                except Exception as e:
-                    print(f"Error in loyalty monitoring: {e}")
-                    await asyncio.sleep(30)
-                    
-        except Exception as e:
-            print(f"Error setting up loyalty monitoring: {e}")
+        except TransactionNotFound:
+            return None
+    
+    async def _settle(self, job: Dict, receipt):
+        if isinstance(receipt, Exception):
+            print(f"Error fetching receipt for {job['transaction_hash']}: {receipt}")
+            return
+        
+        if receipt is None:
+            if time.monotonic() - job['submitted_at'] < self.receipt_timeout:
+                return
+            job['status'] = 'failed'
+            job['error'] = 'Transaction was not mined before the receipt timeout'
+            # A dropped transaction leaves a nonce gap behind it
+            await self.blockchain_service.get_nonce_manager(self.blockchain_service.wallet_address).resync()
+        elif receipt.status == 1:
+            job['status'] = 'confirmed'
+            job['gas_used'] = receipt.gasUsed
+        else:
+            job['status'] = 'failed'
+            job['error'] = 'Transaction reverted'
+        
+        self._in_flight.pop(job['transaction_hash'], None)
+        await self._write_back(job, job['status'], receipt)
     
-    async def handle_loyalty_event(self, event, event_type):
-        """Handle loyalty point events"""
+    async def _write_back(self, job: Dict, outcome: str, receipt=None):
+        """Persist a job's state change onto its job row and the row it was queued for
+        
+        The job row moves first and only from a live state, so a job settled
+        by another worker (or twice after a restart) changes nothing.
+        """
+        if not self.db_pool:
+            return
         try:
-            user_address = event['args']['user']
-            amount = event['args']['amount']
-            description = event['args']['description']
-            tx_hash = event['transactionHash'].hex()
-            
-            print(f"✅ Loyalty {event_type}: User={user_address}, Amount={amount}, Description={description}")
-            
+            async with self.db_pool.acquire() as conn:
+                await conn.begin()
+                try:
+                    async with conn.cursor() as cur:
+                        await cur.execute("""
+                            UPDATE blockchain_jobs SET status = %s, transaction_hash = %s, error = %s
+                            WHERE job_id = %s AND status IN ('submitting', 'submitted')
+                        """, (outcome, job['transaction_hash'], job.get('error'), job['job_id']))
+                        if cur.rowcount == 1:
+                            await self._write_back_record(cur, job, outcome, receipt)
+                    await conn.commit()
+                except Exception:
+                    await conn.rollback()
+                    raise
         except Exception as e:
-            print(f"Error handling loyalty event: {e}")
+            print(f"Error writing back {job['kind']} job {job['job_id']} ({outcome}): {e}")
+    
+    async def _write_back_record(self, cur, job: Dict, outcome: str, receipt=None):
+        service = self.blockchain_service
+        kind = job['kind']
+        record_id = job['record_id']
+        tx_hash = job['transaction_hash']
+        context = job['context']
+        if kind == 'mint_certificate':
+            if outcome == 'submitted':
+                await cur.execute(
+                    "UPDATE certificates SET transaction_hash = %s, mint_status = 'minting' WHERE id = %s",
+                    (tx_hash, record_id)
+                )
+            elif outcome == 'confirmed':
+                await cur.execute("""
+                    UPDATE certificates
+                    SET nft_token_id = %s, is_minted = TRUE, mint_status = 'minted'
+                    WHERE id = %s
+                """, (service._certificate_token_id(receipt), record_id))
+                await cur.execute(
+                    "UPDATE bookings SET certificate_issued = %s WHERE id = %s",
+                    (True, context.get('booking_id'))
+                )
+            else:
+                await cur.execute(
+                    "UPDATE certificates SET mint_status = 'failed', retry_count = retry_count + 1 WHERE id = %s",
+                    (record_id,)
+                )
+        
+        elif kind == 'award_points':
+            if outcome == 'submitted':
+                await cur.execute(
+                    "UPDATE loyalty_transactions SET transaction_hash = %s WHERE id = %s",
+                    (tx_hash, record_id)
+                )
+            elif outcome == 'confirmed':
+                await cur.execute(
+                    "UPDATE loyalty_transactions SET blockchain_status = 'confirmed' WHERE id = %s",
+                    (record_id,)
+                )
+                points = context.get('points', 0)
+                await cur.execute("""
+                    UPDATE loyalty_points 
+                    SET points_balance = points_balance + %s, 
+                        total_earned = total_earned + %s,
+                        updated_at = CURRENT_TIMESTAMP
+                    WHERE user_id = %s
+                """, (points, points, job['user_id']))
+            else:
+                await cur.execute(
+                    "UPDATE loyalty_transactions SET blockchain_status = 'failed', retry_count = retry_count + 1 WHERE id = %s",
+                    (record_id,)
+                )
+        
+        elif kind == 'verify_booking':
+            if outcome == 'submitted':
+                await cur.execute(
+                    "UPDATE blockchain_bookings SET transaction_hash = %s, booking_hash = %s WHERE id = %s",
+                    (tx_hash, tx_hash, record_id)
+                )
+            elif outcome == 'confirmed':
+                booking_hash = service._booking_hash(receipt)
+                await cur.execute("""
+                    UPDATE blockchain_bookings
+                    SET booking_hash = %s, verification_status = 'verified',
+                        transaction_status = 'confirmed', verified_at = NOW()
+                    WHERE id = %s
+                """, (booking_hash, record_id))
+                await cur.execute("""
+                    UPDATE bookings 
+                    SET blockchain_verified = %s, blockchain_hash = %s, 
+                        smart_contract_address = %s, certificate_eligible = %s
+                    WHERE id = %s
+                """, (
+                    True, booking_hash, service.contracts['booking'], True,
+                    context.get('booking_id')
+                ))
+            else:
+                await cur.execute("""
+                    UPDATE blockchain_bookings
+                    SET verification_status = 'failed', transaction_status = 'failed',
+                        retry_count = retry_count + 1
+                    WHERE id = %s
+                """, (record_id,))
     
-    async def monitor_booking_events(self):
-        """Monitor booking verification events"""
+    # Records whose job failed without the record being marked failed (e.g. a
+    # write-back lost to a crash). Only rows the queue created carry a job, so
+    # historical and off-chain rows are never touched.
+    ORPHAN_UPDATES = (
+        """
+            UPDATE certificates c
+            JOIN blockchain_jobs j ON j.record_id = c.id AND j.kind = 'mint_certificate' AND j.status = 'failed'
+            SET c.mint_status = 'failed', c.retry_count = c.retry_count + 1
+            WHERE c.mint_status IN ('pending', 'minting') AND c.is_minted = FALSE
+                AND j.updated_at < NOW() - INTERVAL %s SECOND
+                AND NOT EXISTS (
+                    SELECT 1 FROM blockchain_jobs live
+                    WHERE live.record_id = c.id AND live.status IN ('queued', 'submitting', 'submitted')
+                )
+        """,
+        """
+            UPDATE loyalty_transactions lt
+            JOIN blockchain_jobs j ON j.record_id = lt.id AND j.kind = 'award_points' AND j.status = 'failed'
+            SET lt.blockchain_status = 'failed', lt.retry_count = lt.retry_count + 1
+            WHERE lt.blockchain_status = 'pending'
+                AND j.updated_at < NOW() - INTERVAL %s SECOND
+                AND NOT EXISTS (
+                    SELECT 1 FROM blockchain_jobs live
+                    WHERE live.record_id = lt.id AND live.status IN ('queued', 'submitting', 'submitted')
+                )
+        """,
+        """
+            UPDATE blockchain_bookings bb
+            JOIN blockchain_jobs j ON j.record_id = bb.id AND j.kind = 'verify_booking' AND j.status = 'failed'
+            SET bb.verification_status = 'failed', bb.transaction_status = 'failed',
+                bb.retry_count = bb.retry_count + 1
+            WHERE bb.transaction_status = 'pending' AND bb.verification_status = 'pending'
+                AND j.updated_at < NOW() - INTERVAL %s SECOND
+                AND NOT EXISTS (
+                    SELECT 1 FROM blockchain_jobs live
+                    WHERE live.record_id = bb.id AND live.status IN ('queued', 'submitting', 'submitted')
+                )
+        """
+    )
+    
+    # Statuses for rows written before the queue existed: the status columns
+    # default to 'pending', which would otherwise read as "awaiting the queue"
+    STATUS_BACKFILLS = (
+        """
+            UPDATE certificates SET mint_status = 'minted'
+            WHERE is_minted = TRUE AND COALESCE(mint_status, '') <> 'minted'
+        """,
+        # Certificates issued on booking completion, never queued for minting
+        """
+            UPDATE certificates c SET c.mint_status = NULL
+            WHERE c.mint_status = 'pending' AND c.is_minted = FALSE AND c.transaction_hash IS NULL
+                AND NOT EXISTS (SELECT 1 FROM blockchain_jobs j WHERE j.record_id = c.id)
+        """,
+        """
+            UPDATE blockchain_bookings SET transaction_status = 'confirmed'
+            WHERE verification_status IN ('verified', 'completed')
+                AND COALESCE(transaction_status, '') <> 'confirmed'
+        """,
+        # verified_at is only ever set on verification, so these were verified
+        # before an earlier recovery sweep failed them
+        """
+            UPDATE blockchain_bookings SET verification_status = 'verified', transaction_status = 'confirmed'
+            WHERE verification_status = 'failed' AND verified_at IS NOT NULL
+        """,
+        """
+            UPDATE loyalty_transactions lt SET lt.blockchain_status = 'confirmed'
+            WHERE lt.blockchain_status = 'pending' AND lt.transaction_hash IS NOT NULL
+                AND NOT EXISTS (SELECT 1 FROM blockchain_jobs j WHERE j.record_id = lt.id)
+        """,
+        # Off-chain credits, never sent on chain
+        """
+            UPDATE loyalty_transactions lt SET lt.blockchain_status = NULL
+            WHERE lt.blockchain_status = 'pending' AND lt.transaction_hash IS NULL
+                AND NOT EXISTS (SELECT 1 FROM blockchain_jobs j WHERE j.record_id = lt.id)
+        """
+    )
+    
+    @staticmethod
+    def _job_from_row(row: Dict) -> Dict:
+        job = dict(row)
+        job['call_args'] = json.loads(row['call_args'])
+        job['context'] = json.loads(row['context'])
+        return job
+    
+    async def _recover_jobs(self, startup: bool):
+        """Pick up jobs the last run (or a dead worker) left behind
+        
+        Queued jobs are queued again; the claim in the submitter keeps two
+        workers from sending the same one. A job stuck in 'submitting' may or
+        may not have been broadcast, so it is failed rather than resent. On
+        startup, submitted jobs go back to receipt tracking.
+        """
+        self._last_sweep = time.monotonic()
         try:
-            contract = self.w3.eth.contract(
-                address=self.blockchain_service.contracts['booking'],
-                abi=self.blockchain_service.contract_abis['booking']
-            )
-            
-            # Monitor BookingCreated and BookingVerified events
-            created_filter = contract.events.BookingCreated.createFilter(fromBlock='latest')
-            verified_filter = contract.events.BookingVerified.createFilter(fromBlock='latest')
-            
-            while self.running:
-                try:
-                    for event in created_filter.get_new_entries():
-                        await self.handle_booking_event(event, 'created')
-                    for event in verified_filter.get_new_entries():
-                        await self.handle_booking_event(event, 'verified')
-                    await asyncio.sleep(10)
-                except Exception as e:
-                    print(f"Error in booking monitoring: {e}")
-                    await asyncio.sleep(30)
+            async with self.db_pool.acquire() as conn:
+                async with conn.cursor(aiomysql.DictCursor) as cur:
+                    await cur.execute("""
+                        SELECT job_id, kind, record_id, user_id, status, transaction_hash, error,
+                               call_args, context
+                        FROM blockchain_jobs
+                        WHERE (status = 'queued' AND updated_at < NOW() - INTERVAL %s SECOND)
+                            OR (status = 'submitting' AND updated_at < NOW() - INTERVAL %s SECOND)
+                            OR (status = 'submitted' AND %s)
+                        ORDER BY created_at
+                    """, (0 if startup else self.stale_after, self.stale_after, startup))
+                    rows = await cur.fetchall()
                     
+                    for statement in self.ORPHAN_UPDATES:
+                        await cur.execute(statement, (self.stale_after,))
+                await conn.commit()
+            
+            for row in rows:
+                job = self._job_from_row(row)
+                if job['status'] == 'queued':
+                    self._queue.put_nowait(job)
+                elif job['status'] == 'submitting':
+                    job['status'] = 'failed'
+                    job['error'] = 'Submission was interrupted before it was confirmed as sent'
+                    await self._write_back(job, 'failed')
+                elif job['transaction_hash'] not in self._in_flight:
+                    job['submitted_at'] = time.monotonic()
+                    self._in_flight[job['transaction_hash']] = job
         except Exception as e:
-            print(f"Error setting up booking monitoring: {e}")
+            print(f"Error recovering blockchain jobs: {e}")
+
+class GasOracle:
+    """Background-refreshed gas price and network snapshot
+
+    Every refresh_interval seconds one thread-pool call reads eth_feeHistory
+    (plus the chain id once) and folds the per-block base fee and priority-fee
+    percentiles into a rolling window. Gas pricing, cost estimates and the
+    status endpoints read the resulting snapshot from memory.
+    """
+    
+    REWARD_PERCENTILES = [25, 50, 75]
+    
+    def __init__(self, blockchain_service):
+        self.blockchain_service = blockchain_service
+        self.refresh_interval = float(os.getenv('BLOCKCHAIN_GAS_REFRESH_SECONDS', 12))
+        self.window_blocks = int(os.getenv('BLOCKCHAIN_FEE_HISTORY_BLOCKS', 20))
+        self.percentile = int(os.getenv('BLOCKCHAIN_GAS_PERCENTILE', 50))
+        if self.percentile not in self.REWARD_PERCENTILES:
+            self.percentile = 50
+        self._chain_id: Optional[int] = None
+        self._blocks: "OrderedDict[int, Dict]" = OrderedDict()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._refreshed_at: Optional[float] = None
+        self._last_error: Optional[str] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    def start(self):
+        if not self._task:
+            self._task = asyncio.create_task(self._run())
+    
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+    
+    @property
+    def is_fresh(self) -> bool:
+        """Snapshot exists and the last refresh is within a few intervals"""
+        return (
+            self._snapshot is not None
+            and time.monotonic() - self._refreshed_at <= self.refresh_interval * 3
+        )
+    
+    def snapshot(self) -> Optional[Dict[str, Any]]:
+        return self._snapshot
+    
+    @property
+    def last_error(self) -> Optional[str]:
+        return self._last_error
+    
+    async def _run(self):
+        while True:
+            try:
+                await self.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self._last_error = str(e)
+                print(f"Error refreshing gas oracle: {e}")
+            await asyncio.sleep(self.refresh_interval)
+    
+    async def refresh(self):
+        """Fetch the latest fee history and rebuild the snapshot"""
+        reading = await self.blockchain_service._run_rpc(self._read_fee_history)
+        
+        if reading['fee_history'] is not None:
+            history = reading['fee_history']
+            oldest = history['oldestBlock']
+            rewards = history.get('reward') or []
+            for offset, base_fee in enumerate(history['baseFeePerGas'][:-1]):
+                self._blocks[oldest + offset] = {
+                    'base_fee': base_fee,
+                    'rewards': rewards[offset] if offset < len(rewards) else [0] * len(self.REWARD_PERCENTILES)
+                }
+            while len(self._blocks) > self.window_blocks:
+                self._blocks.popitem(last=False)
+            
+            # baseFeePerGas carries one extra entry: the base fee of the next block
+            next_base_fee = history['baseFeePerGas'][-1]
+            priority_fees = {
+                percentile: int(statistics.median(block['rewards'][index] for block in self._blocks.values()))
+                for index, percentile in enumerate(self.REWARD_PERCENTILES)
+            }
+            gas_price = next_base_fee + priority_fees[self.percentile]
+            latest_block = oldest + len(history['baseFeePerGas']) - 2
+        else:
+            # Pre-London network: only the legacy gas price is available
+            next_base_fee = None
+            priority_fees = {}
+            gas_price = reading['gas_price']
+            latest_block = reading['block_number']
+        
+        self._snapshot = {
+            'chain_id': self._chain_id,
+            'latest_block': latest_block,
+            'gas_price': gas_price,
+            'base_fee': next_base_fee,
+            'priority_fees': priority_fees,
+            'window_blocks': len(self._blocks)
+        }
+        self._refreshed_at = time.monotonic()
+        self._last_error = None
     
-    async def handle_booking_event(self, event, event_type):
-        """Handle booking verification events"""
+    def _read_fee_history(self) -> Dict[str, Any]:
+        w3 = self.blockchain_service.w3
+        if self._chain_id is None:
+            self._chain_id = w3.eth.chain_id
         try:
-            booking_hash = event['args']['bookingHash'].hex()
-            tourist = event['args']['tourist']
-            provider = event['args']['provider']
-            tx_hash = event['transactionHash'].hex()
-            
-            print(f"✅ Booking {event_type}: Hash={booking_hash}, Tourist={tourist}, Provider={provider}")
-            
-        except Exception as e:
-            print(f"Error handling booking event: {e}")
+            return {'fee_history': w3.eth.fee_history(self.window_blocks, 'latest', self.REWARD_PERCENTILES)}
+        except Exception:
+            return {'fee_history': None, 'gas_price': w3.eth.gas_price, 'block_number': w3.eth.block_number}
 
 class BlockchainService:
     def __init__(self):
@@ -160,6 +1223,18 @@ class BlockchainService:
         self.private_key = os.getenv('BLOCKCHAIN_PRIVATE_KEY')
         self.wallet_address = os.getenv('WALLET_ADDRESS')
         
+        # web3's HTTP provider is synchronous; every RPC runs on this bounded pool
+        self._rpc_executor = ThreadPoolExecutor(
+            max_workers=int(os.getenv('BLOCKCHAIN_RPC_WORKERS', 8)),
+            thread_name_prefix='web3-rpc'
+        )
+        
+        # Locally allocated nonces per sending address (see NonceManager)
+        self._nonce_managers: Dict[str, NonceManager] = {}
+        
+        # Background submission of service-wallet transactions (started with the app)
+        self.submission_queue = TransactionSubmissionQueue(self)
+        
         # Initialize Web3 connection
         if self.infura_project_id:
             self.w3 = Web3(Web3.HTTPProvider(f'https://{self.network}.infura.io/v3/{self.infura_project_id}'))
@@ -167,13 +1242,9 @@ class BlockchainService:
             # Fallback to public RPC for development
             self.w3 = Web3(Web3.HTTPProvider(f'https://{self.network}.gateway.tenderly.run'))
         
-        # Load contract addresses
-        self.contracts = {
-            'certificates': os.getenv('CONTRACT_ADDRESS_CERTIFICATES'),
-            'loyalty': os.getenv('CONTRACT_ADDRESS_LOYALTY'),  
-            'booking': os.getenv('CONTRACT_ADDRESS_BOOKING'),
-            'reviews': os.getenv('CONTRACT_ADDRESS_REVIEWS')
-        }
+        # Contract instances keyed by name; rebuilt when the configured address changes
+        self._contract_cache: Dict[str, CachedContract] = {}
+        self._chain_id: Optional[int] = None
         
         # Initialize account if private key is available
         self.account = None
@@ -181,249 +1252,120 @@ class BlockchainService:
             self.account = Account.from_key(self.private_key)
             
         # Contract ABIs for tourism functions
-        self.contract_abis = {
-            'certificates': self._get_certificate_abi(),
-            'loyalty': self._get_loyalty_abi(),
-            'booking': self._get_booking_abi(),
-            'reviews': self._get_reviews_abi()
-        }
+        self.contract_abis = CONTRACT_ABIS
+        
+        # Checkpointed contract event indexer (started with the app)
+        self.event_indexer = BlockchainEventIndexer(self)
+        
+        # In-memory gas price and network snapshot (started with the app)
+        self.gas_oracle = GasOracle(self)
     
-    def _get_certificate_abi(self) -> List[Dict]:
-        """Certificate NFT contract ABI - CORRECTED to match deployed contract"""
-        return [
-            {
-                "inputs": [
-                    {"name": "_tourist", "type": "address"},
-                    {"name": "_destination", "type": "string"},
-                    {"name": "_tourDate", "type": "string"}
-                ],
-                "name": "mintCertificate",
-                "outputs": [{"name": "", "type": "uint256"}],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_user", "type": "address"}],
-                "name": "getUserCertificates",
-                "outputs": [{"type": "uint256[]"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_user", "type": "address"}],
-                "name": "getUserCertificateCount",
-                "outputs": [{"type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_tokenId", "type": "uint256"}],
-                "name": "getCertificate",
-                "outputs": [{
-                    "components": [
-                        {"name": "tokenId", "type": "uint256"},
-                        {"name": "tourist", "type": "address"},
-                        {"name": "destination", "type": "string"},
-                        {"name": "tourDate", "type": "string"},
-                        {"name": "issuedDate", "type": "uint256"},
-                        {"name": "isActive", "type": "bool"}
-                    ],
-                    "type": "tuple"
-                }],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_tokenId", "type": "uint256"}],
-                "name": "isCertificateValid",
-                "outputs": [{"type": "bool"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    @property
+    def contracts(self) -> Dict[str, Optional[str]]:
+        """Configured contract addresses, read from the environment on each access"""
+        return {name: os.getenv(env_var) for name, env_var in CONTRACT_ADDRESS_ENV.items()}
     
-    def _get_loyalty_abi(self) -> List[Dict]:
-        """Loyalty points contract ABI - CORRECTED to match deployed contract"""
-        return [
-            {
-                "inputs": [
-                    {"name": "_user", "type": "address"},
-                    {"name": "_bookingAmount", "type": "uint256"},
-                    {"name": "_description", "type": "string"}
-                ],
-                "name": "earnPoints",
-                "outputs": [],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [
-                    {"name": "_user", "type": "address"},
-                    {"name": "_pointsToRedeem", "type": "uint256"},
-                    {"name": "_description", "type": "string"}
-                ],
-                "name": "redeemPoints",
-                "outputs": [{"type": "uint256"}],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_user", "type": "address"}],
-                "name": "getPointBalance",
-                "outputs": [{"type": "uint256"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_user", "type": "address"}],
-                "name": "getUserTransactions",
-                "outputs": [{
-                    "components": [
-                        {"name": "user", "type": "address"},
-                        {"name": "amount", "type": "int256"},
-                        {"name": "transactionType", "type": "string"},
-                        {"name": "description", "type": "string"},
-                        {"name": "timestamp", "type": "uint256"}
-                    ],
-                    "type": "tuple[]"
-                }],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_user", "type": "address"}],
-                "name": "getUserStats",
-                "outputs": [
-                    {"name": "balance", "type": "uint256"},
-                    {"name": "earned", "type": "uint256"},
-                    {"name": "redeemed", "type": "uint256"},
-                    {"name": "transactionCount", "type": "uint256"}
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_points", "type": "uint256"}],
-                "name": "calculateDiscountValue",
-                "outputs": [{"type": "uint256"}],
-                "stateMutability": "pure",
-                "type": "function"
-            }
-        ]
+    def get_contract(self, contract_name: str, abi: Optional[List] = None) -> CachedContract:
+        """Shared contract instance for a named contract"""
+        address = os.getenv(CONTRACT_ADDRESS_ENV.get(contract_name, ''))
+        if not address:
+            raise Exception(f"Contract address not found for {contract_name}")
+        if abi is None:
+            abi = CONTRACT_ABIS[contract_name]
+        
+        cached = self._contract_cache.get(contract_name)
+        if cached is None or cached.raw_address != address or (cached.abi is not abi and cached.abi != abi):
+            cached = CachedContract(self.w3, contract_name, address, abi)
+            self._contract_cache[contract_name] = cached
+        return cached
     
-    def _get_booking_abi(self) -> List[Dict]:
-        """Booking verification contract ABI - CORRECTED to match deployed contract"""
-        return [
-            {
-                "inputs": [
-                    {"name": "_tourist", "type": "address"},
-                    {"name": "_provider", "type": "address"},
-                    {"name": "_destination", "type": "string"},
-                    {"name": "_amount", "type": "uint256"},
-                    {"name": "_bookingDate", "type": "uint256"},
-                    {"name": "_ipfsHash", "type": "string"}
-                ],
-                "name": "verifyBooking",
-                "outputs": [{"type": "bytes32"}],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_bookingHash", "type": "bytes32"}],
-                "name": "isBookingValid",
-                "outputs": [{"type": "bool"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_bookingHash", "type": "bytes32"}],
-                "name": "getBookingDetails",
-                "outputs": [
-                    {"name": "tourist", "type": "address"},
-                    {"name": "provider", "type": "address"},
-                    {"name": "destination", "type": "string"},
-                    {"name": "amount", "type": "uint256"},
-                    {"name": "bookingDate", "type": "uint256"},
-                    {"name": "verificationDate", "type": "uint256"},
-                    {"name": "status", "type": "uint8"},
-                    {"name": "ipfsHash", "type": "string"}
-                ],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_tourist", "type": "address"}],
-                "name": "getTouristBookings",
-                "outputs": [{"type": "bytes32[]"}],
-                "stateMutability": "view",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "_provider", "type": "address"}],
-                "name": "getProviderBookings",
-                "outputs": [{"type": "bytes32[]"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    async def _get_chain_id(self) -> int:
+        if self._chain_id is None:
+            snapshot = self.gas_oracle.snapshot()
+            if snapshot and snapshot['chain_id'] is not None:
+                self._chain_id = snapshot['chain_id']
+            else:
+                self._chain_id = await self._run_rpc(lambda: self.w3.eth.chain_id)
+        return self._chain_id
     
-    def _get_reviews_abi(self) -> List[Dict]:
-        """Reviews verification contract ABI"""
-        return [
-            {
-                "inputs": [
-                    {"name": "reviewId", "type": "string"},
-                    {"name": "reviewHash", "type": "bytes32"},
-                    {"name": "user", "type": "address"},
-                    {"name": "destinationId", "type": "string"}
-                ],
-                "name": "verifyReview", 
-                "outputs": [],
-                "stateMutability": "nonpayable",
-                "type": "function"
-            },
-            {
-                "inputs": [{"name": "reviewId", "type": "string"}],
-                "name": "isReviewVerified",
-                "outputs": [{"type": "bool"}],
-                "stateMutability": "view",
-                "type": "function"
-            }
-        ]
+    def close(self):
+        """Release the RPC worker threads"""
+        self._rpc_executor.shutdown(wait=False)
+    
+    async def _run_rpc(self, func, *args, **kwargs):
+        """Run a blocking web3 call on the RPC thread pool so the event loop stays free"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._rpc_executor, functools.partial(func, *args, **kwargs))
+    
+    async def _sign_and_send(self, transaction: Dict) -> HexBytes:
+        """Sign a built transaction with the service key and broadcast it"""
+        signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
+        return await self._run_rpc(self.w3.eth.send_raw_transaction, signed_txn.rawTransaction)
+    
+    async def _wait_for_receipt(self, tx_hash):
+        """Wait for a transaction receipt without blocking the event loop"""
+        return await self._run_rpc(self.w3.eth.wait_for_transaction_receipt, tx_hash)
     
-    def is_connected(self) -> bool:
+    def get_nonce_manager(self, address: str) -> 'NonceManager':
+        """Nonce allocator for a sending address, created on first use"""
+        manager = self._nonce_managers.get(address)
+        if manager is None:
+            manager = NonceManager(self, address)
+            self._nonce_managers[address] = manager
+        return manager
+    
+    async def _transact(self, contract_function, tx_params: Dict) -> HexBytes:
+        """Build, sign and broadcast a contract call with a locally allocated nonce"""
+        nonce_manager = self.get_nonce_manager(tx_params['from'])
+        nonce = await nonce_manager.allocate()
+        try:
+            if isinstance(contract_function, EncodedCall):
+                # Calldata is already encoded; only the chain id is needed to sign
+                transaction = {
+                    'value': 0,
+                    **tx_params,
+                    'to': contract_function.to,
+                    'data': contract_function.data,
+                    'nonce': nonce,
+                    'chainId': await self._get_chain_id()
+                }
+            else:
+                transaction = await self._run_rpc(contract_function.build_transaction, {**tx_params, 'nonce': nonce})
+            return await self._sign_and_send(transaction)
+        except Exception as e:
+            await nonce_manager.handle_failure(nonce, e)
+            raise
+    
+    async def is_connected(self) -> bool:
         """Check if connected to Ethereum network"""
         try:
-            return self.w3.is_connected()
+            return await self._run_rpc(self.w3.is_connected)
         except Exception:
             return False
     
-    def get_network_info(self) -> Dict[str, Any]:
-        """Get current network information"""
-        try:
-            chain_id = self.w3.eth.chain_id
-            latest_block = self.w3.eth.block_number
-            gas_price = self.w3.eth.gas_price
-            
-            return {
-                'connected': True,
-                'network': self.network,
-                'chain_id': chain_id,
-                'latest_block': latest_block,
-                'gas_price_gwei': float(self.w3.from_wei(gas_price, 'gwei')),
-                'wallet_address': self.wallet_address,
-                'contracts': self.contracts
-            }
-        except Exception as e:
+    async def get_network_info(self) -> Dict[str, Any]:
+        """Get current network information from the gas oracle snapshot"""
+        snapshot = self.gas_oracle.snapshot()
+        if not snapshot:
             return {
                 'connected': False,
-                'error': str(e)
+                'error': self.gas_oracle.last_error or 'Network information not loaded yet'
             }
+        
+        return {
+            'connected': self.gas_oracle.is_fresh,
+            'network': self.network,
+            'chain_id': snapshot['chain_id'],
+            'latest_block': snapshot['latest_block'],
+            'gas_price_gwei': float(self.w3.from_wei(snapshot['gas_price'], 'gwei')),
+            'wallet_address': self.wallet_address,
+            'contracts': self.contracts
+        }
     
-    def get_balance(self, address: str) -> float:
+    async def get_balance(self, address: str) -> float:
         """Get ETH balance for an address"""
         try:
-            balance_wei = self.w3.eth.get_balance(address)
+            balance_wei = await self._run_rpc(self.w3.eth.get_balance, address)
             balance_eth = self.w3.from_wei(balance_wei, 'ether')
             return float(balance_eth)
         except Exception:
@@ -443,21 +1385,15 @@ class BlockchainService:
             contract = self.w3.eth.contract(abi=abi, bytecode=bytecode)
             
             # Build transaction
-            transaction = contract.constructor().build_transaction({
+            # Build, sign and send transaction
+            tx_hash = await self._transact(contract.constructor(), {
                 'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
                 'gas': 2000000,
                 'gasPrice': self.w3.to_wei('20', 'gwei')
             })
             
-            # Sign transaction
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            
-            # Send transaction
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
             # Wait for receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             if receipt.status == 1:
                 return receipt.contractAddress
@@ -469,11 +1405,7 @@ class BlockchainService:
     
     def get_contract_instance(self, contract_name: str, abi: List):
         """Get contract instance for interactions"""
-        contract_address = self.contracts.get(contract_name)
-        if not contract_address:
-            raise Exception(f"Contract address not found for {contract_name}")
-        
-        return self.w3.eth.contract(address=contract_address, abi=abi)
+        return self.get_contract(contract_name, abi).contract
     
     async def call_contract_function(self, contract_name: str, abi: List, 
                                    function_name: str, *args, **kwargs) -> Any:
@@ -481,7 +1413,7 @@ class BlockchainService:
         try:
             contract = self.get_contract_instance(contract_name, abi)
             function = getattr(contract.functions, function_name)
-            return function(*args).call()
+            return await self._run_rpc(function(*args).call)
         except Exception as e:
             raise Exception(f"Contract call error: {str(e)}")
     
@@ -492,21 +1424,15 @@ class BlockchainService:
             raise Exception("No account configured for transactions")
         
         try:
-            contract = self.get_contract_instance(contract_name, abi)
-            function = getattr(contract.functions, function_name)
+            contract = self.get_contract(contract_name, abi)
             
-            # Build transaction
-            transaction = function(*args).build_transaction({
+            # Build, sign and send transaction
+            tx_hash = await self._transact(contract.encode(function_name, *args), {
                 'from': self.account.address,
-                'nonce': self.w3.eth.get_transaction_count(self.account.address),
                 'gas': 500000,
                 'gasPrice': self.w3.to_wei('20', 'gwei')
             })
             
-            # Sign and send transaction
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
             return tx_hash.hex()
             
         except Exception as e:
@@ -520,6 +1446,21 @@ class BlockchainService:
     # CERTIFICATE FUNCTIONS
     # ===========================================
     
+    def _mint_certificate_call(self, user_wallet: str, destination_name: str, tour_date: str):
+        # Use corrected function signature: mintCertificate(address _tourist, string _destination, string _tourDate)
+        return self.get_contract('certificates').encode('mintCertificate', user_wallet, destination_name, tour_date)
+    
+    def _certificate_token_id(self, receipt) -> Optional[int]:
+        """Token id from the CertificateIssued event in a mint receipt"""
+        contract = self.get_contract('certificates').contract
+        for log in receipt.logs or []:
+            try:
+                decoded_log = contract.events.CertificateIssued().process_log(log)
+                return decoded_log['args']['tokenId']
+            except:
+                continue
+        return None
+    
     async def mint_certificate(self, user_wallet: str, booking_id: str, 
                              destination_name: str, tour_date: str = None) -> Dict:
         """Mint a tourism certificate NFT using corrected ABI"""
@@ -527,42 +1468,21 @@ class BlockchainService:
             if not tour_date:
                 tour_date = datetime.now().strftime("%Y-%m-%d")
             
-            # Get contract with corrected ABI
-            contract = self.w3.eth.contract(
-                address=self.contracts['certificates'],
-                abi=self.contract_abis['certificates']
-            )
-            
-            # Use corrected function signature: mintCertificate(address _tourist, string _destination, string _tourDate)
-            transaction = contract.functions.mintCertificate(
+            tx_hash = await self._transact(self._mint_certificate_call(
                 user_wallet,
                 destination_name,
                 tour_date
-            ).build_transaction({
+            ), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('mint_certificate'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
             
-            # Sign and send transaction
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            
             # Wait for receipt
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             # Extract token ID from receipt
-            token_id = None
-            if receipt.logs:
-                # Parse the CertificateIssued event
-                for log in receipt.logs:
-                    try:
-                        decoded_log = contract.events.CertificateIssued().processLog(log)
-                        token_id = decoded_log['args']['tokenId']
-                        break
-                    except:
-                        continue
+            token_id = self._certificate_token_id(receipt)
             
             return {
                 'success': True,
@@ -579,35 +1499,35 @@ class BlockchainService:
                 'error': str(e)
             }
     
+    def _read_user_certificates(self, contract, wallet_address: str) -> List[Dict]:
+        # Use corrected function: getUserCertificates(address _user)
+        token_ids = contract.functions.getUserCertificates(wallet_address).call()
+        certificates = []
+        
+        # Get details for each certificate
+        for token_id in token_ids:
+            try:
+                cert_details = contract.functions.getCertificate(token_id).call()
+                certificates.append({
+                    'token_id': cert_details[0],  # tokenId
+                    'tourist': cert_details[1],   # tourist
+                    'destination': cert_details[2], # destination  
+                    'tour_date': cert_details[3],   # tourDate
+                    'issued_date': cert_details[4], # issuedDate
+                    'is_active': cert_details[5]    # isActive
+                })
+            except Exception as e:
+                print(f"Error getting certificate {token_id}: {e}")
+                continue
+        
+        return certificates
+    
     async def get_user_certificates(self, wallet_address: str) -> List[Dict]:
         """Get all certificates owned by a user - UPDATED to use corrected functions"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['certificates'],
-                abi=self.contract_abis['certificates']
-            )
-            
-            # Use corrected function: getUserCertificates(address _user)
-            token_ids = contract.functions.getUserCertificates(wallet_address).call()
-            certificates = []
+            contract = self.get_contract('certificates').contract
             
-            # Get details for each certificate
-            for token_id in token_ids:
-                try:
-                    cert_details = contract.functions.getCertificate(token_id).call()
-                    certificates.append({
-                        'token_id': cert_details[0],  # tokenId
-                        'tourist': cert_details[1],   # tourist
-                        'destination': cert_details[2], # destination  
-                        'tour_date': cert_details[3],   # tourDate
-                        'issued_date': cert_details[4], # issuedDate
-                        'is_active': cert_details[5]    # isActive
-                    })
-                except Exception as e:
-                    print(f"Error getting certificate {token_id}: {e}")
-                    continue
-            
-            return certificates
+            return await self._run_rpc(self._read_user_certificates, contract, wallet_address)
             
         except Exception as e:
             print(f"Error getting certificates: {str(e)}")
@@ -617,31 +1537,26 @@ class BlockchainService:
     # LOYALTY POINTS FUNCTIONS
     # ===========================================
     
+    def _award_points_call(self, user_wallet: str, points: int, booking_id: str):
+        # Use corrected function: earnPoints(address _user, uint256 _bookingAmount, string _description)
+        description = f"Earned from booking {booking_id}"
+        return self.get_contract('loyalty').encode(
+            'earnPoints',
+            user_wallet,
+            points,  # This should be booking amount, but using points for backward compatibility
+            description
+        )
+    
     async def award_loyalty_points(self, user_wallet: str, points: int, 
                                  booking_id: str) -> Dict:
         """Award loyalty points to user - UPDATED to use corrected function"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['loyalty'],
-                abi=self.contract_abis['loyalty']
-            )
-            
-            # Use corrected function: earnPoints(address _user, uint256 _bookingAmount, string _description)
-            description = f"Earned from booking {booking_id}"
-            transaction = contract.functions.earnPoints(
-                user_wallet,
-                points,  # This should be booking amount, but using points for backward compatibility
-                description
-            ).build_transaction({
+            tx_hash = await self._transact(self._award_points_call(user_wallet, points, booking_id), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('earn_points'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             return {
                 'success': True,
@@ -659,27 +1574,21 @@ class BlockchainService:
     async def redeem_loyalty_points(self, user_wallet: str, points: int) -> Dict:
         """Redeem loyalty points - UPDATED to use corrected function"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['loyalty'],
-                abi=self.contract_abis['loyalty']
-            )
+            contract = self.get_contract('loyalty')
             
             # Use corrected function: redeemPoints(address _user, uint256 _pointsToRedeem, string _description)
             description = f"Redeemed {points} points for discount"
-            transaction = contract.functions.redeemPoints(
+            tx_hash = await self._transact(contract.encode(
+                'redeemPoints',
                 user_wallet,
                 points,
                 description
-            ).build_transaction({
+            ), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('redeem_points'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             return {
                 'success': True,
@@ -697,13 +1606,10 @@ class BlockchainService:
     async def get_loyalty_points(self, wallet_address: str) -> int:
         """Get user's loyalty points balance - UPDATED to use corrected function"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['loyalty'],
-                abi=self.contract_abis['loyalty']
-            )
+            contract = self.get_contract('loyalty').contract
             
             # Use corrected function: getPointBalance(address _user)
-            balance = contract.functions.getPointBalance(wallet_address).call()
+            balance = await self._run_rpc(contract.functions.getPointBalance(wallet_address).call)
             return balance
             
         except Exception as e:
@@ -714,58 +1620,49 @@ class BlockchainService:
     # BOOKING VERIFICATION FUNCTIONS
     # ===========================================
     
+    def _verify_booking_call(self, booking_id: str, booking_data: Dict, user_wallet: str):
+        # Extract required data for corrected function signature
+        provider_wallet = booking_data.get('provider_wallet', self.wallet_address)  # Fallback to system wallet
+        destination = booking_data.get('destination_name', 'Unknown')
+        amount = int(float(booking_data.get('total_price', 0)) * 100)  # Convert to cents/smallest unit
+        booking_timestamp = int(datetime.now().timestamp())
+        ipfs_hash = f"booking_{booking_id}"  # Simple IPFS hash placeholder
+        
+        # Use corrected function: verifyBooking(address _tourist, address _provider, string _destination, uint256 _amount, uint256 _bookingDate, string _ipfsHash)
+        return self.get_contract('booking').encode(
+            'verifyBooking',
+            user_wallet,
+            provider_wallet,
+            destination,
+            amount,
+            booking_timestamp,
+            ipfs_hash
+        )
+    
+    def _booking_hash(self, receipt) -> str:
+        """Booking hash from the BookingCreated event, falling back to the transaction hash"""
+        contract = self.get_contract('booking').contract
+        for log in receipt.logs or []:
+            try:
+                decoded_log = contract.events.BookingCreated().process_log(log)
+                return decoded_log['args']['bookingHash'].hex()
+            except:
+                continue
+        return HexBytes(receipt.transactionHash).hex()
+    
     async def verify_booking_on_blockchain(self, booking_id: str, booking_data: Dict, 
                                          user_wallet: str) -> Dict:
         """Verify booking on blockchain - UPDATED to use corrected function"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['booking'],
-                abi=self.contract_abis['booking']
-            )
-            
-            # Extract required data for corrected function signature
-            provider_wallet = booking_data.get('provider_wallet', self.wallet_address)  # Fallback to system wallet
-            destination = booking_data.get('destination_name', 'Unknown')
-            amount = int(float(booking_data.get('total_price', 0)) * 100)  # Convert to cents/smallest unit
-            booking_timestamp = int(datetime.now().timestamp())
-            ipfs_hash = f"booking_{booking_id}"  # Simple IPFS hash placeholder
-            
-            # Use corrected function: verifyBooking(address _tourist, address _provider, string _destination, uint256 _amount, uint256 _bookingDate, string _ipfsHash)
-            transaction = contract.functions.verifyBooking(
-                user_wallet,
-                provider_wallet,
-                destination,
-                amount,
-                booking_timestamp,
-                ipfs_hash
-            ).build_transaction({
+            tx_hash = await self._transact(self._verify_booking_call(booking_id, booking_data, user_wallet), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('verify_booking'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             # Extract booking hash from transaction receipt
-            booking_hash = None
-            if receipt.logs:
-                try:
-                    # Try to decode BookingCreated event
-                    for log in receipt.logs:
-                        try:
-                            decoded_log = contract.events.BookingCreated().processLog(log)
-                            booking_hash = decoded_log['args']['bookingHash'].hex()
-                            break
-                        except:
-                            continue
-                except:
-                    pass
-            
-            if not booking_hash:
-                booking_hash = tx_hash.hex()  # Fallback to transaction hash
+            booking_hash = self._booking_hash(receipt)
             
             return {
                 'success': True,
@@ -783,10 +1680,7 @@ class BlockchainService:
     async def is_booking_verified(self, booking_hash: str) -> bool:
         """Check if booking is verified on blockchain - UPDATED to use bytes32 hash"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['booking'],
-                abi=self.contract_abis['booking']
-            )
+            contract = self.get_contract('booking').contract
             
             # Convert hex string to bytes32 if needed
             if isinstance(booking_hash, str) and booking_hash.startswith('0x'):
@@ -795,7 +1689,7 @@ class BlockchainService:
                 booking_hash_bytes = booking_hash.encode() if isinstance(booking_hash, str) else booking_hash
             
             # Use corrected function: isBookingValid(bytes32 _bookingHash)
-            return contract.functions.isBookingValid(booking_hash_bytes).call()
+            return await self._run_rpc(contract.functions.isBookingValid(booking_hash_bytes).call)
             
         except Exception as e:
             print(f"Error checking booking verification: {str(e)}")
@@ -813,26 +1707,20 @@ class BlockchainService:
             review_string = f"{review_id}_{review_data.get('rating')}_{review_data.get('comment')}_{review_data.get('user_id')}"
             review_hash = self.generate_hash(review_string)
             
-            contract = self.w3.eth.contract(
-                address=self.contracts['reviews'],
-                abi=self.contract_abis['reviews']
-            )
+            contract = self.get_contract('reviews')
             
-            transaction = contract.functions.verifyReview(
+            tx_hash = await self._transact(contract.encode(
+                'verifyReview',
                 review_id,
                 review_hash,
                 user_wallet,
                 destination_id
-            ).build_transaction({
+            ), {
                 'from': self.wallet_address,
                 'gas': 150000,
-                'gasPrice': self.w3.to_wei('20', 'gwei'),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': self.w3.to_wei('20', 'gwei')
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             return {
                 'success': True,
@@ -850,18 +1738,15 @@ class BlockchainService:
     async def is_review_verified(self, review_id: str) -> bool:
         """Check if review is verified on blockchain"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['reviews'],
-                abi=self.contract_abis['reviews']
-            )
+            contract = self.get_contract('reviews').contract
             
-            return contract.functions.isReviewVerified(review_id).call()
+            return await self._run_rpc(contract.functions.isReviewVerified(review_id).call)
             
         except Exception as e:
             print(f"Error checking review verification: {str(e)}")
             return False
     
-    def estimate_gas_cost(self, operation: str) -> Dict:
+    async def estimate_gas_cost(self, operation: str) -> Dict:
         """Estimate gas costs for operations"""
         gas_estimates = {
             'mint_certificate': 300000,
@@ -872,7 +1757,10 @@ class BlockchainService:
         }
         
         try:
-            gas_price = self.w3.eth.gas_price
+            snapshot = self.gas_oracle.snapshot()
+            if not snapshot:
+                raise Exception(self.gas_oracle.last_error or 'Gas price not loaded yet')
+            gas_price = snapshot['gas_price']
             gas_limit = gas_estimates.get(operation, 200000)
             cost_wei = gas_price * gas_limit
             cost_eth = self.w3.from_wei(cost_wei, 'ether')
@@ -897,8 +1785,10 @@ class BlockchainService:
     async def get_dynamic_gas_price(self) -> int:
         """Get dynamic gas price based on network conditions"""
         try:
-            # Get current gas price from network
-            current_gas_price = self.w3.eth.gas_price
+            # Current gas price from the oracle; only a cold start reads it from the network
+            if not self.gas_oracle.snapshot():
+                await self.gas_oracle.refresh()
+            current_gas_price = self.gas_oracle.snapshot()['gas_price']
             
             # Add 10% buffer for faster confirmation
             buffered_price = int(current_gas_price * 1.1)
@@ -930,7 +1820,7 @@ class BlockchainService:
     async def estimate_transaction_gas(self, transaction) -> int:
         """Estimate gas for transaction"""
         try:
-            gas_estimate = self.w3.eth.estimate_gas(transaction)
+            gas_estimate = await self._run_rpc(self.w3.eth.estimate_gas, transaction)
             # Add 20% buffer
             return int(gas_estimate * 1.2)
         except Exception:
@@ -973,10 +1863,8 @@ class BlockchainService:
         """Reset nonce for account"""
         try:
             if self.account:
-                # Get latest nonce from network
-                latest_nonce = self.w3.eth.get_transaction_count(self.account.address, 'latest')
-                pending_nonce = self.w3.eth.get_transaction_count(self.account.address, 'pending')
-                print(f"Nonce reset: latest={latest_nonce}, pending={pending_nonce}")
+                # Realign the local nonce counter with the network
+                await self.get_nonce_manager(self.account.address).resync()
         except Exception as e:
             print(f"Error resetting nonce: {e}")
 
@@ -1000,26 +1888,20 @@ class BlockchainService:
                                            description: str) -> Dict:
         """Award loyalty points using corrected earnPoints function"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['loyalty'],
-                abi=self.contract_abis['loyalty']
-            )
+            contract = self.get_contract('loyalty')
             
             # Use corrected function: earnPoints(address _user, uint256 _bookingAmount, string _description)
-            transaction = contract.functions.earnPoints(
+            tx_hash = await self._transact(contract.encode(
+                'earnPoints',
                 user_wallet,
                 booking_amount,
                 description
-            ).build_transaction({
+            ), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('earn_points'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             return {
                 'success': True,
@@ -1040,35 +1922,29 @@ class BlockchainService:
                                      ipfs_hash: str = "") -> Dict:
         """Verify booking using corrected function signature"""
         try:
-            contract = self.w3.eth.contract(
-                address=self.contracts['booking'],
-                abi=self.contract_abis['booking']
-            )
+            contract = self.get_contract('booking')
             
             # Use corrected function: verifyBooking(address _tourist, address _provider, string _destination, uint256 _amount, uint256 _bookingDate, string _ipfsHash)
-            transaction = contract.functions.verifyBooking(
+            tx_hash = await self._transact(contract.encode(
+                'verifyBooking',
                 tourist_wallet,
                 provider_wallet,
                 destination,
                 amount,
                 booking_date,
                 ipfs_hash
-            ).build_transaction({
+            ), {
                 'from': self.wallet_address,
                 'gas': await self.get_dynamic_gas_limit('verify_booking'),
-                'gasPrice': await self.get_dynamic_gas_price(),
-                'nonce': self.w3.eth.get_transaction_count(self.wallet_address)
+                'gasPrice': await self.get_dynamic_gas_price()
             })
-            
-            signed_txn = self.w3.eth.account.sign_transaction(transaction, self.private_key)
-            tx_hash = self.w3.eth.send_raw_transaction(signed_txn.rawTransaction)
-            receipt = self.w3.eth.wait_for_transaction_receipt(tx_hash)
+            receipt = await self._wait_for_receipt(tx_hash)
             
             # Extract booking hash from return value
             booking_hash = None
             if receipt.logs:
                 try:
-                    decoded_log = contract.events.BookingCreated().processLog(receipt.logs[0])
+                    decoded_log = contract.events.BookingCreated().process_log(receipt.logs[0])
                     booking_hash = decoded_log['args']['bookingHash'].hex()
                 except:
                     booking_hash = tx_hash.hex()  # Fallback
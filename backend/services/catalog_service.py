@@ -0,0 +1,191 @@
+import os
+import json
+import time
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import aiomysql
+
+# Region aliases accepted by /destinations?region=... mapped to the stored division names
+REGION_ALIASES = {
+    # User-friendly names to database values (east instead of central as requested)
+    'east': ['Santhal Pargana Division'],
+    'west': ['Palamu Division'],
+    'north': ['North Chhotanagpur Division'],
+    'south': ['South Chhotanagpur Division'],
+    'central': ['Kolhan Division'],
+    # Handle variations and full names
+    'kolhan': ['Kolhan Division'],
+    'north_chotanagpur': ['North Chhotanagpur Division'],
+    'south_chotanagpur': ['South Chhotanagpur Division'],
+    'santhal_pargana': ['Santhal Pargana Division'],
+    'palamu': ['Palamu Division'],
+    # Direct matches
+    'Kolhan Division': ['Kolhan Division'],
+    'North Chhotanagpur Division': ['North Chhotanagpur Division'],
+    'South Chhotanagpur Division': ['South Chhotanagpur Division'],
+    'Santhal Pargana Division': ['Santhal Pargana Division'],
+    'Palamu Division': ['Palamu Division']
+}
+
+# Region ids mapped to the user-friendly region codes returned by /regions
+REGION_CODES = {
+    'kolhan': 'east',
+    'north_chotanagpur': 'north',
+    'south_chotanagpur': 'south',
+    'santhal_pargana': 'central',
+    'palamu': 'west'
+}
+
+
+def _parse_highlights(value) -> List[str]:
+    if not value:
+        return []
+    if isinstance(value, list):
+        return value
+    return json.loads(value)
+
+
+def _name_key(row: Dict[str, Any]) -> str:
+    # MySQL's default collation orders names case-insensitively
+    return (row.get('name') or '').lower()
+
+
+class CatalogSnapshot:
+    """Immutable view of regions and destinations with precomputed indexes"""
+
+    def __init__(self, regions: List[Dict], destinations: List[Dict]):
+        self.loaded_at = time.monotonic()
+        self.regions = regions
+        self.destinations = sorted(destinations, key=_name_key)
+        self.by_id = {dest['id']: dest for dest in self.destinations}
+
+        self.by_category: Dict[str, List[Dict]] = {}
+        self.by_region: Dict[str, List[Dict]] = {}
+        for dest in self.destinations:
+            self.by_category.setdefault((dest.get('category') or '').lower(), []).append(dest)
+            self.by_region.setdefault((dest.get('region') or '').lower(), []).append(dest)
+
+        self.dropdown = [
+            {'id': dest['id'], 'name': dest['name'], 'location': dest['location']}
+            for dest in self.destinations
+        ]
+
+    def _match_region(self, region: str) -> List[Dict]:
+        region_lower = region.lower()
+        matched_regions = None
+
+        # Try to find a matching region alias
+        for key, values in REGION_ALIASES.items():
+            if key.lower() == region_lower or region_lower in key.lower():
+                matched_regions = values
+                break
+
+        if matched_regions:
+            matches = []
+            for value in matched_regions:
+                matches.extend(self.by_region.get(value.lower(), []))
+            return sorted(matches, key=_name_key) if len(matched_regions) > 1 else matches
+
+        # Fallback: direct match or substring match on the stored region
+        return [
+            dest for dest in self.destinations
+            if region_lower in (dest.get('region') or '').lower()
+        ]
+
+    def filter_destinations(self, category: Optional[str] = None,
+                            region: Optional[str] = None, limit: int = 50) -> List[Dict]:
+        """Destinations ordered by name with optional category and region filters"""
+        if region:
+            candidates = self._match_region(region)
+            if category:
+                category_lower = category.lower()
+                candidates = [d for d in candidates if (d.get('category') or '').lower() == category_lower]
+        elif category:
+            candidates = self.by_category.get(category.lower(), [])
+        else:
+            candidates = self.destinations
+
+        return candidates[:max(limit, 0)]
+
+
+class DestinationCatalog:
+    """Process-level catalog of regions and destinations
+
+    The snapshot is rebuilt in full and swapped in with a single assignment, so
+    readers always see either the old or the new catalog. Admin writes call
+    refresh() after committing; max_age_seconds bounds staleness when another
+    worker process made the change.
+    """
+
+    def __init__(self):
+        self.max_age_seconds = float(os.getenv('CATALOG_MAX_AGE_SECONDS', 300))
+        self._snapshot: Optional[CatalogSnapshot] = None
+        self._lock = asyncio.Lock()
+
+    async def _load(self, pool) -> CatalogSnapshot:
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("SELECT * FROM regions ORDER BY name")
+                regions = await cur.fetchall()
+                await cur.execute("SELECT * FROM destinations ORDER BY name")
+                destinations = await cur.fetchall()
+
+        for region in regions:
+            region['highlights'] = _parse_highlights(region['highlights'])
+            region['region_code'] = REGION_CODES.get(region['id'], region['id'])
+
+            # Override specific regions based on user request (central -> east)
+            if region['id'] == 'santhal_pargana':
+                region['region_code'] = 'east'
+                region['user_friendly_name'] = 'East Jharkhand'
+
+        for dest in destinations:
+            dest['highlights'] = _parse_highlights(dest['highlights'])
+
+        return CatalogSnapshot(list(regions), list(destinations))
+
+    def _is_fresh(self, snapshot: Optional[CatalogSnapshot]) -> bool:
+        return snapshot is not None and time.monotonic() - snapshot.loaded_at <= self.max_age_seconds
+
+    async def _swap(self, pool):
+        try:
+            self._snapshot = await self._load(pool)
+        except Exception as e:
+            # Drop the stale snapshot so the next read retries the load
+            self._snapshot = None
+            print(f"Error loading destination catalog: {e}")
+            raise
+
+    async def reload(self, pool):
+        """Rebuild the snapshot and swap it in atomically"""
+        async with self._lock:
+            await self._swap(pool)
+
+    async def refresh(self, pool):
+        """reload() for write paths: the write has already committed, so a
+        failed load is only logged and leaves the next read to retry it"""
+        try:
+            await self.reload(pool)
+        except Exception:
+            self.invalidate()
+
+    def invalidate(self):
+        """Mark the snapshot stale; the next read reloads it"""
+        self._snapshot = None
+
+    async def get(self, pool) -> CatalogSnapshot:
+        """Current snapshot, loading it on first use or once it has aged out"""
+        snapshot = self._snapshot
+        if self._is_fresh(snapshot):
+            return snapshot
+
+        async with self._lock:
+            # Another request may have reloaded while we waited for the lock
+            if not self._is_fresh(self._snapshot):
+                await self._swap(pool)
+            return self._snapshot
+
+
+# Global destination catalog instance
+destination_catalog = DestinationCatalog()
@@ -0,0 +1,143 @@
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+# Rough chars-per-token ratio for English chat text; good enough for budgeting
+CHARS_PER_TOKEN = 4
+SUMMARY_ITEM_CHARS = 160
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text or '') // CHARS_PER_TOKEN + 1
+
+
+class ConversationContext:
+    """Recent turns of one chat session plus a running summary of older ones"""
+
+    def __init__(self):
+        self.turns: List[Tuple[str, str]] = []
+        self.summary_items: List[str] = []
+
+    def tokens(self) -> int:
+        total = sum(estimate_tokens(item) for item in self.summary_items)
+        for user_message, reply in self.turns:
+            total += estimate_tokens(user_message) + estimate_tokens(reply)
+        return total
+
+    def messages(self) -> List[Dict[str, str]]:
+        """History in chat-completion message format"""
+        messages = []
+        if self.summary_items:
+            messages.append({
+                "role": "system",
+                "content": "Summary of the earlier conversation: " + " ".join(self.summary_items)
+            })
+        for user_message, reply in self.turns:
+            messages.append({"role": "user", "content": user_message})
+            messages.append({"role": "assistant", "content": reply})
+        return messages
+
+
+class ConversationContextManager:
+    """Bounded LRU of chat session histories, trimmed to a token budget
+
+    A session's history is seeded from chat_logs once (on a cache miss) and then
+    kept up to date in memory as turns complete. When a session goes over its
+    token budget the oldest turns are folded into a compact summary, and the
+    summary itself is capped at a share of the budget, so prompt size stays
+    bounded no matter how long the session runs.
+    """
+
+    def __init__(self):
+        self.max_sessions = int(os.getenv('CHAT_CONTEXT_MAX_SESSIONS', 5000))
+        self.token_budget = int(os.getenv('CHAT_CONTEXT_TOKEN_BUDGET', 1500))
+        self.min_recent_turns = int(os.getenv('CHAT_CONTEXT_MIN_TURNS', 2))
+        self.seed_turns = int(os.getenv('CHAT_CONTEXT_SEED_TURNS', 10))
+        self._sessions: "OrderedDict[Tuple[str, str], ConversationContext]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.summarized_turns = 0
+
+    def _touch(self, key: Tuple[str, str]) -> Optional[ConversationContext]:
+        context = self._sessions.get(key)
+        if context is not None:
+            self._sessions.move_to_end(key)
+        return context
+
+    def _store(self, key: Tuple[str, str], context: ConversationContext):
+        self._sessions[key] = context
+        self._sessions.move_to_end(key)
+        while len(self._sessions) > self.max_sessions:
+            self._sessions.popitem(last=False)
+
+    @staticmethod
+    def _summarize_turn(user_message: str, reply: str) -> str:
+        question = ' '.join(user_message.split())
+        answer = ' '.join(reply.split())
+        if len(question) > SUMMARY_ITEM_CHARS:
+            question = question[:SUMMARY_ITEM_CHARS].rstrip() + '...'
+        if len(answer) > SUMMARY_ITEM_CHARS:
+            answer = answer[:SUMMARY_ITEM_CHARS].rstrip() + '...'
+        return f"User asked: {question} Assistant answered: {answer}"
+
+    def _trim(self, context: ConversationContext):
+        # Fold the oldest turns into the summary until the session fits the budget
+        while context.tokens() > self.token_budget and len(context.turns) > self.min_recent_turns:
+            user_message, reply = context.turns.pop(0)
+            context.summary_items.append(self._summarize_turn(user_message, reply))
+            self.summarized_turns += 1
+
+        # Keep the summary to at most a third of the budget, dropping its oldest items
+        summary_budget = self.token_budget // 3
+        while context.summary_items and sum(estimate_tokens(i) for i in context.summary_items) > summary_budget:
+            context.summary_items.pop(0)
+
+    async def get_history(self, user_id: str, session_id: str,
+                          load_turns: Callable[[int], Awaitable[List[Dict[str, Any]]]]) -> List[Dict[str, str]]:
+        """Session history as chat messages, loading recent turns from the database only on a miss"""
+        key = (user_id, session_id)
+        context = self._touch(key)
+        if context is not None:
+            self.hits += 1
+            return context.messages()
+
+        self.misses += 1
+        context = ConversationContext()
+        rows = await load_turns(self.seed_turns)
+        context.turns = [(row['message'], row['response']) for row in rows]
+        self._trim(context)
+        # Another request may have seeded the session while we were loading
+        existing = self._touch(key)
+        if existing is not None:
+            return existing.messages()
+        self._store(key, context)
+        return context.messages()
+
+    def record_turn(self, user_id: str, session_id: str, user_message: str, reply: str):
+        """Append a completed turn to the session and re-apply the token budget"""
+        key = (user_id, session_id)
+        context = self._touch(key)
+        if context is None:
+            context = ConversationContext()
+            self._store(key, context)
+        context.turns.append((user_message, reply))
+        self._trim(context)
+
+    def forget(self, user_id: str, session_id: str):
+        self._sessions.pop((user_id, session_id), None)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'sessions': len(self._sessions),
+            'max_sessions': self.max_sessions,
+            'token_budget': self.token_budget,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 4) if lookups else 0.0,
+            'summarized_turns': self.summarized_turns
+        }
+
+
+# Global conversation context manager instance
+conversation_contexts = ConversationContextManager()
@@ -0,0 +1,208 @@
+import os
+import json
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Dict, Optional, Tuple
+
+
+def month_range(now: datetime) -> Tuple[datetime, datetime]:
+    """[start, end) of the calendar month containing now, for sargable date filters"""
+    start = now.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+    if start.month == 12:
+        end = start.replace(year=start.year + 1, month=1)
+    else:
+        end = start.replace(month=start.month + 1)
+    return start, end
+
+
+def _json_default(value: Any):
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return str(value)
+
+
+class SellerDashboardSnapshots:
+    """Per-seller marketplace dashboard snapshots, one row per seller
+
+    The artisan and provider dashboards read a single row by primary key. Product,
+    event and order writes mark the seller's row stale and bump its version, and
+    the next dashboard load rebuilds it; a rebuild only clears the flag if the
+    version is still the one it read, so an invalidation that lands mid-rebuild
+    is not lost. Rows are also rebuilt when the month rolls
+    over or after SELLER_DASHBOARD_MAX_AGE_SECONDS, since upcoming/ongoing events
+    change with time alone.
+    """
+
+    def __init__(self):
+        self.max_age_seconds = int(os.getenv('SELLER_DASHBOARD_MAX_AGE_SECONDS', 300))
+
+    async def ensure_schema(self, cur):
+        """Create the snapshot table and the indexes used to rebuild it"""
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS seller_dashboard_snapshots (
+                seller_id VARCHAR(255) PRIMARY KEY,
+                period_start DATETIME NOT NULL,
+                payload JSON NOT NULL,
+                stale TINYINT(1) NOT NULL DEFAULT 0,
+                version INT NOT NULL DEFAULT 0,
+                refreshed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+        try:
+            await cur.execute("ALTER TABLE seller_dashboard_snapshots ADD COLUMN version INT NOT NULL DEFAULT 0")
+        except Exception as e:
+            if "Duplicate column name" not in str(e):
+                print(f"Error adding version column to seller_dashboard_snapshots: {str(e)}")
+        for index_name, index_def in (
+            ('idx_handicraft_orders_seller_date', 'handicraft_orders(seller_id, order_date)'),
+            ('idx_event_bookings_organizer_date', 'event_bookings(organizer_id, booking_date)'),
+        ):
+            try:
+                await cur.execute(f"CREATE INDEX {index_name} ON {index_def}")
+            except Exception as e:
+                if "Duplicate key name" not in str(e) and "doesn't exist" not in str(e):
+                    print(f"Warning: Could not create index {index_name}: {str(e)}")
+
+    async def invalidate(self, cur, seller_id: str):
+        """Mark a seller's snapshot stale after a product, event or order write
+
+        Sellers without a snapshot get a stale placeholder row, so a first
+        rebuild already in progress cannot save its figures as fresh.
+        """
+        await cur.execute("""
+            INSERT INTO seller_dashboard_snapshots (seller_id, period_start, payload, stale, version)
+            VALUES (%s, '1970-01-01', '{}', 1, 1)
+            ON DUPLICATE KEY UPDATE stale = 1, version = version + 1
+        """, (seller_id,))
+
+    async def _build(self, cur, seller_id: str, now: datetime) -> Dict[str, Any]:
+        month_start, month_end = month_range(now)
+
+        await cur.execute("""
+            SELECT
+                COUNT(*) as total_products,
+                COALESCE(SUM(CASE WHEN is_available = 1 THEN 1 ELSE 0 END), 0) as active_products,
+                COALESCE(SUM(CASE WHEN stock_quantity <= 5 AND stock_quantity > 0 THEN 1 ELSE 0 END), 0) as low_stock_items,
+                COALESCE(AVG(rating), 0) as avg_rating,
+                COALESCE(SUM(total_reviews), 0) as total_reviews
+            FROM handicrafts
+            WHERE seller_id = %s
+        """, (seller_id,))
+        handicrafts_stats = await cur.fetchone()
+
+        await cur.execute("""
+            SELECT
+                COUNT(*) as total_events,
+                COALESCE(SUM(CASE WHEN is_active = 1 THEN 1 ELSE 0 END), 0) as active_events,
+                COALESCE(SUM(CASE WHEN is_active = 1 AND start_date > %s THEN 1 ELSE 0 END), 0) as upcoming_events,
+                COALESCE(SUM(CASE WHEN start_date < %s AND end_date > %s THEN 1 ELSE 0 END), 0) as ongoing_events,
+                COALESCE(AVG(rating), 0) as avg_rating,
+                COALESCE(SUM(total_reviews), 0) as total_reviews
+            FROM cultural_events
+            WHERE organizer_id = %s
+        """, (now, now, now, seller_id))
+        events_stats = await cur.fetchone()
+
+        # Orders this month, on a plain date range so (seller_id, order_date) is used
+        await cur.execute("""
+            SELECT
+                COUNT(*) as total_orders,
+                COALESCE(SUM(total_price), 0) as total_revenue,
+                COUNT(CASE WHEN status = 'pending' THEN 1 END) as pending_orders,
+                COUNT(CASE WHEN status = 'delivered' THEN 1 END) as completed_orders
+            FROM handicraft_orders
+            WHERE seller_id = %s AND order_date >= %s AND order_date < %s
+        """, (seller_id, month_start, month_end))
+        orders_stats = await cur.fetchone()
+
+        await cur.execute("""
+            SELECT
+                COUNT(*) as all_orders,
+                COUNT(CASE WHEN status IN ('pending', 'confirmed') THEN 1 END) as open_orders,
+                COALESCE(SUM(CASE WHEN status = 'delivered' AND delivered_at >= %s AND delivered_at < %s
+                                  THEN total_price ELSE 0 END), 0) as monthly_sales
+            FROM handicraft_orders
+            WHERE seller_id = %s
+        """, (month_start, month_end, seller_id))
+        orders_stats.update(await cur.fetchone())
+
+        await cur.execute("SELECT COUNT(*) as total_bookings FROM event_bookings WHERE organizer_id = %s", (seller_id,))
+        bookings_stats = await cur.fetchone()
+
+        await cur.execute("""
+            SELECT ho.*, h.name as product_name, u.name as buyer_name
+            FROM handicraft_orders ho
+            JOIN handicrafts h ON ho.handicraft_id = h.id
+            JOIN users u ON ho.user_id = u.id
+            WHERE ho.seller_id = %s
+            ORDER BY ho.order_date DESC
+            LIMIT 5
+        """, (seller_id,))
+        recent_orders = await cur.fetchall()
+
+        await cur.execute("""
+            SELECT eb.*, e.title as event_title, u.name as participant_name
+            FROM event_bookings eb
+            JOIN cultural_events e ON eb.event_id = e.id
+            JOIN users u ON eb.user_id = u.id
+            WHERE eb.organizer_id = %s
+            ORDER BY eb.booking_date DESC
+            LIMIT 5
+        """, (seller_id,))
+        recent_bookings = await cur.fetchall()
+
+        return {
+            "handicrafts_stats": handicrafts_stats,
+            "events_stats": events_stats,
+            "orders_stats": orders_stats,
+            "bookings_stats": bookings_stats,
+            "recent_orders": recent_orders,
+            "recent_bookings": recent_bookings,
+            "snapshot_at": now.isoformat()
+        }
+
+    def _is_fresh(self, row: Optional[Dict[str, Any]], now: datetime) -> bool:
+        if not row or row['stale']:
+            return False
+        if row['period_start'] != month_range(now)[0]:
+            return False
+        return (now - row['refreshed_at']).total_seconds() <= self.max_age_seconds
+
+    async def get(self, cur, seller_id: str) -> Dict[str, Any]:
+        """Dashboard payload for a seller: one primary-key read, rebuilt only when stale
+
+        cur must be a DictCursor.
+        """
+        await cur.execute("SELECT NOW() as now")
+        now = (await cur.fetchone())['now']
+
+        await cur.execute("""
+            SELECT period_start, payload, stale, version, refreshed_at
+            FROM seller_dashboard_snapshots
+            WHERE seller_id = %s
+        """, (seller_id,))
+        row = await cur.fetchone()
+        if self._is_fresh(row, now):
+            payload = row['payload']
+            return json.loads(payload) if isinstance(payload, str) else payload
+
+        payload = await self._build(cur, seller_id, now)
+        # Round-trip through JSON so fresh and cached loads return identical shapes
+        payload = json.loads(json.dumps(payload, default=_json_default))
+        # Stays stale if the seller was invalidated while this rebuild ran
+        await cur.execute("""
+            INSERT INTO seller_dashboard_snapshots (seller_id, period_start, payload, stale, refreshed_at)
+            VALUES (%s, %s, %s, 0, %s)
+            ON DUPLICATE KEY UPDATE
+                period_start = VALUES(period_start),
+                payload = VALUES(payload),
+                stale = IF(version = %s, 0, 1),
+                refreshed_at = VALUES(refreshed_at)
+        """, (seller_id, month_range(now)[0], json.dumps(payload), now, row['version'] if row else 0))
+        return payload
+
+
+# Global seller dashboard snapshot instance
+seller_dashboards = SellerDashboardSnapshots()
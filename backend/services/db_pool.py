@@ -0,0 +1,160 @@
+import os
+import time
+import asyncio
+from bisect import bisect_left
+from typing import Any, Dict, List, Optional
+
+import aiomysql
+
+# Upper bounds of the latency histogram buckets, in milliseconds; the last bucket is open-ended
+LATENCY_BUCKETS_MS = [1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500]
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram with count, sum and max"""
+
+    def __init__(self, bounds_ms: List[float] = LATENCY_BUCKETS_MS):
+        self.bounds_ms = bounds_ms
+        self.counts = [0] * (len(bounds_ms) + 1)
+        self.total = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, elapsed_ms: float):
+        self.counts[bisect_left(self.bounds_ms, elapsed_ms)] += 1
+        self.total += 1
+        self.sum_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+
+    def stats(self) -> Dict[str, Any]:
+        labels = [f"<={bound}ms" for bound in self.bounds_ms] + [f">{self.bounds_ms[-1]}ms"]
+        return {
+            'count': self.total,
+            'avg_ms': round(self.sum_ms / self.total, 2) if self.total else 0.0,
+            'max_ms': round(self.max_ms, 2),
+            'buckets': dict(zip(labels, self.counts))
+        }
+
+
+class InstrumentedPool(aiomysql.Pool):
+    """aiomysql pool that records acquire waits, hold times and waiters
+
+    acquire_wait is the time a handler spent waiting for a connection (pool
+    starvation); hold_time is how long it kept one (queries plus whatever the
+    handler did in between). A slow endpoint with a high acquire_wait needs a
+    bigger pool or shorter holds; a high hold_time with no wait points at MySQL.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.waiters = 0
+        self.acquire_wait = LatencyHistogram()
+        self.hold_time = LatencyHistogram()
+        self.ping_failures = 0
+        self._acquired_at: Dict[int, float] = {}
+        self._ping_task: Optional[asyncio.Task] = None
+
+    async def _acquire(self):
+        started = time.perf_counter()
+        self.waiters += 1
+        try:
+            conn = await super()._acquire()
+        finally:
+            self.waiters -= 1
+        now = time.perf_counter()
+        self.acquire_wait.observe((now - started) * 1000)
+        self._acquired_at[id(conn)] = now
+        return conn
+
+    def release(self, conn):
+        acquired_at = self._acquired_at.pop(id(conn), None)
+        if acquired_at is not None:
+            self.hold_time.observe((time.perf_counter() - acquired_at) * 1000)
+        return super().release(conn)
+
+    async def warm_up(self):
+        """Open minsize connections now rather than on the first requests"""
+        async with self._cond:
+            await self._fill_free_pool(False)
+
+    async def ping_idle(self, timeout: float = 5.0) -> int:
+        """Ping every idle connection, dropping dead ones and refilling to minsize"""
+        async with self._cond:
+            idle = list(self._free)
+            self._free.clear()
+            self._used.update(idle)
+
+        failed = 0
+        try:
+            for conn in idle:
+                try:
+                    await asyncio.wait_for(conn.ping(reconnect=False), timeout)
+                except Exception:
+                    conn.close()
+                    failed += 1
+        finally:
+            # Released closed connections are dropped by the pool; also runs on
+            # cancellation so shutdown's wait_closed() is not left waiting
+            for conn in idle:
+                super().release(conn)
+
+        self.ping_failures += failed
+        if not self._closing:
+            await self.warm_up()
+        return failed
+
+    def start_health_checks(self, interval_seconds: float):
+        if not self._ping_task and interval_seconds > 0:
+            self._ping_task = asyncio.create_task(self._run_health_checks(interval_seconds))
+
+    async def _run_health_checks(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                failed = await self.ping_idle()
+                if failed:
+                    print(f"DB pool health check dropped {failed} dead connections")
+            except Exception as e:
+                print(f"Error in DB pool health check: {str(e)}")
+
+    def close(self):
+        if self._ping_task:
+            self._ping_task.cancel()
+            self._ping_task = None
+        super().close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'minsize': self.minsize,
+            'maxsize': self.maxsize,
+            'size': self.size,
+            'in_use': len(self._used),
+            'idle': self.freesize,
+            'connecting': self._acquiring,
+            'waiters': self.waiters,
+            'recycle_seconds': self._recycle,
+            'ping_failures': self.ping_failures,
+            'acquire_wait': self.acquire_wait.stats(),
+            'hold_time': self.hold_time.stats()
+        }
+
+
+async def create_db_pool(**kwargs) -> InstrumentedPool:
+    """Instrumented pool sized from the environment, pre-warmed and health-checked
+
+    DB_POOL_MIN_SIZE connections are opened before this returns, up to
+    DB_POOL_MAX_SIZE are opened on demand, connections idle longer than
+    DB_POOL_RECYCLE_SECONDS are replaced (keep it under MySQL's wait_timeout),
+    and idle connections are pinged every DB_POOL_PING_SECONDS.
+    """
+    pool = InstrumentedPool(
+        minsize=int(os.getenv('DB_POOL_MIN_SIZE', 5)),
+        maxsize=int(os.getenv('DB_POOL_MAX_SIZE', 20)),
+        echo=False,
+        pool_recycle=int(os.getenv('DB_POOL_RECYCLE_SECONDS', 3600)),
+        loop=asyncio.get_running_loop(),
+        **kwargs
+    )
+    await pool.warm_up()
+    pool.start_health_checks(float(os.getenv('DB_POOL_PING_SECONDS', 30)))
+    return pool
@@ -0,0 +1,54 @@
+import io
+import os
+import csv
+import json
+from typing import Any, AsyncIterator, Sequence
+
+import aiomysql
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv'
+}
+
+
+def _csv_lines(rows: Sequence[Sequence[Any]]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+
+async def stream_query(pool, sql: str, params: Sequence[Any], fmt: str) -> AsyncIterator[str]:
+    """Stream a query result as NDJSON or CSV without loading it into memory
+
+    Rows are read from an unbuffered server-side cursor (SSDictCursor) in
+    chunks of EXPORT_CHUNK_SIZE, so memory stays flat however many rows the
+    query returns. If the client goes away mid-export the connection is closed
+    rather than returned to the pool, since it still has unread rows pending.
+    """
+    chunk_size = int(os.getenv('EXPORT_CHUNK_SIZE', 1000))
+    conn = await pool.acquire()
+    cur = await conn.cursor(aiomysql.SSDictCursor)
+    finished = False
+    try:
+        await cur.execute(sql, params)
+        columns = [column[0] for column in cur.description]
+        if fmt == 'csv':
+            yield _csv_lines([columns])
+
+        while True:
+            rows = await cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            if fmt == 'csv':
+                yield _csv_lines([[row[column] for column in columns] for row in rows])
+            else:
+                yield "".join(json.dumps(row, default=str) + "\n" for row in rows)
+        finished = True
+    finally:
+        if finished:
+            await cur.close()
+        else:
+            # Closing the cursor would read every remaining row first
+            conn.close()
+        pool.release(conn)
@@ -1,13 +1,23 @@
 import os
 import asyncio
-from typing import Dict, List, Any, Optional
+from typing import AsyncIterator, Dict, List, Any, Optional
 from datetime import datetime
 from dotenv import load_dotenv
+import litellm
 from emergentintegrations.llm.chat import LlmChat, UserMessage
 
+from services.llm_guard import llm_guard, LLMUnavailable
+
 # Load environment variables
 load_dotenv()
 
+CHAT_MODEL = "gemini-2.0-flash"
+CHAT_SYSTEM_MESSAGE = "You are a helpful tourism assistant for Jharkhand, India. Provide accurate, friendly information about destinations, culture, travel tips, and bookings. Be concise but informative. Always promote sustainable and respectful tourism."
+
+class FallbackReply(str):
+    """The canned reply, streamed in place of model output; callers must not record it"""
+
+
 class GeminiService:
     def __init__(self):
         self.api_key = os.getenv('GEMINI_API_KEY')
@@ -33,10 +43,13 @@ class GeminiService:
             user_message = UserMessage(text=prompt)
             
             # Send message and get response
-            response = await chat.send_message(user_message)
+            response = await llm_guard.call('itinerary', lambda: chat.send_message(user_message))
             
             return self._parse_itinerary_response(response, user_preferences)
                 
+        except LLMUnavailable as e:
+            print(f"Skipping itinerary generation: {str(e)}")
+            return self._generate_fallback_itinerary(user_preferences)
         except Exception as e:
             print(f"Error generating itinerary: {str(e)}")
             return self._generate_fallback_itinerary(user_preferences)
@@ -46,29 +59,60 @@ class GeminiService:
         Generate chatbot response using Gemini model
         """
         try:
-            # Create a chat instance for chatbot
-            chat = LlmChat(
-                api_key=self.api_key,
-                session_id=f"chat_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
-                system_message="You are a helpful tourism assistant for Jharkhand, India. Provide accurate, friendly information about destinations, culture, travel tips, and bookings. Be concise but informative. Always promote sustainable and respectful tourism."
-            ).with_model("gemini", "gemini-2.0-flash")
-            
-            # Create user message
-            message = UserMessage(text=user_message)
-            
-            # Send message and get response
-            response = await chat.send_message(message)
+            response = await llm_guard.call('chat', lambda: litellm.acompletion(
+                model=f"gemini/{CHAT_MODEL}",
+                messages=self._chat_messages(user_message, conversation_history),
+                api_key=self.api_key
+            ))
             
             return {
-                "message": response,
+                "message": response.choices[0].message.content,
                 "timestamp": datetime.utcnow().isoformat(),
-                "model": "gemini-2.0-flash"
+                "model": CHAT_MODEL
             }
                 
+        except LLMUnavailable as e:
+            print(f"Skipping chat response: {str(e)}")
+            return self._generate_fallback_chat_response(user_message)
         except Exception as e:
             print(f"Error generating chat response: {str(e)}")
             return self._generate_fallback_chat_response(user_message)
     
+    def _chat_messages(self, user_message: str, conversation_history: List[Dict] = None) -> List[Dict]:
+        """System prompt, prior turns and the new message in chat-completion format"""
+        messages = [{"role": "system", "content": CHAT_SYSTEM_MESSAGE}]
+        messages.extend(conversation_history or [])
+        messages.append({"role": "user", "content": user_message})
+        return messages
+    
+    async def stream_chat_response(self, user_message: str,
+                                   conversation_history: List[Dict] = None) -> AsyncIterator[str]:
+        """
+        Stream a chatbot reply token by token, falling back to the canned reply on failure
+        
+        The canned reply is yielded as a FallbackReply so callers can tell it from model output.
+        """
+        sent_any = False
+        stream = llm_guard.stream('chat_stream', lambda: litellm.acompletion(
+            model=f"gemini/{CHAT_MODEL}",
+            messages=self._chat_messages(user_message, conversation_history),
+            api_key=self.api_key,
+            stream=True
+        ))
+        try:
+            async for chunk in stream:
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    sent_any = True
+                    yield delta
+        except Exception as e:
+            print(f"Error streaming chat response: {str(e)}")
+            if not sent_any:
+                yield FallbackReply(self._generate_fallback_chat_response(user_message)["message"])
+        finally:
+            # Free the LLM slot right away if the client disconnected mid-stream
+            await stream.aclose()
+    
     def _create_itinerary_prompt(self, preferences: Dict[str, Any]) -> str:
         """Create a detailed prompt for itinerary generation"""
         destinations = ', '.join(preferences.get('destinations', ['Ranchi']))
@@ -161,6 +205,7 @@ class GeminiService:
     
     def _generate_fallback_itinerary(self, preferences: Dict) -> Dict[str, Any]:
         """Generate fallback itinerary when Gemini API fails"""
+        llm_guard.fallbacks += 1
         return {
             "id": f"fallback_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}",
             "destination": ', '.join(preferences.get('destinations', ['Jharkhand'])),
@@ -176,6 +221,7 @@ class GeminiService:
     
     def _generate_fallback_chat_response(self, user_message: str) -> Dict[str, Any]:
         """Generate fallback chat response when Gemini API fails"""
+        llm_guard.fallbacks += 1
         return {
             "message": "I'm sorry, I'm having trouble connecting to my AI service right now. Please try again in a moment, or contact our support team for assistance with your Jharkhand travel questions.",
             "timestamp": datetime.utcnow().isoformat(),
@@ -0,0 +1,216 @@
+import os
+import json
+import copy
+import uuid
+import asyncio
+import hashlib
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import aiomysql
+
+from services.cache_service import TTLCache
+
+
+def _normalize_list(values) -> List[str]:
+    if isinstance(values, str):
+        values = [values]
+    return sorted({str(v).strip().lower() for v in (values or []) if str(v).strip()})
+
+
+def normalize_preferences(preferences: Dict[str, Any]) -> Dict[str, Any]:
+    """Canonical form of planner preferences: order and case of list entries do not matter"""
+    return {
+        'destinations': _normalize_list(preferences.get('destinations')),
+        'interests': _normalize_list(preferences.get('interests')),
+        'days': int(preferences.get('days') or 0),
+        'budget': round(float(preferences.get('budget') or 0)),
+        'travel_style': str(preferences.get('travel_style') or '').strip().lower(),
+        'group_size': int(preferences.get('group_size') or 0)
+    }
+
+
+def itinerary_cache_key(preferences: Dict[str, Any]) -> str:
+    canonical = json.dumps(normalize_preferences(preferences), sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+class ItineraryCache:
+    """Caches generated itineraries by normalized preferences
+
+    Lookups go memory -> itineraries table -> LLM. Concurrent requests for the
+    same key share one in-flight generation. Every caller receives its own
+    copy with a fresh id, so each planner submission can still be stored.
+    """
+
+    def __init__(self):
+        self.ttl_seconds = float(os.getenv('ITINERARY_CACHE_TTL_SECONDS', 6 * 3600))
+        self.db_lookup = os.getenv('ITINERARY_CACHE_DB_LOOKUP', 'true').lower() == 'true'
+        self.prewarm_top_n = int(os.getenv('ITINERARY_CACHE_PREWARM_TOP_N', 50))
+        self.memory = TTLCache(
+            name='itineraries',
+            ttl_seconds=self.ttl_seconds,
+            max_size=int(os.getenv('ITINERARY_CACHE_MAX_SIZE', 500))
+        )
+        self._in_flight: Dict[str, asyncio.Future] = {}
+        self.coalesced = 0
+        self.db_hits = 0
+        self.generated = 0
+
+    async def ensure_schema(self, cur):
+        """Add the cache_key column used for database lookups"""
+        try:
+            await cur.execute("ALTER TABLE itineraries ADD COLUMN cache_key CHAR(64) DEFAULT NULL")
+        except Exception as e:
+            if "Duplicate column name" not in str(e):
+                print(f"Error adding cache_key column: {str(e)}")
+        try:
+            await cur.execute("CREATE INDEX idx_itineraries_cache_key ON itineraries(cache_key, generated_at)")
+        except Exception as e:
+            if "Duplicate key name" not in str(e):
+                print(f"Warning: Could not create index idx_itineraries_cache_key: {str(e)}")
+
+    def _issue(self, itinerary: Dict[str, Any], preferences: Dict[str, Any], cached: bool) -> Dict[str, Any]:
+        issued = copy.deepcopy(itinerary)
+        issued['id'] = f"itinerary_{datetime.utcnow().strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:8]}"
+        issued['preferences'] = preferences
+        issued['cached'] = cached
+        return issued
+
+    def _remember(self, key: str, itinerary: Dict[str, Any], ttl_seconds: Optional[float] = None):
+        # Fallback itineraries are served but never cached
+        if itinerary.get('status') == 'generated':
+            self.memory.set(key, itinerary, ttl_seconds)
+
+    @staticmethod
+    def _row_to_itinerary(row: Dict[str, Any], preferences: Dict[str, Any]) -> Dict[str, Any]:
+        generated_at = row['generated_at']
+        return {
+            "destination": row['destination'],
+            "days": row['days'],
+            "budget": float(row['budget']),
+            "currency": "INR",
+            "content": row['content'],
+            "preferences": preferences,
+            "generated_at": generated_at.isoformat() if hasattr(generated_at, 'isoformat') else generated_at,
+            "model": "gemini-2.0-flash",
+            "status": "generated"
+        }
+
+    async def _lookup_db(self, pool, key: str, preferences: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("""
+                    SELECT destination, days, budget, content, generated_at
+                    FROM itineraries
+                    WHERE cache_key = %s
+                        AND generated_at >= DATE_SUB(NOW(), INTERVAL %s SECOND)
+                        AND content NOT LIKE 'Fallback itinerary%%'
+                    ORDER BY generated_at DESC
+                    LIMIT 1
+                """, (key, int(self.ttl_seconds)))
+                row = await cur.fetchone()
+        return self._row_to_itinerary(row, preferences) if row else None
+
+    async def get_or_generate(self, preferences: Dict[str, Any],
+                              generate: Callable[[Dict[str, Any]], Awaitable[Dict[str, Any]]],
+                              pool=None) -> Dict[str, Any]:
+        """Cached itinerary for these preferences, generating it at most once per key"""
+        key = itinerary_cache_key(preferences)
+
+        cached = self.memory.get(key)
+        if cached is not None:
+            return self._issue(cached, preferences, cached=True)
+
+        in_flight = self._in_flight.get(key)
+        if in_flight is not None:
+            self.coalesced += 1
+            itinerary = await asyncio.shield(in_flight)
+            return self._issue(itinerary, preferences, cached=True)
+
+        future = asyncio.get_running_loop().create_future()
+        self._in_flight[key] = future
+        try:
+            itinerary = None
+            if pool is not None and self.db_lookup:
+                try:
+                    itinerary = await self._lookup_db(pool, key, preferences)
+                    if itinerary:
+                        self.db_hits += 1
+                except Exception as e:
+                    print(f"Error looking up cached itinerary: {e}")
+
+            from_cache = itinerary is not None
+            if itinerary is None:
+                itinerary = await generate(preferences)
+                self.generated += 1
+
+            self._remember(key, itinerary)
+            future.set_result(itinerary)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Waiters receive the exception; mark it retrieved for the creator
+            future.exception()
+            raise
+        finally:
+            self._in_flight.pop(key, None)
+
+        return self._issue(itinerary, preferences, cached=from_cache)
+
+    async def prewarm(self, pool) -> int:
+        """Load the most requested preference combinations from recent itineraries"""
+        async with pool.acquire() as conn:
+            async with conn.cursor(aiomysql.DictCursor) as cur:
+                await cur.execute("""
+                    SELECT destination, days, budget, content, preferences, generated_at,
+                        TIMESTAMPDIFF(SECOND, generated_at, NOW()) as age_seconds
+                    FROM itineraries
+                    WHERE generated_at >= DATE_SUB(NOW(), INTERVAL %s SECOND)
+                        AND preferences IS NOT NULL
+                        AND content NOT LIKE 'Fallback itinerary%%'
+                    ORDER BY generated_at DESC
+                    LIMIT 5000
+                """, (int(self.ttl_seconds),))
+                rows = await cur.fetchall()
+
+        counts = Counter()
+        latest: Dict[str, Dict[str, Any]] = {}
+        for row in rows:
+            try:
+                preferences = row['preferences']
+                if isinstance(preferences, str):
+                    preferences = json.loads(preferences)
+                key = itinerary_cache_key(preferences)
+            except Exception:
+                continue
+            counts[key] += 1
+            # Rows are newest first, so the first one seen per key is the freshest
+            if key not in latest:
+                latest[key] = (row, preferences)
+
+        warmed = 0
+        for key, _ in counts.most_common(self.prewarm_top_n):
+            row, preferences = latest[key]
+            remaining = self.ttl_seconds - float(row['age_seconds'] or 0)
+            if remaining > 0:
+                self._remember(key, self._row_to_itinerary(row, preferences), remaining)
+                warmed += 1
+        return warmed
+
+    def stats(self) -> Dict[str, Any]:
+        stats = self.memory.stats()
+        stats.update({
+            'in_flight': len(self._in_flight),
+            'coalesced': self.coalesced,
+            'db_hits': self.db_hits,
+            'generated': self.generated
+        })
+        return stats
+
+
+# Global itinerary cache instance
+itinerary_cache = ItineraryCache()
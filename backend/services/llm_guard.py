@@ -0,0 +1,206 @@
+import os
+import time
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict
+
+
+class LLMUnavailable(Exception):
+    """Raised when an LLM call is not attempted: circuit open or no free slot"""
+
+
+class CircuitBreaker:
+    """Consecutive-failure circuit breaker with a single half-open probe
+
+    closed    -> calls pass; failure_threshold consecutive failures open it
+    open      -> calls are rejected until reset_seconds have passed
+    half_open -> one probe call is let through; success closes, failure re-opens
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = 'closed'
+        self.consecutive_failures = 0
+        self.opened_at = 0.0
+        self.times_opened = 0
+        self._probe_in_flight = False
+
+    def allow(self) -> bool:
+        if self.state == 'closed':
+            return True
+        if self.state == 'open':
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                return False
+            self.state = 'half_open'
+        if self._probe_in_flight:
+            return False
+        self._probe_in_flight = True
+        return True
+
+    def record_success(self):
+        self.consecutive_failures = 0
+        self._probe_in_flight = False
+        self.state = 'closed'
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        self._probe_in_flight = False
+        if self.state == 'half_open' or self.consecutive_failures >= self.failure_threshold:
+            if self.state != 'open':
+                self.times_opened += 1
+            self.state = 'open'
+            self.opened_at = time.monotonic()
+
+    def release_probe(self):
+        """The probe ended without an outcome (e.g. cancelled); let another one through"""
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        retry_in = 0.0
+        if self.state == 'open':
+            retry_in = max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at))
+        return {
+            'state': self.state,
+            'consecutive_failures': self.consecutive_failures,
+            'failure_threshold': self.failure_threshold,
+            'times_opened': self.times_opened,
+            'retry_in_seconds': round(retry_in, 1)
+        }
+
+
+class LLMGuard:
+    """Bounds outstanding LLM calls and fails fast while the provider is unhealthy
+
+    Every call needs a slot from a semaphore (LLM_MAX_CONCURRENCY); callers
+    wait at most LLM_QUEUE_TIMEOUT_SECONDS for one. Calls run under a deadline
+    (LLM_CALL_TIMEOUT_SECONDS, LLM_STREAM_TIMEOUT_SECONDS for whole streams)
+    and timeouts and errors feed the circuit breaker. Rejected calls raise
+    LLMUnavailable so the caller can serve its fallback immediately.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv('LLM_MAX_CONCURRENCY', 8))
+        self.queue_timeout = float(os.getenv('LLM_QUEUE_TIMEOUT_SECONDS', 2))
+        self.call_timeout = float(os.getenv('LLM_CALL_TIMEOUT_SECONDS', 30))
+        self.stream_timeout = float(os.getenv('LLM_STREAM_TIMEOUT_SECONDS', 60))
+        self.breaker = CircuitBreaker(
+            failure_threshold=int(os.getenv('LLM_BREAKER_FAILURE_THRESHOLD', 5)),
+            reset_seconds=float(os.getenv('LLM_BREAKER_RESET_SECONDS', 30))
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.in_flight = 0
+        self.waiting = 0
+        self.calls = 0
+        self.successes = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.rejected_circuit_open = 0
+        self.rejected_no_slot = 0
+        self.fallbacks = 0
+        self._latency_total = 0.0
+
+    async def _admit(self, operation: str):
+        if not self.breaker.allow():
+            self.rejected_circuit_open += 1
+            raise LLMUnavailable(f"LLM circuit open, skipping {operation}")
+
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.rejected_no_slot += 1
+            self.breaker.release_probe()
+            raise LLMUnavailable(f"No free LLM slot for {operation}")
+        finally:
+            self.waiting -= 1
+
+        self.in_flight += 1
+        self.calls += 1
+
+    def _release(self, started: float):
+        self._latency_total += time.monotonic() - started
+        self.in_flight -= 1
+        self._semaphore.release()
+
+    def _record_failure(self, operation: str, error: Exception):
+        if isinstance(error, asyncio.TimeoutError):
+            self.timeouts += 1
+            print(f"LLM call {operation} timed out")
+        self.failures += 1
+        self.breaker.record_failure()
+
+    async def call(self, operation: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run one LLM request under the concurrency limit, deadline and breaker"""
+        await self._admit(operation)
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(factory(), timeout=self.call_timeout)
+        except asyncio.CancelledError:
+            self.breaker.release_probe()
+            raise
+        except Exception as e:
+            self._record_failure(operation, e)
+            raise
+        else:
+            self.successes += 1
+            self.breaker.record_success()
+            return result
+        finally:
+            self._release(started)
+
+    async def stream(self, operation: str,
+                     factory: Callable[[], Awaitable[AsyncIterator[Any]]]) -> AsyncIterator[Any]:
+        """Iterate a streaming LLM response; the slot is held until the stream ends"""
+        await self._admit(operation)
+        started = time.monotonic()
+        deadline = started + self.stream_timeout
+        completed = False
+        try:
+            stream = await asyncio.wait_for(factory(), timeout=self.call_timeout)
+            iterator = stream.__aiter__()
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise asyncio.TimeoutError()
+                try:
+                    chunk = await asyncio.wait_for(iterator.__anext__(), timeout=remaining)
+                except StopAsyncIteration:
+                    break
+                yield chunk
+            completed = True
+        except (asyncio.CancelledError, GeneratorExit):
+            raise
+        except Exception as e:
+            self._record_failure(operation, e)
+            raise
+        finally:
+            if completed:
+                self.successes += 1
+                self.breaker.record_success()
+            else:
+                # Client went away mid-stream: neither a success nor a provider failure
+                self.breaker.release_probe()
+            self._release(started)
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.calls - self.in_flight
+        return {
+            'max_concurrency': self.max_concurrency,
+            'in_flight': self.in_flight,
+            'waiting': self.waiting,
+            'calls': self.calls,
+            'successes': self.successes,
+            'failures': self.failures,
+            'timeouts': self.timeouts,
+            'rejected_circuit_open': self.rejected_circuit_open,
+            'rejected_no_slot': self.rejected_no_slot,
+            'fallbacks': self.fallbacks,
+            'avg_latency_ms': round(self._latency_total / finished * 1000, 1) if finished else 0.0,
+            'call_timeout_seconds': self.call_timeout,
+            'queue_timeout_seconds': self.queue_timeout,
+            'circuit': self.breaker.stats()
+        }
+
+
+# Global LLM guard instance
+llm_guard = LLMGuard()
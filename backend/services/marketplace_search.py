@@ -0,0 +1,124 @@
+import os
+import re
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+
+from services.cache_service import TTLCache
+
+# InnoDB ignores FULLTEXT tokens shorter than innodb_ft_min_token_size (3 by default)
+MIN_TOKEN_LENGTH = 3
+
+# Upper bounds (exclusive) of the price facet buckets, in INR; the last bucket is open-ended
+PRICE_BUCKET_BOUNDS = [500, 1000, 2500, 5000]
+
+# Indexes backing marketplace search and listing order; MATCH() column lists must
+# equal a FULLTEXT index exactly, and the listing indexes follow the keyset ORDER BY
+MARKETPLACE_INDEXES = [
+    ('handicrafts', 'ft_handicrafts_search', 'FULLTEXT INDEX', 'name, description, materials'),
+    ('cultural_events', 'ft_events_search', 'FULLTEXT INDEX', 'title, description, location'),
+    ('cultural_events', 'ft_events_location', 'FULLTEXT INDEX', 'location'),
+    ('handicrafts', 'idx_handicrafts_listing', 'INDEX', 'is_available, is_featured, created_at, id'),
+    ('cultural_events', 'idx_events_listing', 'INDEX', 'is_active, is_featured DESC, start_date, id'),
+]
+
+# Listing totals per table, keyed by the filter values; cleared on writes to the table
+listing_counts = {
+    table: TTLCache(
+        name=f'{table}_counts',
+        ttl_seconds=float(os.getenv('MARKETPLACE_COUNT_TTL_SECONDS', 60)),
+        max_size=int(os.getenv('MARKETPLACE_COUNT_CACHE_SIZE', 1000))
+    )
+    for table in ('handicrafts', 'cultural_events')
+}
+
+_TOKEN_RE = re.compile(r"[\w]+", re.UNICODE)
+
+
+def boolean_query(text: str) -> Optional[str]:
+    """Turn free text into a BOOLEAN MODE query: every word required, prefix matched
+
+    "hand wov" -> "+hand* +wov*". Operators typed by the user are stripped, so
+    the input cannot change the query syntax. Returns None when no word is long
+    enough for the FULLTEXT index.
+    """
+    tokens = [t for t in _TOKEN_RE.findall(text or '') if len(t) >= MIN_TOKEN_LENGTH]
+    if not tokens:
+        return None
+    return ' '.join(f"+{token}*" for token in tokens)
+
+
+def search_condition(columns: str, text: str) -> Tuple[str, List[Any]]:
+    """MATCH predicate for the given FULLTEXT column list
+
+    Short inputs the index cannot serve fall back to a prefix LIKE on the first
+    column.
+    """
+    query = boolean_query(text)
+    if query:
+        return f"MATCH({columns}) AGAINST (%s IN BOOLEAN MODE)", [query]
+    first_column = columns.split(',')[0].strip()
+    prefix = text.strip().replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"{first_column} LIKE %s", [f"{prefix}%"]
+
+
+def price_bucket_sql(column: str) -> str:
+    """CASE expression labelling each row with its price facet bucket"""
+    cases = []
+    lower = 0
+    for upper in PRICE_BUCKET_BOUNDS:
+        cases.append(f"WHEN {column} < {upper} THEN '{lower}-{upper}'")
+        lower = upper
+    return f"CASE {' '.join(cases)} ELSE '{lower}+' END"
+
+
+def build_facets(rows: List[Dict[str, Any]], category: Optional[str]) -> Dict[str, Dict[str, int]]:
+    """Fold (category, price_bucket, count) rows into category and price facets
+
+    Category counts cover every category so the UI can offer switching; price
+    counts are narrowed to the selected category.
+    """
+    categories: Dict[str, int] = {}
+    prices: Dict[str, int] = {}
+    for row in rows:
+        categories[row['category']] = categories.get(row['category'], 0) + row['count']
+        if not category or row['category'] == category:
+            prices[row['price_bucket']] = prices.get(row['price_bucket'], 0) + row['count']
+    return {'category': categories, 'price': prices}
+
+
+def invalidate_listing_counts(table: str):
+    """Drop cached listing totals after a write to the table"""
+    listing_counts[table].clear()
+
+
+async def listing_total(cur, table: str, from_where: str, params: List[Any],
+                        cache_key: Hashable, estimate: bool = False) -> int:
+    """Total rows for a listing, from the count cache or the optimizer's estimate
+
+    from_where is the "FROM ... WHERE ..." part of the listing query. An exact
+    count is cached per filter combination until the next write to the table
+    (or MARKETPLACE_COUNT_TTL_SECONDS, for writes made by other workers);
+    estimate=True reads the row estimate from EXPLAIN instead of counting.
+    """
+    if estimate:
+        await cur.execute(f"EXPLAIN SELECT 1 {from_where}", params)
+        plan = await cur.fetchall()
+        return int(plan[0]['rows'] or 0) if plan else 0
+
+    cache = listing_counts[table]
+    total = cache.get(cache_key)
+    if total is None:
+        await cur.execute(f"SELECT COUNT(*) as total {from_where}", params)
+        row = await cur.fetchone()
+        total = row['total'] if row else 0
+        cache.set(cache_key, total)
+    return total
+
+
+async def ensure_search_indexes(cur):
+    """Create the marketplace indexes on databases that predate them (skips missing marketplace tables)"""
+    for table, index_name, kind, columns in MARKETPLACE_INDEXES:
+        try:
+            await cur.execute(f"ALTER TABLE {table} ADD {kind} {index_name} ({columns})")
+        except Exception as e:
+            if "Duplicate key name" not in str(e) and "doesn't exist" not in str(e):
+                print(f"Warning: Could not create index {index_name}: {str(e)}")
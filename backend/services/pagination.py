@@ -0,0 +1,119 @@
+import json
+import base64
+from datetime import datetime
+from decimal import Decimal
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+# Page sizes accepted by keyset-paginated endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    """Opaque cursor for the (created_at, id) position of a row"""
+    payload = json.dumps([created_at.isoformat(), row_id], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    """Inverse of encode_cursor; raises ValueError for anything it did not produce"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
+
+
+def keyset_condition(cursor: Optional[str], descending: bool = True) -> Tuple[str, List[Any]]:
+    """SQL fragment and params selecting rows after the cursor in (created_at, id) order
+
+    Returned as "AND (...)" so it can be appended to an existing WHERE clause;
+    empty when there is no cursor.
+    """
+    if not cursor:
+        return "", []
+    created_at, row_id = decode_cursor(cursor)
+    op = '<' if descending else '>'
+    return (
+        f" AND (created_at {op} %s OR (created_at = %s AND id {op} %s))",
+        [created_at, created_at, row_id]
+    )
+
+
+def page_of(rows: List[Dict[str, Any]], limit: int) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Trim a LIMIT limit+1 result to one page and build the cursor for the next one"""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    last = page[-1]
+    return page, encode_cursor(last['created_at'], last['id'])
+
+
+def _tag(value: Any) -> List[Any]:
+    if isinstance(value, datetime):
+        return ['dt', value.isoformat()]
+    if isinstance(value, Decimal):
+        return ['dec', str(value)]
+    return ['v', value]
+
+
+def _untag(item: List[Any]) -> Any:
+    tag, value = item
+    if tag == 'dt':
+        return datetime.fromisoformat(value)
+    if tag == 'dec':
+        return Decimal(value)
+    return value
+
+
+def encode_keyset(values: Sequence[Any]) -> str:
+    """Opaque cursor for an arbitrary sort key (datetimes and decimals round-trip exactly)"""
+    payload = json.dumps([_tag(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+
+def decode_keyset(cursor: str, size: int) -> List[Any]:
+    """Inverse of encode_keyset; raises ValueError unless the cursor has size values"""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        values = [_untag(item) for item in json.loads(base64.urlsafe_b64decode(padded.encode()))]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if len(values) != size:
+        raise ValueError("Invalid cursor")
+    return values
+
+
+def keyset_after(columns: Sequence[Tuple], cursor: Optional[str]) -> Tuple[str, List[Any]]:
+    """SQL fragment selecting rows after the cursor for a multi-column ORDER BY
+
+    columns lists (sql_expression, 'ASC' | 'DESC') in ORDER BY order, with an
+    optional third item holding params for placeholders inside the expression;
+    mixed directions are supported. Returned as "AND (...)", empty without a
+    cursor.
+    """
+    if not cursor:
+        return "", []
+    values = decode_keyset(cursor, len(columns))
+    branches = []
+    params: List[Any] = []
+    for i, column in enumerate(columns):
+        parts = []
+        for j in range(i + 1):
+            expr, direction = columns[j][0], columns[j][1]
+            op = '=' if j < i else ('<' if direction == 'DESC' else '>')
+            parts.append(f"{expr} {op} %s")
+            params.extend(columns[j][2] if len(columns[j]) > 2 else [])
+            params.append(values[j])
+        branches.append("(" + " AND ".join(parts) + ")")
+    return " AND (" + " OR ".join(branches) + ")", params
+
+
+def keyset_page_of(rows: List[Dict[str, Any]], limit: int,
+                   key_fields: Sequence[str]) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """Like page_of, with the next cursor built from the given row fields"""
+    if len(rows) <= limit:
+        return list(rows), None
+    page = list(rows[:limit])
+    return page, encode_keyset([page[-1][field] for field in key_fields])
@@ -0,0 +1,137 @@
+import os
+import asyncio
+import multiprocessing
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+import bcrypt
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when more password operations are queued than PASSWORD_MAX_PENDING allows"""
+
+
+def _hash(password: str, rounds: int) -> str:
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def _verify(password: str, hashed: str) -> bool:
+    return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+
+
+def hash_rounds(hashed: str) -> Optional[int]:
+    """Cost factor of a bcrypt hash ("$2b$12$..." -> 12), None if it is not one"""
+    parts = hashed.split('$')
+    if len(parts) < 4 or not parts[2].isdigit():
+        return None
+    return int(parts[2])
+
+
+class PasswordHasher:
+    """bcrypt hashing and verification on a bounded worker pool
+
+    Each bcrypt call costs 100-300 ms of CPU, so running it inline would stall
+    every other request on the worker. Calls go to a process pool
+    (PASSWORD_HASH_EXECUTOR=thread switches to threads) of PASSWORD_HASH_WORKERS
+    workers; once PASSWORD_MAX_PENDING operations are queued or running, new ones
+    are refused with PasswordHasherBusy instead of piling up behind the others.
+    Hashes below BCRYPT_ROUNDS are reported by needs_rehash so login can upgrade
+    them.
+    """
+
+    def __init__(self):
+        self.rounds = int(os.getenv('BCRYPT_ROUNDS', 12))
+        self.workers = int(os.getenv('PASSWORD_HASH_WORKERS', min(4, os.cpu_count() or 1)))
+        self.max_pending = int(os.getenv('PASSWORD_MAX_PENDING', self.workers * 8))
+        self.executor_kind = os.getenv('PASSWORD_HASH_EXECUTOR', 'process')
+        # None uses the platform default (fork on Linux); "spawn" re-imports the entry script per worker
+        self.start_method = os.getenv('PASSWORD_HASH_START_METHOD') or None
+        self._executor: Optional[Executor] = None
+        self.pending = 0
+        self.hashed = 0
+        self.verified = 0
+        self.rehashed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.executor_kind == 'thread':
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='bcrypt')
+            else:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context(self.start_method)
+                )
+        return self._executor
+
+    def start(self):
+        """Create the worker pool up front, while the server process is still small"""
+        executor = self._get_executor()
+        if isinstance(executor, ProcessPoolExecutor):
+            # The first submit launches the worker processes
+            executor.submit(hash_rounds, '').result()
+
+    def saturated(self) -> bool:
+        """True when a new operation would be refused; lets handlers shed load before any DB work"""
+        return self.pending >= self.max_pending
+
+    async def _run(self, func, *args):
+        if self.saturated():
+            self.rejected += 1
+            raise PasswordHasherBusy("Too many password operations in progress")
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._get_executor(), func, *args)
+        finally:
+            self.pending -= 1
+
+    async def hash(self, password: str) -> str:
+        hashed = await self._run(_hash, password, self.rounds)
+        self.hashed += 1
+        return hashed
+
+    async def verify(self, password: str, hashed: str) -> bool:
+        result = await self._run(_verify, password, hashed)
+        self.verified += 1
+        return result
+
+    def needs_rehash(self, hashed: str) -> bool:
+        rounds = hash_rounds(hashed)
+        return rounds is not None and rounds < self.rounds
+
+    async def upgrade(self, cur, user_id: str, password: str, hashed: str) -> bool:
+        """Rehash a verified password at the current cost if its stored hash is weaker
+
+        Best effort: skipped when the pool is saturated, since the old hash stays valid.
+        """
+        if not self.needs_rehash(hashed) or self.saturated():
+            return False
+        new_hash = await self.hash(password)
+        await cur.execute("UPDATE users SET password = %s WHERE id = %s AND password = %s",
+                          (new_hash, user_id, hashed))
+        self.rehashed += 1
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'executor': self.executor_kind,
+            'workers': self.workers,
+            'rounds': self.rounds,
+            'pending': self.pending,
+            'max_pending': self.max_pending,
+            'hashed': self.hashed,
+            'verified': self.verified,
+            'rehashed': self.rehashed,
+            'rejected': self.rejected
+        }
+
+    def close(self):
+        """Release the worker pool"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+# Global password hasher instance
+password_hasher = PasswordHasher()
@@ -0,0 +1,102 @@
+import os
+import asyncio
+from typing import Dict, Optional
+
+# Tables carrying rating aggregates, mapped to their foreign key column on reviews
+RATED_TABLES = {
+    'destinations': 'destination_id',
+    'providers': 'provider_id'
+}
+
+
+class RatingAggregates:
+    """Incrementally maintained rating_sum/review_count on destinations and providers
+
+    create_review calls record_review with the cursor it already holds, which
+    bumps the counters and the stored average in one single-row UPDATE, so no
+    write or listing has to aggregate the reviews table. reconcile() recomputes
+    the counters from reviews and repairs any rows that drifted; it runs once
+    when the columns are added and then every RATING_RECONCILE_INTERVAL_SECONDS.
+    """
+
+    def __init__(self):
+        self.interval_seconds = float(os.getenv('RATING_RECONCILE_INTERVAL_SECONDS', 3600))
+        self._task: Optional[asyncio.Task] = None
+        self.last_repaired: Dict[str, int] = {}
+
+    async def ensure_schema(self, cur):
+        """Add the aggregate columns, backfilling them the first time"""
+        added = False
+        for table in RATED_TABLES:
+            for column in ("rating_sum INT NOT NULL DEFAULT 0", "review_count INT NOT NULL DEFAULT 0"):
+                try:
+                    await cur.execute(f"ALTER TABLE {table} ADD COLUMN {column}")
+                    added = True
+                except Exception as e:
+                    if "Duplicate column name" not in str(e):
+                        print(f"Error adding {column.split()[0]} column to {table}: {str(e)}")
+        if added:
+            await self.reconcile(cur)
+
+    async def record_review(self, cur, destination_id: Optional[str], provider_id: Optional[str], rating: int):
+        """Fold one new review into the aggregates of its destination and/or provider"""
+        for table, row_id in (('destinations', destination_id), ('providers', provider_id)):
+            if not row_id:
+                continue
+            # MySQL evaluates single-table UPDATE assignments left to right, so
+            # rating is computed from the already-incremented counters
+            await cur.execute(f"""
+                UPDATE {table}
+                SET rating_sum = rating_sum + %s,
+                    review_count = review_count + 1,
+                    rating = rating_sum / review_count
+                WHERE id = %s
+            """, (rating, row_id))
+
+    async def reconcile(self, cur) -> Dict[str, int]:
+        """Recompute the aggregates from reviews and fix rows that drifted"""
+        repaired = {}
+        for table, column in RATED_TABLES.items():
+            await cur.execute(f"""
+                UPDATE {table} t
+                LEFT JOIN (
+                    SELECT {column} as rated_id, SUM(rating) as rating_sum, COUNT(*) as review_count
+                    FROM reviews
+                    WHERE {column} IS NOT NULL AND rating IS NOT NULL
+                    GROUP BY {column}
+                ) r ON r.rated_id = t.id
+                SET t.rating_sum = COALESCE(r.rating_sum, 0),
+                    t.review_count = COALESCE(r.review_count, 0),
+                    t.rating = IF(r.review_count > 0, r.rating_sum / r.review_count, t.rating)
+                WHERE t.rating_sum <> COALESCE(r.rating_sum, 0)
+                    OR t.review_count <> COALESCE(r.review_count, 0)
+            """)
+            repaired[table] = cur.rowcount
+        self.last_repaired = repaired
+        return repaired
+
+    def start(self, db_pool):
+        if not self._task and self.interval_seconds > 0:
+            self._task = asyncio.create_task(self._run(db_pool))
+
+    async def stop(self):
+        if self._task:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self, db_pool):
+        while True:
+            await asyncio.sleep(self.interval_seconds)
+            try:
+                async with db_pool.acquire() as conn:
+                    async with conn.cursor() as cur:
+                        repaired = await self.reconcile(cur)
+                if any(repaired.values()):
+                    print(f"Rating reconcile repaired drifted aggregates: {repaired}")
+            except Exception as e:
+                print(f"Error reconciling rating aggregates: {str(e)}")
+
+
+# Global rating aggregates instance
+rating_aggregates = RatingAggregates()
@@ -0,0 +1,59 @@
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable
+
+
+class RequestConnection:
+    """One pooled connection shared by everything that runs for a request
+
+    Exposes acquire() like a pool, so code written against the pool (auth,
+    handlers, history loaders) can be handed this instead; every acquire()
+    yields the same connection, taken from the pool on first use. The
+    connection goes back when the request finishes, or earlier through
+    release() before slow non-database work such as an LLM call. begin()
+    opens a transaction that is committed when the request succeeds and
+    rolled back when it raises.
+    """
+
+    def __init__(self, pool_getter: Callable[[], Awaitable]):
+        self._get_pool = pool_getter
+        self._pool = None
+        self._conn = None
+        self.in_transaction = False
+
+    async def connection(self):
+        if self._conn is None:
+            self._pool = await self._get_pool()
+            self._conn = await self._pool.acquire()
+        return self._conn
+
+    @asynccontextmanager
+    async def acquire(self):
+        # Returned to the pool by close(), not at the end of this block
+        yield await self.connection()
+
+    async def begin(self):
+        """Start the request's transaction (once) and return its connection"""
+        conn = await self.connection()
+        if not self.in_transaction:
+            await conn.begin()
+            self.in_transaction = True
+        return conn
+
+    async def release(self):
+        """Hand the connection back early; commits an open transaction"""
+        await self.close(commit=True)
+
+    async def close(self, commit: bool):
+        conn = self._conn
+        if conn is None:
+            return
+        try:
+            if self.in_transaction:
+                if commit:
+                    await conn.commit()
+                else:
+                    await conn.rollback()
+        finally:
+            self.in_transaction = False
+            self._conn = None
+            self._pool.release(conn)
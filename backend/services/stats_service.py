@@ -0,0 +1,250 @@
+from typing import Any, Dict, Optional
+from datetime import datetime
+
+# Booking statuses that count towards revenue on the admin dashboard
+REVENUE_STATUSES = ('completed', 'paid')
+
+
+class AdminStatsService:
+    """Admin dashboard statistics backed by incrementally maintained monthly rollups
+
+    Write paths call the record_* hooks with the cursor they already hold, so the
+    rollup row is updated in the same statement batch as the booking/user write.
+    get_admin_stats then reads a handful of pre-aggregated rows instead of
+    scanning bookings and users once per counter.
+    """
+
+    async def ensure_schema(self, cur):
+        """Create the monthly rollup table"""
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS monthly_stats (
+                month CHAR(7) PRIMARY KEY,
+                revenue DECIMAL(14,2) NOT NULL DEFAULT 0,
+                paid_bookings INT NOT NULL DEFAULT 0,
+                bookings INT NOT NULL DEFAULT 0,
+                new_users INT NOT NULL DEFAULT 0,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+
+    async def rebuild_rollups(self, cur):
+        """Recompute every monthly rollup row from the base tables, in one transaction
+
+        Rows are zeroed and upserted rather than deleted and reinserted, so a
+        booking or registration recorded concurrently cannot hit a duplicate key.
+        """
+        conn = cur.connection
+        await conn.begin()
+        try:
+            await cur.execute("UPDATE monthly_stats SET revenue = 0, paid_bookings = 0, bookings = 0, new_users = 0")
+            await cur.execute("""
+                INSERT INTO monthly_stats (month, revenue, paid_bookings, bookings)
+                SELECT
+                    DATE_FORMAT(created_at, '%Y-%m') as month,
+                    COALESCE(SUM(CASE WHEN status IN ('completed', 'paid') THEN total_price ELSE 0 END), 0),
+                    SUM(CASE WHEN status IN ('completed', 'paid') THEN 1 ELSE 0 END),
+                    COUNT(*)
+                FROM bookings
+                WHERE created_at IS NOT NULL
+                GROUP BY DATE_FORMAT(created_at, '%Y-%m')
+                ON DUPLICATE KEY UPDATE
+                    revenue = VALUES(revenue),
+                    paid_bookings = VALUES(paid_bookings),
+                    bookings = VALUES(bookings)
+            """)
+            await cur.execute("""
+                INSERT INTO monthly_stats (month, new_users)
+                SELECT DATE_FORMAT(created_at, '%Y-%m') as month, COUNT(*)
+                FROM users
+                WHERE created_at IS NOT NULL
+                GROUP BY DATE_FORMAT(created_at, '%Y-%m')
+                ON DUPLICATE KEY UPDATE new_users = VALUES(new_users)
+            """)
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            raise
+
+    async def rebuild_if_empty(self, cur):
+        """Backfill the rollups the first time the table is created"""
+        await cur.execute("SELECT COUNT(*) as total FROM monthly_stats")
+        row = await cur.fetchone()
+        count = row['total'] if isinstance(row, dict) else row[0]
+        if count == 0:
+            await self.rebuild_rollups(cur)
+
+    async def record_user_registered(self, cur, created_at: Optional[datetime] = None):
+        """Count a new user in its registration month"""
+        await cur.execute("""
+            INSERT INTO monthly_stats (month, new_users)
+            VALUES (DATE_FORMAT(COALESCE(%s, NOW()), '%%Y-%%m'), 1)
+            ON DUPLICATE KEY UPDATE new_users = new_users + 1
+        """, (created_at,))
+
+    async def record_booking_created(self, cur, total_price: float, status: str = 'pending',
+                                     created_at: Optional[datetime] = None):
+        """Count a new booking (and its revenue if it is already paid)"""
+        is_revenue = status in REVENUE_STATUSES
+        await cur.execute("""
+            INSERT INTO monthly_stats (month, revenue, paid_bookings, bookings)
+            VALUES (DATE_FORMAT(COALESCE(%s, NOW()), '%%Y-%%m'), %s, %s, 1)
+            ON DUPLICATE KEY UPDATE
+                revenue = revenue + VALUES(revenue),
+                paid_bookings = paid_bookings + VALUES(paid_bookings),
+                bookings = bookings + 1
+        """, (created_at, total_price if is_revenue else 0, 1 if is_revenue else 0))
+
+    async def record_booking_status_change(self, cur, created_at: Optional[datetime],
+                                           total_price: Optional[float],
+                                           old_status: Optional[str], new_status: str):
+        """Move a booking's revenue in or out of its month when it crosses the paid boundary"""
+        was_revenue = old_status in REVENUE_STATUSES
+        is_revenue = new_status in REVENUE_STATUSES
+        if was_revenue == is_revenue:
+            return
+
+        sign = 1 if is_revenue else -1
+        await cur.execute("""
+            INSERT INTO monthly_stats (month, revenue, paid_bookings)
+            VALUES (DATE_FORMAT(COALESCE(%s, NOW()), '%%Y-%%m'), %s, %s)
+            ON DUPLICATE KEY UPDATE
+                revenue = revenue + VALUES(revenue),
+                paid_bookings = paid_bookings + VALUES(paid_bookings)
+        """, (created_at, sign * float(total_price or 0), sign))
+
+    async def _remove_bookings(self, cur, column: str, value: str):
+        """Take the bookings about to be deleted out of their months' counters"""
+        await cur.execute(f"""
+            INSERT INTO monthly_stats (month, revenue, paid_bookings, bookings)
+            SELECT
+                DATE_FORMAT(created_at, '%%Y-%%m') as month,
+                -COALESCE(SUM(CASE WHEN status IN ('completed', 'paid') THEN total_price ELSE 0 END), 0),
+                -SUM(CASE WHEN status IN ('completed', 'paid') THEN 1 ELSE 0 END),
+                -COUNT(*)
+            FROM bookings
+            WHERE {column} = %s AND created_at IS NOT NULL
+            GROUP BY DATE_FORMAT(created_at, '%%Y-%%m')
+            ON DUPLICATE KEY UPDATE
+                revenue = revenue + VALUES(revenue),
+                paid_bookings = paid_bookings + VALUES(paid_bookings),
+                bookings = bookings + VALUES(bookings)
+        """, (value,))
+
+    async def record_user_deleted(self, cur, user_id: str):
+        """Uncount a user and the bookings that cascade with it; call before the DELETE
+
+        Run it in the delete's transaction after locking the user row, so no
+        booking for the user can be added in between.
+        """
+        await self._remove_bookings(cur, 'user_id', user_id)
+        await cur.execute("""
+            UPDATE monthly_stats
+            SET new_users = new_users - 1
+            WHERE month = (SELECT DATE_FORMAT(created_at, '%%Y-%%m') FROM users WHERE id = %s)
+        """, (user_id,))
+
+    async def record_provider_deleted(self, cur, provider_id: str):
+        """Uncount the bookings that cascade with a provider; call before the DELETE"""
+        await self._remove_bookings(cur, 'provider_id', provider_id)
+
+    async def get_stats(self, cur) -> Dict[str, Any]:
+        """Build the admin dashboard payload from combined aggregates and rollup rows"""
+        stats = {}
+
+        # Entity counters in a single round trip
+        await cur.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM users) as total_users,
+                (SELECT COUNT(*) FROM destinations) as total_destinations,
+                (SELECT COUNT(*) FROM providers) as total_providers,
+                (SELECT COUNT(*) FROM providers WHERE is_active = 1) as active_providers
+        """)
+        counts = await cur.fetchone()
+        stats['total_users'] = counts['total_users']
+        stats['total_destinations'] = counts['total_destinations']
+        stats['total_providers'] = counts['total_providers']
+        stats['active_providers'] = int(counts['active_providers'] or 0)
+
+        # One pass over bookings folds totals, revenue, average and status distribution
+        await cur.execute("""
+            SELECT status, COUNT(*) as count, COUNT(total_price) as priced, SUM(total_price) as revenue
+            FROM bookings
+            GROUP BY status
+        """)
+        by_status = await cur.fetchall()
+        revenue_total = 0.0
+        revenue_count = 0
+        stats['booking_by_status'] = {}
+        for row in by_status:
+            stats['booking_by_status'][row['status']] = row['count']
+            if row['status'] in REVENUE_STATUSES:
+                revenue_total += float(row['revenue'] or 0)
+                revenue_count += row['priced']
+        stats['total_bookings'] = sum(row['count'] for row in by_status)
+        stats['total_revenue'] = revenue_total
+        stats['avg_booking_value'] = revenue_total / revenue_count if revenue_count else 0
+
+        # Time series from the pre-aggregated monthly rollups (last 6 months)
+        await cur.execute("""
+            SELECT month, revenue, paid_bookings, bookings, new_users
+            FROM monthly_stats
+            WHERE month >= DATE_FORMAT(DATE_SUB(NOW(), INTERVAL 6 MONTH), '%Y-%m')
+            ORDER BY month ASC
+        """)
+        months = await cur.fetchall()
+        stats['monthly_revenue'] = [
+            {'month': m['month'], 'revenue': float(m['revenue']), 'bookings': m['paid_bookings']}
+            for m in months if m['paid_bookings'] > 0
+        ]
+        stats['user_growth'] = [
+            {'month': m['month'], 'new_users': m['new_users']}
+            for m in months if m['new_users'] > 0
+        ]
+        stats['booking_growth'] = [
+            {'month': m['month'], 'bookings': m['bookings']}
+            for m in months if m['bookings'] > 0
+        ]
+
+        # Recent bookings with details
+        await cur.execute("""
+            SELECT
+                b.id,
+                b.booking_date,
+                b.total_price,
+                b.status,
+                b.package_type,
+                b.guests,
+                u.name as customer_name,
+                u.email as customer_email,
+                d.name as destination_name,
+                p.name as provider_name,
+                b.created_at
+            FROM bookings b
+            JOIN users u ON b.user_id = u.id
+            LEFT JOIN destinations d ON b.destination_id = d.id
+            LEFT JOIN providers p ON b.provider_id = p.id
+            ORDER BY b.created_at DESC
+            LIMIT 10
+        """)
+        stats['recent_bookings'] = await cur.fetchall()
+
+        # Revenue by destination
+        await cur.execute("""
+            SELECT
+                d.name as destination_name,
+                SUM(b.total_price) as revenue,
+                COUNT(b.id) as bookings
+            FROM bookings b
+            JOIN destinations d ON b.destination_id = d.id
+            WHERE b.status IN ('completed', 'paid')
+            GROUP BY d.id, d.name
+            ORDER BY revenue DESC
+            LIMIT 5
+        """)
+        stats['revenue_by_destination'] = await cur.fetchall()
+
+        return stats
+
+
+# Global admin stats service instance
+admin_stats_service = AdminStatsService()
@@ -0,0 +1,77 @@
+from typing import Any, Dict, List, Optional
+
+
+class TokenRevocations:
+    """Server-side token version floors, checked on every request without a query
+
+    Access tokens carry the user's token_version ("ver" claim) as it was at
+    login. Revoking a user bumps users.token_version and records the new value
+    as a floor in token_revocations; tokens below it are rejected. The floors
+    live in their own table, without a foreign key, so they survive restarts
+    and outlive deleted users. Other workers pick a revocation up on their
+    next restart; until then the token's expiry bounds its lifetime.
+    """
+
+    def __init__(self):
+        self._min_versions: Dict[str, int] = {}
+
+    async def ensure_schema(self, cur):
+        try:
+            await cur.execute("ALTER TABLE users ADD COLUMN token_version INT NOT NULL DEFAULT 0")
+            print("Added token_version column to users table")
+        except Exception as e:
+            if "Duplicate column name" not in str(e):
+                print(f"Error adding token_version column: {str(e)}")
+        await cur.execute("""
+            CREATE TABLE IF NOT EXISTS token_revocations (
+                user_id VARCHAR(255) PRIMARY KEY,
+                min_version INT NOT NULL,
+                revoked_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+            )
+        """)
+
+    async def load(self, cur):
+        """Read the version floor of every user that has ever been revoked"""
+        await cur.execute("SELECT user_id, min_version FROM token_revocations")
+        self._min_versions = {row[0]: row[1] for row in await cur.fetchall()}
+
+    def is_revoked(self, user_id: str, version: int) -> bool:
+        return version < self._min_versions.get(user_id, 0)
+
+    async def revoke_user(self, cur, user_id: str):
+        """Invalidate every token issued to the user so far"""
+        await cur.execute("UPDATE users SET token_version = token_version + 1 WHERE id = %s", (user_id,))
+        await cur.execute("SELECT token_version FROM users WHERE id = %s", (user_id,))
+        row = await cur.fetchone()
+        if not row:
+            return
+        version = row['token_version'] if isinstance(row, dict) else row[0]
+        await cur.execute("""
+            INSERT INTO token_revocations (user_id, min_version) VALUES (%s, %s)
+            ON DUPLICATE KEY UPDATE min_version = GREATEST(min_version, VALUES(min_version))
+        """, (user_id, version))
+        self._min_versions[user_id] = max(version, self._min_versions.get(user_id, 0))
+
+    def stats(self) -> Dict[str, Any]:
+        return {'revoked_users': len(self._min_versions)}
+
+
+def token_claims(user: Dict[str, Any], provider_ids: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Signed claims for a user row: role, token version and owned provider ids"""
+    claims = {
+        "sub": user['id'],
+        "role": user['role'],
+        "ver": user.get('token_version') or 0
+    }
+    if user['role'] == 'provider':
+        claims["pids"] = list(provider_ids or [])
+    return claims
+
+
+async def load_provider_ids(cur, user_id: str) -> List[str]:
+    await cur.execute("SELECT id FROM providers WHERE user_id = %s", (user_id,))
+    return [row['id'] if isinstance(row, dict) else row[0] for row in await cur.fetchall()]
+
+
+# Global token revocation instance
+token_revocations = TokenRevocations()
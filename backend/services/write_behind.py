@@ -0,0 +1,169 @@
+import os
+import asyncio
+from collections import deque
+from typing import Any, Dict, List, Optional, Sequence
+
+import aiomysql
+
+# Too many connections, lock wait timeout, deadlock, can't connect, server gone away, lost connection
+TRANSIENT_MYSQL_ERRORS = {1040, 1205, 1213, 2003, 2006, 2013}
+
+
+def is_transient_error(error: Exception) -> bool:
+    """True for failures worth retrying as-is; False when the rows themselves are rejected"""
+    if isinstance(error, aiomysql.OperationalError):
+        return bool(error.args) and error.args[0] in TRANSIENT_MYSQL_ERRORS
+    return isinstance(error, (aiomysql.InterfaceError, OSError, asyncio.TimeoutError))
+
+
+class WriteBehindBuffer:
+    """Buffers single-row INSERTs and writes them in multi-row batches
+
+    add() only appends to memory, so request handlers never wait on the
+    database. A background task flushes with executemany once batch_size rows
+    are pending or every flush_interval_ms, whichever comes first. A batch
+    that fails on a connection-level error is put back and retried on the
+    next flush; if the database stays down the oldest rows are dropped beyond
+    max_pending. A batch MySQL rejects is written row by row instead, and only
+    the rows that fail are logged and dropped, so one bad row never holds up
+    the rest. stop() flushes what is left, so a clean shutdown loses nothing.
+    """
+
+    def __init__(self, name: str, sql: str, batch_size: int, flush_interval_ms: int, max_pending: int):
+        self.name = name
+        self.sql = sql
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_pending = max_pending
+        self._pending: deque = deque()
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._db_pool = None
+        self.written = 0
+        self.batches = 0
+        self.errors = 0
+        self.dropped = 0
+        self.rejected = 0
+
+    def add(self, row: Sequence[Any]):
+        """Queue one row for insertion"""
+        self._pending.append(tuple(row))
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+        if len(self._pending) >= self.batch_size:
+            self._wakeup.set()
+
+    async def start(self, db_pool):
+        self._db_pool = db_pool
+        if not self._task:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Stop the flusher and write out everything still pending"""
+        if self._task:
+            # Let an in-progress batch finish rather than cancelling it mid-write
+            self._stopping = True
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._db_pool and self._pending:
+            await self.flush()
+            if self._pending:
+                print(f"Write-behind {self.name}: {len(self._pending)} rows not written at shutdown")
+
+    async def _run(self):
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending and not self._stopping:
+                await self.flush()
+
+    async def flush(self):
+        """Write pending rows in batches of batch_size"""
+        async with self._flush_lock:
+            while self._pending:
+                batch = [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+                try:
+                    await self._write(batch)
+                except Exception as e:
+                    self.errors += 1
+                    print(f"Write-behind {self.name}: error writing {len(batch)} rows: {str(e)}")
+                    if is_transient_error(e):
+                        self._requeue(batch)
+                        return
+                    if not await self._write_rows(batch):
+                        return
+                    continue
+                self.written += len(batch)
+                self.batches += 1
+
+    async def _write(self, rows: List[tuple]):
+        async with self._db_pool.acquire() as conn:
+            async with conn.cursor() as cur:
+                await cur.executemany(self.sql, rows)
+
+    async def _write_rows(self, batch: List[tuple]) -> bool:
+        """Fallback for a rejected batch: insert one row at a time, dropping the rows MySQL refuses
+
+        Returns False when the database went away part way; the unwritten
+        rows are then back at the head of the queue.
+        """
+        for index, row in enumerate(batch):
+            try:
+                await self._write([row])
+            except Exception as e:
+                if is_transient_error(e):
+                    self._requeue(batch[index:])
+                    return False
+                self.rejected += 1
+                print(f"Write-behind {self.name}: dropping row rejected by the database: {str(e)}")
+                continue
+            self.written += 1
+            self.batches += 1
+        return True
+
+    def _requeue(self, rows: List[tuple]):
+        # Put the rows back in order; they are retried on the next flush
+        self._pending.extendleft(reversed(rows))
+        while len(self._pending) > self.max_pending:
+            self._pending.popleft()
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            'pending': len(self._pending),
+            'written': self.written,
+            'batches': self.batches,
+            'avg_batch_size': round(self.written / self.batches, 1) if self.batches else 0.0,
+            'errors': self.errors,
+            'dropped': self.dropped,
+            'rejected': self.rejected
+        }
+
+
+def _buffer(name: str, sql: str) -> WriteBehindBuffer:
+    return WriteBehindBuffer(
+        name=name,
+        sql=sql,
+        batch_size=int(os.getenv('WRITE_BEHIND_BATCH_SIZE', 100)),
+        flush_interval_ms=int(os.getenv('WRITE_BEHIND_FLUSH_MS', 250)),
+        max_pending=int(os.getenv('WRITE_BEHIND_MAX_PENDING', 10000))
+    )
+
+
+# Global write-behind buffers
+chat_log_writer = _buffer('chat_logs', """
+    INSERT INTO chat_logs (id, user_id, session_id, message, response, created_at)
+    VALUES (%s, %s, %s, %s, %s, %s)
+""")
+itinerary_writer = _buffer('itineraries', """
+    INSERT INTO itineraries (id, user_id, destination, days, budget, content, preferences, generated_at, cache_key)
+    VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+""")
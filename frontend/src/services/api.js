@@ -213,8 +213,8 @@ export const adminAPI = {
     return response.data;
   },
 
-  getAllBookings: async () => {
-    const response = await api.get('/admin/bookings');
+  getAllBookings: async (params = {}) => {
+    const response = await api.get('/admin/bookings', { params });
     return response.data;
   },
 
@@ -280,7 +280,7 @@ export const aiAPI = {
 
   getChatHistory: async (sessionId) => {
     const response = await api.get(`/chatbot/history/${sessionId}`);
-    return response.data;
+    return response.data.messages;
   }
 };
 
@@ -62,7 +62,7 @@ export const deepseekAPI = {
   getChatHistory: async (sessionId) => {
     try {
       const response = await api.get(`/chatbot/history/${sessionId}`);
-      return response.data;
+      return response.data.messages;
     } catch (error) {
       console.error('Error getting chat history:', error);
       return [];
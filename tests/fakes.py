@@ -0,0 +1,82 @@
+"""In-memory stand-ins for aiomysql cursors, connections and pools"""
+from contextlib import asynccontextmanager
+
+
+def normalize(sql):
+    return " ".join(sql.split())
+
+
+class FakeCursor:
+    """Records statements; respond(sql, params) returns (rows, rowcount) for each one"""
+
+    def __init__(self, respond=None, connection=None):
+        self.respond = respond or (lambda sql, params: ([], 1))
+        self.connection = connection
+        self.executed = []
+        self.rowcount = 0
+        self._rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def execute(self, sql, params=None):
+        sql = normalize(sql)
+        self.executed.append((sql, params))
+        if self.connection is not None:
+            self.connection.events.append(('execute', sql))
+        result = self.respond(sql, params)
+        if isinstance(result, Exception):
+            raise result
+        self._rows, self.rowcount = result
+        return self.rowcount
+
+    async def executemany(self, sql, rows):
+        for row in rows:
+            await self.execute(sql, row)
+
+    async def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    async def fetchall(self):
+        return list(self._rows)
+
+    def statements(self, prefix=""):
+        return [sql for sql, _ in self.executed if sql.startswith(prefix)]
+
+
+class FakeConnection:
+    def __init__(self, respond=None):
+        self.events = []
+        self.cur = FakeCursor(respond, connection=self)
+
+    def cursor(self, *args):
+        return self.cur
+
+    async def begin(self):
+        self.events.append(('begin',))
+
+    async def commit(self):
+        self.events.append(('commit',))
+
+    async def rollback(self):
+        self.events.append(('rollback',))
+
+
+class FakePool:
+    """Pool handing out one shared FakeConnection"""
+
+    def __init__(self, respond=None):
+        self.conn = FakeConnection(respond)
+        self.acquired = 0
+
+    @asynccontextmanager
+    async def acquire(self):
+        self.acquired += 1
+        yield self.conn
+
+    @property
+    def executed(self):
+        return self.conn.cur.executed
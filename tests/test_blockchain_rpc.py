@@ -0,0 +1,50 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from services.blockchain_service import BlockchainService
+
+
+@pytest.fixture
+def service():
+    service = BlockchainService()
+    yield service
+    service.close()
+
+
+def test_run_rpc_runs_on_the_rpc_thread_pool(service):
+    def blocking_call(a, b=0):
+        return threading.current_thread().name, a + b
+
+    thread_name, result = asyncio.run(service._run_rpc(blocking_call, 1, b=2))
+
+    assert thread_name.startswith('web3-rpc')
+    assert result == 3
+
+
+def test_blocking_rpc_does_not_stall_the_event_loop(service):
+    async def main():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.create_task(ticker())
+        await service._run_rpc(time.sleep, 0.2)
+        task.cancel()
+        return ticks
+
+    assert asyncio.run(main()) >= 5
+
+
+def test_is_connected_reports_rpc_errors_as_disconnected(service, monkeypatch):
+    def fail():
+        raise ConnectionError('node unreachable')
+
+    monkeypatch.setattr(service.w3, 'is_connected', fail)
+    assert asyncio.run(service.is_connected()) is False
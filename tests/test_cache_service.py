@@ -0,0 +1,79 @@
+import pytest
+
+from services import cache_service
+from services.cache_service import TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_service.time, 'monotonic', lambda: now[0])
+    return now
+
+
+def test_get_returns_value_until_ttl_expires(clock):
+    cache = TTLCache('users', ttl_seconds=60, max_size=10)
+    cache.set('u1', {'id': 'u1'})
+
+    clock[0] += 59
+    assert cache.get('u1') == {'id': 'u1'}
+
+    clock[0] += 1
+    assert cache.get('u1') is None
+    assert len(cache) == 0
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_per_entry_ttl_overrides_default(clock):
+    cache = TTLCache('users', ttl_seconds=60, max_size=10)
+    cache.set('short', 1, ttl_seconds=5)
+    cache.set('long', 2)
+
+    clock[0] += 10
+    assert cache.get('short') is None
+    assert cache.get('long') == 2
+
+
+def test_evicts_least_recently_used_over_max_size(clock):
+    cache = TTLCache('users', ttl_seconds=60, max_size=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')  # 'b' is now the least recently used
+    cache.set('c', 3)
+
+    assert cache.get('b') is None
+    assert cache.get('a') == 1
+    assert cache.get('c') == 3
+    assert cache.evictions == 1
+
+
+def test_invalidate_and_clear_count_dropped_entries(clock):
+    cache = TTLCache('users', ttl_seconds=60, max_size=10)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.set('c', 3)
+
+    cache.invalidate('a')
+    cache.invalidate('missing')
+    assert cache.get('a') is None
+    assert cache.invalidations == 1
+
+    cache.clear()
+    assert len(cache) == 0
+    assert cache.invalidations == 3
+
+
+def test_stats_report_hit_ratio(clock):
+    cache = TTLCache('users', ttl_seconds=60, max_size=10)
+    assert cache.stats()['hit_ratio'] == 0.0
+
+    cache.set('a', 1)
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert stats['name'] == 'users'
+    assert stats['size'] == 1
+    assert stats['hits'] == 2
+    assert stats['misses'] == 1
+    assert stats['hit_ratio'] == round(2 / 3, 4)
@@ -0,0 +1,79 @@
+import asyncio
+
+import pytest
+
+from services import catalog_service
+from services.catalog_service import CatalogSnapshot, DestinationCatalog
+from tests.fakes import FakePool
+
+DESTINATIONS = [
+    {'id': 'd1', 'name': 'netarhat', 'location': 'Latehar', 'category': 'Hill Station',
+     'region': 'Palamu Division', 'highlights': '["Sunrise"]'},
+    {'id': 'd2', 'name': 'Betla', 'location': 'Latehar', 'category': 'Wildlife',
+     'region': 'Palamu Division', 'highlights': None},
+    {'id': 'd3', 'name': 'Dassam Falls', 'location': 'Ranchi', 'category': 'Waterfall',
+     'region': 'South Chhotanagpur Division', 'highlights': '[]'},
+]
+REGIONS = [{'id': 'palamu', 'name': 'Palamu', 'highlights': None}]
+
+
+def catalog_pool():
+    def respond(sql, params):
+        if 'FROM regions' in sql:
+            return [dict(r) for r in REGIONS], len(REGIONS)
+        return [dict(d) for d in DESTINATIONS], len(DESTINATIONS)
+    return FakePool(respond)
+
+
+def test_snapshot_orders_by_name_case_insensitively():
+    snapshot = CatalogSnapshot([], [dict(d) for d in DESTINATIONS])
+    assert [d['id'] for d in snapshot.destinations] == ['d2', 'd3', 'd1']
+    assert snapshot.dropdown[0] == {'id': 'd2', 'name': 'Betla', 'location': 'Latehar'}
+
+
+def test_filter_by_region_alias_category_and_limit():
+    snapshot = CatalogSnapshot([], [dict(d) for d in DESTINATIONS])
+
+    assert [d['id'] for d in snapshot.filter_destinations(region='west')] == ['d2', 'd1']
+    assert [d['id'] for d in snapshot.filter_destinations(region='west', category='wildlife')] == ['d2']
+    assert [d['id'] for d in snapshot.filter_destinations(category='WATERFALL')] == ['d3']
+    assert len(snapshot.filter_destinations(limit=1)) == 1
+
+
+def test_get_loads_once_and_parses_highlights():
+    pool = catalog_pool()
+    catalog = DestinationCatalog()
+
+    snapshot = asyncio.run(catalog.get(pool))
+    again = asyncio.run(catalog.get(pool))
+
+    assert again is snapshot
+    assert pool.acquired == 1
+    assert snapshot.by_id['d1']['highlights'] == ['Sunrise']
+    assert snapshot.regions[0]['region_code'] == 'west'
+
+
+def test_get_reloads_after_max_age(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(catalog_service.time, 'monotonic', lambda: now[0])
+    pool = catalog_pool()
+    catalog = DestinationCatalog()
+    catalog.max_age_seconds = 60
+
+    asyncio.run(catalog.get(pool))
+    now[0] += 61
+    asyncio.run(catalog.get(pool))
+
+    assert pool.acquired == 2
+
+
+def test_refresh_swallows_load_errors_and_invalidates():
+    catalog = DestinationCatalog()
+    asyncio.run(catalog.get(catalog_pool()))
+
+    failing = FakePool(lambda sql, params: RuntimeError('db down'))
+    asyncio.run(catalog.refresh(failing))
+    assert catalog._snapshot is None
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(catalog.reload(failing))
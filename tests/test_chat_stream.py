@@ -0,0 +1,68 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+pytest.importorskip("emergentintegrations")
+
+from services import gemini_service
+from services.gemini_service import FallbackReply, GeminiService
+from services.llm_guard import LLMGuard
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text))])
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('GEMINI_API_KEY', 'test-key')
+    monkeypatch.setattr(gemini_service, 'llm_guard', LLMGuard())
+    return GeminiService()
+
+
+def fake_completion(monkeypatch, parts, fail_after=None):
+    async def stream():
+        for index, part in enumerate(parts):
+            if index == fail_after:
+                raise RuntimeError('connection reset')
+            yield chunk(part)
+        if fail_after == len(parts):
+            raise RuntimeError('connection reset')
+
+    async def acompletion(**kwargs):
+        assert kwargs['stream'] is True
+        return stream()
+
+    monkeypatch.setattr(gemini_service.litellm, 'acompletion', acompletion)
+
+
+def collect(service, message='Best time to visit Netarhat?'):
+    async def main():
+        return [part async for part in service.stream_chat_response(message)]
+
+    return asyncio.run(main())
+
+
+def test_stream_yields_model_deltas(service, monkeypatch):
+    fake_completion(monkeypatch, ['Octo', None, 'ber to March'])
+
+    parts = collect(service)
+
+    assert parts == ['Octo', 'ber to March']
+    assert not any(isinstance(part, FallbackReply) for part in parts)
+
+
+def test_failure_before_any_delta_streams_the_marked_fallback(service, monkeypatch):
+    fake_completion(monkeypatch, ['never sent'], fail_after=0)
+
+    parts = collect(service)
+
+    assert len(parts) == 1
+    assert isinstance(parts[0], FallbackReply)
+
+
+def test_failure_mid_stream_does_not_append_the_fallback(service, monkeypatch):
+    fake_completion(monkeypatch, ['Octo'], fail_after=1)
+
+    assert collect(service) == ['Octo']
@@ -0,0 +1,53 @@
+import pytest
+
+from services.blockchain_service import BlockchainService
+
+LOYALTY_ADDRESS = '0x' + '11' * 20
+OTHER_ADDRESS = '0x' + '22' * 20
+USER_WALLET = '0x' + '33' * 20
+
+
+@pytest.fixture
+def service(monkeypatch):
+    monkeypatch.setenv('CONTRACT_ADDRESS_LOYALTY', LOYALTY_ADDRESS)
+    service = BlockchainService()
+    yield service
+    service.close()
+
+
+def test_contract_is_built_once_per_address(service):
+    first = service.get_contract('loyalty')
+
+    assert service.get_contract('loyalty') is first
+    assert first.address == service.w3.to_checksum_address(LOYALTY_ADDRESS)
+
+
+def test_contract_is_rebuilt_when_the_address_changes(service, monkeypatch):
+    first = service.get_contract('loyalty')
+    monkeypatch.setenv('CONTRACT_ADDRESS_LOYALTY', OTHER_ADDRESS)
+
+    second = service.get_contract('loyalty')
+
+    assert second is not first
+    assert second.raw_address == OTHER_ADDRESS
+
+
+def test_missing_contract_address_raises(service, monkeypatch):
+    monkeypatch.delenv('CONTRACT_ADDRESS_REVIEWS', raising=False)
+
+    with pytest.raises(Exception, match='reviews'):
+        service.get_contract('reviews')
+
+
+def test_encode_matches_web3_calldata(service):
+    cached = service.get_contract('loyalty')
+
+    encoded = cached.encode('earnPoints', USER_WALLET, 250, 'Earned from booking b1')
+    expected = cached.contract.encodeABI(
+        fn_name='earnPoints',
+        args=[service.w3.to_checksum_address(USER_WALLET), 250, 'Earned from booking b1']
+    )
+
+    assert encoded.to == cached.address
+    assert encoded.data == expected
+    assert encoded.data.startswith('0x' + cached.selectors['earnPoints'].hex())
@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+
+from services.conversation_service import ConversationContextManager, estimate_tokens
+
+
+@pytest.fixture
+def manager(monkeypatch):
+    monkeypatch.setenv('CHAT_CONTEXT_TOKEN_BUDGET', '300')
+    monkeypatch.setenv('CHAT_CONTEXT_MIN_TURNS', '2')
+    monkeypatch.setenv('CHAT_CONTEXT_MAX_SESSIONS', '2')
+    return ConversationContextManager()
+
+
+def loader(rows):
+    calls = []
+
+    async def load_turns(limit):
+        calls.append(limit)
+        return rows
+
+    return load_turns, calls
+
+
+def test_history_is_seeded_from_the_database_once(manager):
+    load_turns, calls = loader([{'message': 'Where is Hundru falls?', 'response': 'Near Ranchi.'}])
+
+    async def main():
+        first = await manager.get_history('u1', 's1', load_turns)
+        second = await manager.get_history('u1', 's1', load_turns)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert calls == [manager.seed_turns]
+    assert first == second == [
+        {'role': 'user', 'content': 'Where is Hundru falls?'},
+        {'role': 'assistant', 'content': 'Near Ranchi.'},
+    ]
+    assert (manager.hits, manager.misses) == (1, 1)
+
+
+def test_recorded_turns_are_returned_in_order(manager):
+    manager.record_turn('u1', 's1', 'Hi', 'Hello!')
+    manager.record_turn('u1', 's1', 'Best season?', 'October to March.')
+    load_turns, calls = loader([])
+
+    history = asyncio.run(manager.get_history('u1', 's1', load_turns))
+
+    assert calls == []
+    assert [message['content'] for message in history] == ['Hi', 'Hello!', 'Best season?', 'October to March.']
+
+
+def test_old_turns_are_folded_into_a_summary_within_budget(manager):
+    for index in range(10):
+        manager.record_turn('u1', 's1', f'question {index} ' + 'x' * 200, f'answer {index} ' + 'y' * 200)
+
+    history = asyncio.run(manager.get_history('u1', 's1', loader([])[0]))
+
+    assert history[0]['role'] == 'system'
+    assert history[0]['content'].startswith('Summary of the earlier conversation: User asked: question')
+    assert history[-2]['content'].startswith('question 9')
+    assert history[-1]['content'].startswith('answer 9')
+    context = manager._sessions[('u1', 's1')]
+    assert len(context.turns) == manager.min_recent_turns
+    assert sum(estimate_tokens(item) for item in context.summary_items) <= manager.token_budget // 3
+    assert manager.summarized_turns > 0
+
+
+def test_the_most_recent_turns_are_kept_even_over_budget(manager):
+    long_text = 'z' * 4000
+    manager.record_turn('u1', 's1', 'first', long_text)
+    manager.record_turn('u1', 's1', 'second', long_text)
+
+    history = asyncio.run(manager.get_history('u1', 's1', loader([])[0]))
+
+    assert [message['content'] for message in history if message['role'] == 'user'] == ['first', 'second']
+
+
+def test_least_recently_used_session_is_evicted(manager):
+    manager.record_turn('u1', 's1', 'a', 'b')
+    manager.record_turn('u1', 's2', 'c', 'd')
+    asyncio.run(manager.get_history('u1', 's1', loader([])[0]))
+    manager.record_turn('u1', 's3', 'e', 'f')
+
+    load_turns, calls = loader([])
+    assert asyncio.run(manager.get_history('u1', 's2', load_turns)) == []
+    assert calls == [manager.seed_turns]
+    assert manager.stats()['sessions'] == 2
+
+
+def test_forget_drops_the_session(manager):
+    manager.record_turn('u1', 's1', 'a', 'b')
+    manager.forget('u1', 's1')
+
+    load_turns, calls = loader([])
+    asyncio.run(manager.get_history('u1', 's1', load_turns))
+    assert len(calls) == 1
@@ -0,0 +1,89 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from services.dashboard_service import SellerDashboardSnapshots, month_range
+from tests.fakes import FakeCursor
+
+NOW = datetime(2026, 3, 14, 12, 0)
+MONTH_START = datetime(2026, 3, 1)
+
+
+def test_month_range_covers_the_calendar_month():
+    assert month_range(NOW) == (MONTH_START, datetime(2026, 4, 1))
+    assert month_range(datetime(2026, 12, 31, 23, 59)) == (datetime(2026, 12, 1), datetime(2027, 1, 1))
+
+
+def snapshot_row(**overrides):
+    row = {'period_start': MONTH_START, 'payload': json.dumps({'cached': True}), 'stale': 0, 'version': 3,
+           'refreshed_at': datetime(2026, 3, 14, 11, 58)}
+    row.update(overrides)
+    return row
+
+
+@pytest.mark.parametrize('row, fresh', [
+    (snapshot_row(), True),
+    (None, False),
+    (snapshot_row(stale=1), False),
+    (snapshot_row(period_start=datetime(2026, 2, 1)), False),
+    (snapshot_row(refreshed_at=datetime(2026, 3, 14, 11, 50)), False),
+])
+def test_freshness(row, fresh):
+    assert SellerDashboardSnapshots()._is_fresh(row, NOW) is fresh
+
+
+def database(snapshot):
+    def respond(sql, params):
+        if sql.startswith('SELECT NOW()'):
+            return [{'now': NOW}], 1
+        if sql.startswith('SELECT period_start'):
+            return ([snapshot] if snapshot else []), 1
+        if sql.startswith('SELECT eb.*') or sql.startswith('SELECT ho.*'):
+            return [], 0
+        return [{'count': Decimal('2'), 'total_revenue': Decimal('1500.50')}], 1
+
+    return FakeCursor(respond)
+
+
+def test_fresh_snapshot_is_served_without_rebuilding():
+    cur = database(snapshot_row())
+
+    assert asyncio.run(SellerDashboardSnapshots().get(cur, 's1')) == {'cached': True}
+    assert len(cur.executed) == 2
+
+
+def test_stale_snapshot_is_rebuilt_against_the_version_it_read():
+    cur = database(snapshot_row(stale=1, version=7))
+
+    payload = asyncio.run(SellerDashboardSnapshots().get(cur, 's1'))
+
+    assert payload['orders_stats']['total_revenue'] == 1500.5
+    assert payload['snapshot_at'] == NOW.isoformat()
+    (upsert, params), = [(sql, params) for sql, params in cur.executed if sql.startswith('INSERT')]
+    assert 'stale = IF(version = %s, 0, 1)' in upsert
+    assert params[0:2] == ('s1', MONTH_START)
+    assert json.loads(params[2]) == payload
+    assert params[3:] == (NOW, 7)
+
+
+def test_first_build_expects_version_zero():
+    cur = database(None)
+
+    asyncio.run(SellerDashboardSnapshots().get(cur, 's1'))
+
+    _, params = [(sql, params) for sql, params in cur.executed if sql.startswith('INSERT')][0]
+    assert params[-1] == 0
+
+
+def test_invalidate_marks_stale_and_bumps_the_version():
+    cur = FakeCursor()
+
+    asyncio.run(SellerDashboardSnapshots().invalidate(cur, 's1'))
+
+    (sql, params), = cur.executed
+    assert sql.endswith('ON DUPLICATE KEY UPDATE stale = 1, version = version + 1')
+    assert "VALUES (%s, '1970-01-01', '{}', 1, 1)" in sql
+    assert params == ('s1',)
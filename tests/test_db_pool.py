@@ -0,0 +1,90 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiomysql
+
+from services.db_pool import InstrumentedPool, LatencyHistogram
+
+
+def test_histogram_buckets_by_upper_bound():
+    histogram = LatencyHistogram([1, 10])
+    for elapsed_ms in (0.5, 1, 3, 10, 40):
+        histogram.observe(elapsed_ms)
+
+    stats = histogram.stats()
+
+    assert stats['buckets'] == {'<=1ms': 2, '<=10ms': 2, '>10ms': 1}
+    assert stats['count'] == 5
+    assert stats['avg_ms'] == 10.9
+    assert stats['max_ms'] == 40
+
+
+def test_empty_histogram_reports_zeroes():
+    assert LatencyHistogram([1]).stats() == {'count': 0, 'avg_ms': 0.0, 'max_ms': 0.0,
+                                             'buckets': {'<=1ms': 0, '>1ms': 0}}
+
+
+class FakeConnection:
+    def __init__(self, alive=True):
+        self.alive = alive
+        self.closed = False
+        self.last_usage = 0
+        self._reader = SimpleNamespace(at_eof=lambda: False, exception=lambda: None, eof_received=False)
+
+    async def ping(self, reconnect=True):
+        if not self.alive:
+            raise ConnectionResetError('gone away')
+
+    def close(self):
+        self.closed = True
+
+    def get_transaction_status(self):
+        return False
+
+
+def make_pool():
+    return InstrumentedPool(minsize=0, maxsize=5, echo=False, pool_recycle=-1, loop=asyncio.get_running_loop())
+
+
+def test_acquire_wait_and_hold_time_are_recorded(monkeypatch):
+    async def slow_acquire(pool):
+        await asyncio.sleep(0.01)
+        conn = FakeConnection()
+        pool._used.add(conn)
+        return conn
+
+    monkeypatch.setattr(aiomysql.Pool, '_acquire', slow_acquire)
+
+    async def main():
+        pool = make_pool()
+        conn = await pool._acquire()
+        in_use = pool.stats()['in_use']
+        await asyncio.sleep(0.02)
+        await pool.release(conn)
+        return pool, in_use
+
+    pool, in_use = asyncio.run(main())
+
+    stats = pool.stats()
+    assert in_use == 1
+    assert stats['acquire_wait']['count'] == 1 and stats['acquire_wait']['max_ms'] >= 10
+    assert stats['hold_time']['count'] == 1 and stats['hold_time']['max_ms'] >= 20
+    assert stats['idle'] == 1 and stats['waiters'] == 0
+
+
+def test_health_check_drops_dead_idle_connections():
+    healthy, dead = FakeConnection(), FakeConnection(alive=False)
+
+    async def main():
+        pool = make_pool()
+        pool._free.extend([healthy, dead])
+        failed = await pool.ping_idle()
+        return pool, failed
+
+    pool, failed = asyncio.run(main())
+
+    assert failed == 1
+    assert dead.closed and not healthy.closed
+    assert list(pool._free) == [healthy]
+    assert pool.stats()['ping_failures'] == 1
+    assert not pool._used
@@ -0,0 +1,137 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from hexbytes import HexBytes
+
+from services.blockchain_service import BlockchainEventIndexer
+from tests.fakes import FakePool
+
+BOOKING_ADDRESS = '0x' + '44' * 20
+CREATED_TOPIC = '0x' + 'aa' * 32
+VERIFIED_TOPIC = '0x' + 'bb' * 32
+
+
+class FakeChain:
+    def __init__(self, head=100):
+        self.head = head
+        self.logs = []
+        self.log_queries = []
+        self.contracts = {'booking': BOOKING_ADDRESS}
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(get_logs=self._get_logs))
+        self.w3.eth.block_number = head
+
+    def _get_logs(self, query):
+        self.log_queries.append(query)
+        return self.logs
+
+    async def _run_rpc(self, func, *args):
+        return func(*args)
+
+
+class FakeEvent:
+    """Decodes a raw test log into the event dict web3 would return"""
+
+    def __init__(self, name):
+        self.name = name
+
+    def process_log(self, log):
+        return {'event': self.name, 'args': log['args'], 'transactionHash': HexBytes(log['tx'])}
+
+
+def make_indexer(chain, respond=None):
+    indexer = BlockchainEventIndexer(chain)
+    indexer.db_pool = FakePool(respond)
+    indexer._event_map = lambda: {
+        (BOOKING_ADDRESS, CREATED_TOPIC): ('booking', FakeEvent('BookingCreated')),
+        (BOOKING_ADDRESS, VERIFIED_TOPIC): ('booking', FakeEvent('BookingVerified')),
+    }
+    return indexer
+
+
+def booking_log(topic, booking_hash, tx):
+    return {
+        'address': BOOKING_ADDRESS, 'topics': [HexBytes(topic)], 'blockNumber': 42,
+        'args': {'bookingHash': HexBytes(booking_hash)}, 'tx': tx
+    }
+
+
+def test_checkpoint_resumes_from_the_stored_block():
+    indexer = make_indexer(FakeChain(), lambda sql, params: ([{'last_block': 57}], 1))
+
+    assert asyncio.run(indexer._load_checkpoint()) == 57
+
+
+def test_first_run_starts_from_the_configured_block_or_the_safe_head():
+    empty = lambda sql, params: ([], 0)
+    indexer = make_indexer(FakeChain(head=100), empty)
+    indexer.confirmations = 3
+    assert asyncio.run(indexer._load_checkpoint()) == 97
+
+    indexer.start_block = '20'
+    assert asyncio.run(indexer._load_checkpoint()) == 19
+
+
+def test_range_applies_events_and_checkpoint_in_one_transaction():
+    chain = FakeChain()
+    chain.logs = [
+        booking_log(CREATED_TOPIC, '0x' + '01' * 32, '0x' + 'c1' * 32),
+        booking_log(VERIFIED_TOPIC, '0x' + '01' * 32, '0x' + 'c2' * 32),
+    ]
+    indexer = make_indexer(chain)
+
+    asyncio.run(indexer._index_range(10, 19))
+
+    query, = chain.log_queries
+    assert (query['fromBlock'], query['toBlock']) == (10, 19)
+    assert query['topics'] == [[CREATED_TOPIC, VERIFIED_TOPIC]]
+
+    executed = indexer.db_pool.executed
+    assert executed[0] == (
+        'UPDATE blockchain_bookings SET booking_hash = %s WHERE transaction_hash = %s',
+        ('01' * 32, 'c1' * 32)
+    )
+    assert executed[1][0].startswith('UPDATE blockchain_bookings SET verification_status')
+    assert executed[1][1] == ('verified', '01' * 32)
+    assert executed[2][0].startswith('INSERT INTO blockchain_sync_state')
+    assert executed[2][1] == ('tourism_contracts', 19)
+    events = indexer.db_pool.conn.events
+    assert events[0] == ('begin',) and events[-1] == ('commit',)
+
+
+def test_failed_range_rolls_back_and_keeps_the_checkpoint():
+    def respond(sql, params):
+        if sql.startswith('INSERT INTO blockchain_sync_state'):
+            return RuntimeError('lock wait timeout')
+        return [], 1
+
+    indexer = make_indexer(FakeChain(), respond)
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(indexer._index_range(10, 19))
+    assert indexer.db_pool.conn.events[-1] == ('rollback',)
+
+
+def test_run_catches_up_in_batches_and_halves_rejected_ranges():
+    chain = FakeChain(head=110)
+    indexer = make_indexer(chain)
+    indexer.confirmations = 0
+    indexer.batch_blocks = 8
+    indexer.last_block = 100
+    indexer.poll_interval = 0
+    indexed = []
+
+    async def index_range(from_block, to_block):
+        if to_block - from_block + 1 > 4:
+            raise ValueError('query returned more than 10000 results')
+        indexed.append((from_block, to_block))
+        if to_block == 110:
+            indexer.running = False
+
+    indexer._index_range = index_range
+    indexer.running = True
+    asyncio.run(indexer._run())
+
+    assert indexer.batch_blocks == 4
+    assert indexed == [(101, 104), (105, 108), (109, 110)]
+    assert indexer.last_block == 110
@@ -0,0 +1,110 @@
+import asyncio
+import json
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from services.export_service import stream_query
+
+ROWS = [
+    {'id': 'b1', 'total_price': Decimal('5000.00'), 'created_at': datetime(2026, 1, 2, 10, 0)},
+    {'id': 'b2', 'total_price': Decimal('750.50'), 'created_at': datetime(2026, 1, 3, 11, 30)},
+    {'id': 'b3, "suite"', 'total_price': Decimal('0'), 'created_at': datetime(2026, 1, 4, 12, 0)},
+]
+
+
+class StreamingCursor:
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.description = [(column,) for column in rows[0]]
+        self.executed = None
+        self.fetches = []
+        self.closed = False
+
+    async def execute(self, sql, params):
+        self.executed = (sql, params)
+
+    async def fetchmany(self, size):
+        chunk, self.rows = self.rows[:size], self.rows[size:]
+        self.fetches.append(size)
+        return chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class Connection:
+    def __init__(self, cursor):
+        self.cur = cursor
+        self.closed = False
+
+    async def cursor(self, cursor_class):
+        return self.cur
+
+    def close(self):
+        self.closed = True
+
+
+class Pool:
+    def __init__(self, rows):
+        self.conn = Connection(StreamingCursor(rows))
+        self.released = []
+
+    async def acquire(self):
+        return self.conn
+
+    def release(self, conn):
+        self.released.append(conn)
+
+
+def collect(pool, fmt):
+    async def main():
+        return [chunk async for chunk in stream_query(pool, 'SELECT * FROM bookings WHERE status = %s',
+                                                      ['pending'], fmt)]
+
+    return asyncio.run(main())
+
+
+@pytest.fixture(autouse=True)
+def small_chunks(monkeypatch):
+    monkeypatch.setenv('EXPORT_CHUNK_SIZE', '2')
+
+
+def test_ndjson_streams_one_line_per_row_in_chunks():
+    pool = Pool(ROWS)
+
+    chunks = collect(pool, 'ndjson')
+
+    assert len(chunks) == 2
+    lines = "".join(chunks).splitlines()
+    assert [json.loads(line)['id'] for line in lines] == ['b1', 'b2', 'b3, "suite"']
+    assert json.loads(lines[0])['total_price'] == '5000.00'
+    assert pool.conn.cur.executed == ('SELECT * FROM bookings WHERE status = %s', ['pending'])
+    assert pool.conn.cur.fetches == [2, 2, 2]
+    assert pool.conn.cur.closed and not pool.conn.closed
+    assert pool.released == [pool.conn]
+
+
+def test_csv_starts_with_a_header_and_quotes_values():
+    chunks = collect(Pool(ROWS), 'csv')
+
+    assert chunks[0] == 'id,total_price,created_at\r\n'
+    body = "".join(chunks[1:]).splitlines()
+    assert body[0] == 'b1,5000.00,2026-01-02 10:00:00'
+    assert body[2] == '"b3, ""suite""",0,2026-01-04 12:00:00'
+
+
+def test_abandoned_export_closes_the_connection_instead_of_draining_it():
+    pool = Pool(ROWS)
+
+    async def main():
+        stream = stream_query(pool, 'SELECT * FROM bookings', [], 'ndjson')
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(main())
+
+    assert pool.conn.closed
+    assert not pool.conn.cur.closed
+    assert pool.released == [pool.conn]
@@ -0,0 +1,91 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.blockchain_service import GasOracle
+
+GWEI = 10 ** 9
+
+
+class FakeChain:
+    def __init__(self, histories=None, legacy_price=None):
+        self.histories = list(histories or [])
+        self.legacy_price = legacy_price
+        self.rpc_calls = 0
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(chain_id=11155111, fee_history=self._fee_history,
+                                                      gas_price=legacy_price, block_number=500))
+
+    def _fee_history(self, blocks, newest, percentiles):
+        if not self.histories:
+            raise ValueError('the method eth_feeHistory does not exist')
+        return self.histories.pop(0)
+
+    async def _run_rpc(self, func, *args):
+        self.rpc_calls += 1
+        return func(*args)
+
+
+def history(oldest, base_fees, rewards):
+    return {'oldestBlock': oldest, 'baseFeePerGas': base_fees, 'reward': rewards}
+
+
+def test_snapshot_prices_the_next_block_at_the_configured_percentile(monkeypatch):
+    monkeypatch.setenv('BLOCKCHAIN_GAS_PERCENTILE', '75')
+    chain = FakeChain([history(10, [10 * GWEI, 12 * GWEI, 11 * GWEI], [[1, 2, 3], [3, 4, 9]])])
+    oracle = GasOracle(chain)
+
+    asyncio.run(oracle.refresh())
+
+    snapshot = oracle.snapshot()
+    assert snapshot['chain_id'] == 11155111
+    assert snapshot['latest_block'] == 11
+    assert snapshot['base_fee'] == 11 * GWEI
+    assert snapshot['priority_fees'] == {25: 2, 50: 3, 75: 6}
+    assert snapshot['gas_price'] == 11 * GWEI + 6
+    assert oracle.is_fresh and chain.rpc_calls == 1
+
+
+def test_window_keeps_only_the_most_recent_blocks(monkeypatch):
+    monkeypatch.setenv('BLOCKCHAIN_FEE_HISTORY_BLOCKS', '2')
+    chain = FakeChain([
+        history(1, [5, 5, 5], [[100, 100, 100], [100, 100, 100]]),
+        history(3, [5, 5, 5], [[1, 1, 1], [1, 1, 1]]),
+    ])
+    oracle = GasOracle(chain)
+
+    asyncio.run(oracle.refresh())
+    asyncio.run(oracle.refresh())
+
+    assert list(oracle._blocks) == [3, 4]
+    assert oracle.snapshot()['priority_fees'][50] == 1
+    assert oracle.snapshot()['window_blocks'] == 2
+
+
+def test_unknown_percentile_falls_back_to_the_median(monkeypatch):
+    monkeypatch.setenv('BLOCKCHAIN_GAS_PERCENTILE', '90')
+
+    assert GasOracle(FakeChain()).percentile == 50
+
+
+def test_pre_london_network_uses_the_legacy_gas_price():
+    oracle = GasOracle(FakeChain(legacy_price=7 * GWEI))
+
+    asyncio.run(oracle.refresh())
+
+    snapshot = oracle.snapshot()
+    assert snapshot['gas_price'] == 7 * GWEI
+    assert snapshot['base_fee'] is None
+    assert snapshot['latest_block'] == 500
+
+
+def test_snapshot_goes_stale_after_missed_refreshes(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr('services.blockchain_service.time.monotonic', lambda: clock[0])
+    oracle = GasOracle(FakeChain([history(1, [5, 5], [[1, 1, 1]])]))
+    assert not oracle.is_fresh
+
+    asyncio.run(oracle.refresh())
+    clock[0] += oracle.refresh_interval * 3
+    assert oracle.is_fresh
+
+    clock[0] += 1
+    assert not oracle.is_fresh
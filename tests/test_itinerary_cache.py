@@ -0,0 +1,129 @@
+import asyncio
+
+import pytest
+
+from services.itinerary_cache import ItineraryCache, itinerary_cache_key
+from tests.fakes import FakePool
+
+PREFERENCES = {
+    'destinations': ['Ranchi', 'Netarhat'], 'interests': ['waterfalls'],
+    'days': 3, 'budget': 15000, 'travel_style': 'Budget', 'group_size': 2
+}
+
+
+def make_generator(status='generated', delay=0):
+    calls = []
+
+    async def generate(preferences):
+        calls.append(preferences)
+        await asyncio.sleep(delay)
+        return {'destination': 'Ranchi', 'content': 'Day 1 ...', 'status': status}
+
+    return generate, calls
+
+
+def test_key_ignores_order_case_and_whitespace():
+    reordered = dict(PREFERENCES, destinations=[' netarhat', 'RANCHI'], travel_style='budget ',
+                     budget='15000.2')
+
+    assert itinerary_cache_key(reordered) == itinerary_cache_key(PREFERENCES)
+    assert itinerary_cache_key(dict(PREFERENCES, days=4)) != itinerary_cache_key(PREFERENCES)
+
+
+def test_second_request_is_served_from_memory_with_its_own_id():
+    cache = ItineraryCache()
+    generate, calls = make_generator()
+
+    async def main():
+        first = await cache.get_or_generate(PREFERENCES, generate)
+        second = await cache.get_or_generate(PREFERENCES, generate)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert (first['cached'], second['cached']) == (False, True)
+    assert first['id'] != second['id']
+    assert second['content'] == first['content']
+
+
+def test_concurrent_requests_share_one_generation():
+    cache = ItineraryCache()
+    generate, calls = make_generator(delay=0.01)
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_generate(PREFERENCES, generate) for _ in range(5)])
+
+    results = asyncio.run(main())
+
+    assert len(calls) == 1
+    assert cache.coalesced == 4
+    assert len({result['id'] for result in results}) == 5
+    assert cache.stats()['in_flight'] == 0
+
+
+def test_failed_generation_reaches_waiters_and_is_not_cached():
+    cache = ItineraryCache()
+    attempts = []
+
+    async def generate(preferences):
+        attempts.append(preferences)
+        await asyncio.sleep(0.01)
+        raise RuntimeError('provider down')
+
+    async def main():
+        return await asyncio.gather(*[cache.get_or_generate(PREFERENCES, generate) for _ in range(3)],
+                                    return_exceptions=True)
+
+    results = asyncio.run(main())
+
+    assert len(attempts) == 1
+    assert all(isinstance(result, RuntimeError) for result in results)
+    with pytest.raises(RuntimeError):
+        asyncio.run(cache.get_or_generate(PREFERENCES, generate))
+    assert len(attempts) == 2
+
+
+def test_fallback_itineraries_are_not_cached():
+    cache = ItineraryCache()
+    generate, calls = make_generator(status='fallback')
+
+    async def main():
+        await cache.get_or_generate(PREFERENCES, generate)
+        await cache.get_or_generate(PREFERENCES, generate)
+
+    asyncio.run(main())
+    assert len(calls) == 2
+
+
+def test_database_hit_skips_generation():
+    row = {'destination': 'Ranchi', 'days': 3, 'budget': 15000, 'content': 'Stored plan',
+           'generated_at': '2026-01-01T00:00:00'}
+    pool = FakePool(lambda sql, params: ([row], 1))
+    cache = ItineraryCache()
+    generate, calls = make_generator()
+
+    result = asyncio.run(cache.get_or_generate(PREFERENCES, generate, pool=pool))
+
+    assert calls == []
+    assert result['content'] == 'Stored plan' and result['cached'] is True
+    assert pool.executed[0][1] == (itinerary_cache_key(PREFERENCES), int(cache.ttl_seconds))
+    assert cache.db_hits == 1
+
+
+def test_prewarm_loads_the_most_requested_combinations(monkeypatch):
+    monkeypatch.setenv('ITINERARY_CACHE_PREWARM_TOP_N', '1')
+    other = dict(PREFERENCES, days=5)
+
+    def stored(preferences, content, age):
+        return {'destination': 'Ranchi', 'days': preferences['days'], 'budget': 15000, 'content': content,
+                'preferences': preferences, 'generated_at': '2026-01-01T00:00:00', 'age_seconds': age}
+
+    rows = [stored(PREFERENCES, 'newest', 10), stored(other, 'other', 20), stored(PREFERENCES, 'older', 30)]
+    cache = ItineraryCache()
+
+    warmed = asyncio.run(cache.prewarm(FakePool(lambda sql, params: (rows, len(rows)))))
+
+    assert warmed == 1
+    assert cache.memory.get(itinerary_cache_key(PREFERENCES))['content'] == 'newest'
+    assert cache.memory.get(itinerary_cache_key(other)) is None
@@ -0,0 +1,149 @@
+import asyncio
+
+import pytest
+
+from services.llm_guard import CircuitBreaker, LLMGuard, LLMUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr('services.llm_guard.time.monotonic', lambda: now[0])
+    return now
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker(failure_threshold=3, reset_seconds=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    breaker.record_failure()
+    assert breaker.state == 'closed' and breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert not breaker.allow()
+    assert breaker.stats()['times_opened'] == 1
+
+
+def test_breaker_lets_one_probe_through_after_the_reset_period(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=30)
+    breaker.record_failure()
+
+    clock[0] += 30
+    assert breaker.allow()
+    assert breaker.state == 'half_open'
+    assert not breaker.allow()
+
+    breaker.record_success()
+    assert breaker.state == 'closed' and breaker.allow()
+
+
+def test_failed_probe_reopens_the_breaker(clock):
+    breaker = CircuitBreaker(failure_threshold=5, reset_seconds=30)
+    for _ in range(5):
+        breaker.record_failure()
+    clock[0] += 31
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == 'open'
+    assert breaker.stats()['retry_in_seconds'] == 30
+    assert breaker.stats()['times_opened'] == 2
+
+
+def test_released_probe_lets_another_through(clock):
+    breaker = CircuitBreaker(failure_threshold=1, reset_seconds=0)
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.release_probe()
+
+    assert breaker.allow()
+
+
+@pytest.fixture
+def guard(monkeypatch):
+    monkeypatch.setenv('LLM_MAX_CONCURRENCY', '1')
+    monkeypatch.setenv('LLM_QUEUE_TIMEOUT_SECONDS', '0.01')
+    monkeypatch.setenv('LLM_CALL_TIMEOUT_SECONDS', '0.05')
+    monkeypatch.setenv('LLM_BREAKER_FAILURE_THRESHOLD', '2')
+    return LLMGuard()
+
+
+def test_call_returns_the_result_and_frees_the_slot(guard):
+    async def reply():
+        return 'namaste'
+
+    assert asyncio.run(guard.call('chat', reply)) == 'namaste'
+    stats = guard.stats()
+    assert (stats['calls'], stats['successes'], stats['in_flight']) == (1, 1, 0)
+
+
+def test_caller_without_a_free_slot_is_rejected(guard):
+    async def slow():
+        await asyncio.sleep(0.03)
+        return 'done'
+
+    async def main():
+        return await asyncio.gather(guard.call('chat', slow), guard.call('chat', slow), return_exceptions=True)
+
+    first, second = asyncio.run(main())
+
+    assert first == 'done'
+    assert isinstance(second, LLMUnavailable)
+    assert guard.rejected_no_slot == 1
+
+
+def test_timeouts_open_the_circuit_and_later_calls_fail_fast(guard):
+    async def hang():
+        await asyncio.sleep(1)
+
+    async def main():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await guard.call('chat', hang)
+        with pytest.raises(LLMUnavailable):
+            await guard.call('chat', hang)
+
+    asyncio.run(main())
+
+    assert guard.timeouts == 2
+    assert guard.rejected_circuit_open == 1
+    assert guard.stats()['circuit']['state'] == 'open'
+
+
+def test_stream_holds_the_slot_until_it_finishes(guard):
+    async def open_stream():
+        async def chunks():
+            for part in ('a', 'b'):
+                assert guard.in_flight == 1
+                yield part
+        return chunks()
+
+    async def main():
+        return [part async for part in guard.stream('chat_stream', open_stream)]
+
+    assert asyncio.run(main()) == ['a', 'b']
+    assert guard.in_flight == 0
+    assert guard.successes == 1
+
+
+def test_abandoned_stream_is_not_counted_as_a_failure(guard):
+    async def open_stream():
+        async def chunks():
+            for part in ('a', 'b', 'c'):
+                yield part
+        return chunks()
+
+    async def main():
+        stream = guard.stream('chat_stream', open_stream)
+        await stream.__anext__()
+        await stream.aclose()
+
+    asyncio.run(main())
+
+    assert (guard.failures, guard.successes, guard.in_flight) == (0, 0, 0)
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from services.marketplace_search import (
+    boolean_query, build_facets, invalidate_listing_counts, listing_counts, listing_total, price_bucket_sql,
+    search_condition
+)
+from tests.fakes import FakeCursor
+
+
+def test_words_become_required_prefix_terms():
+    assert boolean_query('hand wov') == '+hand* +wov*'
+
+
+@pytest.mark.parametrize('text', ['-dokra +"bell" (metal)*', 'dokra@bell~metal<>', "dokra') OR 1=1 -- bell metal"])
+def test_user_operators_are_stripped(text):
+    query = boolean_query(text)
+
+    assert '+dokra*' in query and '+bell*' in query and '+metal*' in query
+    assert not set(query) & set('-"()~<>@\')=')
+
+
+def test_words_too_short_for_the_index_are_dropped():
+    assert boolean_query('a an bamboo') == '+bamboo*'
+    assert boolean_query('of a') is None
+    assert boolean_query(None) is None
+
+
+def test_search_condition_uses_the_fulltext_index():
+    sql, params = search_condition('name, description, materials', 'sohrai painting')
+
+    assert sql == 'MATCH(name, description, materials) AGAINST (%s IN BOOLEAN MODE)'
+    assert params == ['+sohrai* +painting*']
+
+
+def test_short_input_falls_back_to_an_escaped_prefix_like():
+    sql, params = search_condition('name, description', ' 5%_')
+
+    assert sql == 'name LIKE %s'
+    assert params == ['5\\%\\_%']
+
+
+def test_price_buckets_cover_every_price():
+    sql = price_bucket_sql('price')
+
+    assert sql.startswith("CASE WHEN price < 500 THEN '0-500' WHEN price < 1000 THEN '500-1000'")
+    assert sql.endswith("ELSE '5000+' END")
+
+
+def test_price_facets_follow_the_selected_category():
+    rows = [
+        {'category': 'Dokra', 'price_bucket': '0-500', 'count': 3},
+        {'category': 'Dokra', 'price_bucket': '500-1000', 'count': 1},
+        {'category': 'Bamboo', 'price_bucket': '0-500', 'count': 2},
+    ]
+
+    facets = build_facets(rows, 'Dokra')
+
+    assert facets['category'] == {'Dokra': 4, 'Bamboo': 2}
+    assert facets['price'] == {'0-500': 3, '500-1000': 1}
+    assert build_facets(rows, None)['price'] == {'0-500': 5, '500-1000': 1}
+
+
+@pytest.fixture
+def empty_counts():
+    for cache in listing_counts.values():
+        cache.clear()
+
+
+def test_exact_totals_are_cached_until_the_table_changes(empty_counts):
+    cur = FakeCursor(lambda sql, params: ([{'total': 42}], 1))
+    from_where = "FROM handicrafts WHERE is_available = %s"
+
+    first = asyncio.run(listing_total(cur, 'handicrafts', from_where, [True], ('available',)))
+    second = asyncio.run(listing_total(cur, 'handicrafts', from_where, [True], ('available',)))
+    invalidate_listing_counts('handicrafts')
+    third = asyncio.run(listing_total(cur, 'handicrafts', from_where, [True], ('available',)))
+
+    assert first == second == third == 42
+    assert cur.statements() == ['SELECT COUNT(*) as total ' + from_where] * 2
+
+
+def test_estimated_totals_come_from_the_query_plan():
+    cur = FakeCursor(lambda sql, params: ([{'rows': 1200}], 1))
+
+    total = asyncio.run(listing_total(cur, 'cultural_events', 'FROM cultural_events WHERE is_active = 1', [],
+                                      ('active',), estimate=True))
+
+    assert total == 1200
+    assert cur.statements() == ['EXPLAIN SELECT 1 FROM cultural_events WHERE is_active = 1']
@@ -0,0 +1,99 @@
+import asyncio
+from types import SimpleNamespace
+
+from services.blockchain_service import NonceManager
+
+
+class FakeChain:
+    """Just enough of BlockchainService for NonceManager: transaction counts per block tag"""
+
+    def __init__(self, latest, pending):
+        self.counts = {'latest': latest, 'pending': pending}
+        self.rpc_calls = 0
+        self.w3 = SimpleNamespace(eth=SimpleNamespace(
+            get_transaction_count=lambda address, block: self.counts[block]
+        ))
+
+    async def _run_rpc(self, func, *args):
+        self.rpc_calls += 1
+        return func(*args)
+
+
+def test_concurrent_allocations_are_unique_and_read_the_node_once():
+    chain = FakeChain(latest=7, pending=7)
+    manager = NonceManager(chain, '0xabc')
+
+    async def main():
+        return await asyncio.gather(*[manager.allocate() for _ in range(20)])
+
+    assert sorted(asyncio.run(main())) == list(range(7, 27))
+    assert chain.rpc_calls == 1
+
+
+def test_released_nonce_is_reused_before_new_ones():
+    manager = NonceManager(FakeChain(latest=0, pending=0), '0xabc')
+
+    async def main():
+        first, second, third = [await manager.allocate() for _ in range(3)]
+        await manager.release(second)
+        return await manager.allocate(), await manager.allocate()
+
+    assert asyncio.run(main()) == (1, 3)
+
+
+def test_releasing_the_last_nonce_rewinds_the_counter():
+    manager = NonceManager(FakeChain(latest=5, pending=5), '0xabc')
+
+    async def main():
+        await manager.allocate()
+        last = await manager.allocate()
+        await manager.release(last)
+        return await manager.allocate()
+
+    assert asyncio.run(main()) == 6
+
+
+def test_resync_resets_when_nothing_is_pending():
+    chain = FakeChain(latest=3, pending=3)
+    manager = NonceManager(chain, '0xabc')
+
+    async def main():
+        for _ in range(4):
+            await manager.allocate()
+        # Our sends were dropped: the node never saw nonces 3..6
+        await manager.resync()
+        return await manager.allocate()
+
+    assert asyncio.run(main()) == 3
+
+
+def test_resync_keeps_local_counter_while_transactions_are_pending():
+    chain = FakeChain(latest=3, pending=3)
+    manager = NonceManager(chain, '0xabc')
+
+    async def main():
+        for _ in range(4):
+            await manager.allocate()
+        chain.counts['pending'] = 5
+        await manager.resync()
+        return await manager.allocate()
+
+    assert asyncio.run(main()) == 7
+
+
+def test_handle_failure_releases_or_resyncs_by_error():
+    chain = FakeChain(latest=0, pending=0)
+    manager = NonceManager(chain, '0xabc')
+
+    async def main():
+        await manager.allocate()
+        nonce = await manager.allocate()
+        await manager.handle_failure(nonce, RuntimeError('insufficient funds'))
+        released = await manager.allocate()
+        calls_before = chain.rpc_calls
+        await manager.handle_failure(released, RuntimeError('nonce too low'))
+        return released, chain.rpc_calls - calls_before
+
+    released, resync_calls = asyncio.run(main())
+    assert released == 1
+    assert resync_calls == 2
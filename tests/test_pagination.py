@@ -0,0 +1,92 @@
+from datetime import datetime
+from decimal import Decimal
+
+import pytest
+
+from services.pagination import (
+    decode_cursor, decode_keyset, encode_cursor, encode_keyset, keyset_after, keyset_condition,
+    keyset_page_of, page_of
+)
+
+CREATED_AT = datetime(2026, 3, 14, 9, 26, 53, 589793)
+
+
+def test_cursor_round_trips_and_is_url_safe():
+    cursor = encode_cursor(CREATED_AT, 'log-42')
+
+    assert decode_cursor(cursor) == (CREATED_AT, 'log-42')
+    assert '=' not in cursor and '+' not in cursor and '/' not in cursor
+
+
+@pytest.mark.parametrize('cursor', ['not-a-cursor', '', encode_cursor(CREATED_AT, 'x')[:-3]])
+def test_foreign_cursors_are_rejected(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_condition_pages_backwards_by_default():
+    sql, params = keyset_condition(encode_cursor(CREATED_AT, 'log-42'))
+
+    assert sql == " AND (created_at < %s OR (created_at = %s AND id < %s))"
+    assert params == [CREATED_AT, CREATED_AT, 'log-42']
+
+
+def test_condition_pages_forwards_and_is_empty_without_a_cursor():
+    sql, _ = keyset_condition(encode_cursor(CREATED_AT, 'log-42'), descending=False)
+
+    assert "created_at > %s" in sql and "id > %s" in sql
+    assert keyset_condition(None) == ("", [])
+
+
+def test_page_of_builds_the_next_cursor_from_the_last_row_kept():
+    rows = [{'id': f'log-{index}', 'created_at': datetime(2026, 3, index + 1)} for index in range(4)]
+
+    page, next_cursor = page_of(rows, 3)
+
+    assert [row['id'] for row in page] == ['log-0', 'log-1', 'log-2']
+    assert decode_cursor(next_cursor) == (datetime(2026, 3, 3), 'log-2')
+    assert page_of(rows, 4) == (rows, None)
+
+
+def test_keyset_round_trips_datetimes_and_decimals():
+    values = [True, Decimal('1499.50'), CREATED_AT, 'h-9']
+
+    assert decode_keyset(encode_keyset(values), 4) == values
+
+
+def test_keyset_of_the_wrong_width_is_rejected():
+    with pytest.raises(ValueError):
+        decode_keyset(encode_keyset([1, 'a']), 3)
+    with pytest.raises(ValueError):
+        decode_keyset('garbage', 1)
+
+
+def test_keyset_after_expands_mixed_directions():
+    columns = [('is_featured', 'DESC'), ('start_date', 'ASC'), ('id', 'ASC')]
+
+    sql, params = keyset_after(columns, encode_keyset([True, CREATED_AT, 'e-7']))
+
+    assert sql == (
+        " AND ((is_featured < %s)"
+        " OR (is_featured = %s AND start_date > %s)"
+        " OR (is_featured = %s AND start_date = %s AND id > %s))"
+    )
+    assert params == [True, True, CREATED_AT, True, CREATED_AT, 'e-7']
+    assert keyset_after(columns, None) == ("", [])
+
+
+def test_keyset_after_repeats_expression_params_for_each_use():
+    columns = [('MATCH(name) AGAINST (%s IN BOOLEAN MODE)', 'DESC', ['+dokra*']), ('id', 'ASC')]
+
+    _, params = keyset_after(columns, encode_keyset([2.5, 'h-1']))
+
+    assert params == ['+dokra*', 2.5, '+dokra*', 2.5, 'h-1']
+
+
+def test_keyset_page_of_uses_the_requested_fields():
+    rows = [{'id': f'h-{index}', 'is_featured': index == 0, 'created_at': CREATED_AT} for index in range(3)]
+
+    page, next_cursor = keyset_page_of(rows, 2, ['is_featured', 'created_at', 'id'])
+
+    assert len(page) == 2
+    assert decode_keyset(next_cursor, 3) == [False, CREATED_AT, 'h-1']
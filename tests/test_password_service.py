@@ -0,0 +1,100 @@
+import asyncio
+import threading
+
+import bcrypt
+import pytest
+
+from services import password_service
+from services.password_service import PasswordHasher, PasswordHasherBusy, hash_rounds
+from tests.fakes import FakeCursor
+
+
+@pytest.fixture
+def hasher(monkeypatch):
+    monkeypatch.setenv('BCRYPT_ROUNDS', '5')
+    monkeypatch.setenv('PASSWORD_HASH_EXECUTOR', 'thread')
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '2')
+    monkeypatch.setenv('PASSWORD_MAX_PENDING', '2')
+    hasher = PasswordHasher()
+    yield hasher
+    hasher.close()
+
+
+def test_hash_and_verify_round_trip(hasher):
+    async def main():
+        hashed = await hasher.hash('s3cret!')
+        return hashed, await hasher.verify('s3cret!', hashed), await hasher.verify('wrong', hashed)
+
+    hashed, good, bad = asyncio.run(main())
+
+    assert hash_rounds(hashed) == 5
+    assert (good, bad) == (True, False)
+    assert (hasher.hashed, hasher.verified) == (1, 2)
+
+
+def test_bcrypt_runs_on_the_worker_pool(hasher, monkeypatch):
+    threads = []
+
+    def record_thread(password, rounds):
+        threads.append(threading.current_thread().name)
+        return 'hashed'
+
+    monkeypatch.setattr(password_service, '_hash', record_thread)
+    asyncio.run(hasher.hash('s3cret!'))
+
+    assert threads[0].startswith('bcrypt')
+
+
+def test_process_pool_hashes_off_the_server_process(monkeypatch):
+    monkeypatch.setenv('BCRYPT_ROUNDS', '4')
+    monkeypatch.setenv('PASSWORD_HASH_WORKERS', '1')
+    hasher = PasswordHasher()
+    try:
+        hasher.start()
+        hashed = asyncio.run(hasher.hash('s3cret!'))
+    finally:
+        hasher.close()
+
+    assert bcrypt.checkpw(b's3cret!', hashed.encode())
+
+
+def test_operations_beyond_max_pending_are_refused(hasher, monkeypatch):
+    release = threading.Event()
+
+    def slow_verify(password, hashed):
+        release.wait(5)
+        return True
+
+    monkeypatch.setattr(password_service, '_verify', slow_verify)
+
+    async def main():
+        running = [asyncio.create_task(hasher.verify('pw', 'hash')) for _ in range(2)]
+        await asyncio.sleep(0.01)
+        assert hasher.saturated()
+        with pytest.raises(PasswordHasherBusy):
+            await hasher.verify('pw', 'hash')
+        release.set()
+        return await asyncio.gather(*running)
+
+    assert asyncio.run(main()) == [True, True]
+    assert hasher.rejected == 1
+    assert hasher.pending == 0
+
+
+def test_weaker_hashes_are_upgraded_in_place(hasher):
+    old_hash = bcrypt.hashpw(b's3cret!', bcrypt.gensalt(rounds=4)).decode()
+    cur = FakeCursor()
+
+    assert hasher.needs_rehash(old_hash)
+    assert asyncio.run(hasher.upgrade(cur, 'u1', 's3cret!', old_hash))
+
+    (sql, (new_hash, user_id, expected_old)), = cur.executed
+    assert sql == 'UPDATE users SET password = %s WHERE id = %s AND password = %s'
+    assert (user_id, expected_old) == ('u1', old_hash)
+    assert hash_rounds(new_hash) == 5 and not hasher.needs_rehash(new_hash)
+
+
+def test_non_bcrypt_values_are_left_alone(hasher):
+    assert hash_rounds('plaintext') is None
+    assert not hasher.needs_rehash('plaintext')
+    assert not asyncio.run(hasher.upgrade(FakeCursor(), 'u1', 'pw', 'plaintext'))
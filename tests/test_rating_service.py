@@ -0,0 +1,52 @@
+import asyncio
+
+from services.rating_service import RatingAggregates
+from tests.fakes import FakeCursor
+
+
+def test_review_bumps_destination_and_provider_counters():
+    cur = FakeCursor()
+
+    asyncio.run(RatingAggregates().record_review(cur, 'd1', 'p1', 4))
+
+    (destination_sql, destination_params), (provider_sql, provider_params) = cur.executed
+    assert destination_sql.startswith('UPDATE destinations SET rating_sum = rating_sum + %s')
+    assert 'rating = rating_sum / review_count' in destination_sql
+    assert destination_params == (4, 'd1')
+    assert provider_sql.startswith('UPDATE providers')
+    assert provider_params == (4, 'p1')
+
+
+def test_review_without_a_provider_only_touches_the_destination():
+    cur = FakeCursor()
+
+    asyncio.run(RatingAggregates().record_review(cur, 'd1', None, 5))
+
+    assert cur.statements('UPDATE providers') == []
+    assert len(cur.statements('UPDATE destinations')) == 1
+
+
+def test_reconcile_reports_repaired_rows_per_table():
+    repaired = {'destinations': 2, 'providers': 0}
+    cur = FakeCursor(lambda sql, params: ([], repaired[sql.split()[1]]))
+    aggregates = RatingAggregates()
+
+    assert asyncio.run(aggregates.reconcile(cur)) == repaired
+    assert aggregates.last_repaired == repaired
+    assert all('GROUP BY' in sql for sql in cur.statements())
+
+
+def test_schema_backfills_only_when_columns_are_added():
+    def existing_columns(sql, params):
+        if sql.startswith('ALTER TABLE'):
+            return Exception("(1060, \"Duplicate column name 'rating_sum'\")")
+        return [], 0
+
+    cur = FakeCursor(existing_columns)
+    asyncio.run(RatingAggregates().ensure_schema(cur))
+    assert cur.statements('UPDATE') == []
+
+    cur = FakeCursor()
+    asyncio.run(RatingAggregates().ensure_schema(cur))
+    assert len(cur.statements('ALTER TABLE')) == 4
+    assert len(cur.statements('UPDATE')) == 2
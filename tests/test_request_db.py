@@ -0,0 +1,105 @@
+import asyncio
+
+import pytest
+
+from services.request_db import RequestConnection
+from tests.fakes import FakeConnection
+
+
+class Pool:
+    def __init__(self):
+        self.acquired = []
+        self.released = []
+
+    async def acquire(self):
+        conn = FakeConnection()
+        self.acquired.append(conn)
+        return conn
+
+    def release(self, conn):
+        self.released.append(conn)
+
+
+@pytest.fixture
+def pool():
+    return Pool()
+
+
+def request_db(pool):
+    async def get_pool():
+        return pool
+
+    return RequestConnection(get_pool)
+
+
+def test_connection_is_taken_lazily_and_shared(pool):
+    db = request_db(pool)
+
+    async def main():
+        assert pool.acquired == []
+        async with db.acquire() as first:
+            pass
+        async with db.acquire() as second:
+            pass
+        await db.close(commit=True)
+        return first, second
+
+    first, second = asyncio.run(main())
+
+    assert first is second
+    assert pool.acquired == [first]
+    assert pool.released == [first]
+    assert first.events == []
+
+
+def test_unused_request_never_touches_the_pool(pool):
+    asyncio.run(request_db(pool).close(commit=True))
+
+    assert pool.acquired == [] and pool.released == []
+
+
+def test_transaction_begins_once_and_commits_on_success(pool):
+    db = request_db(pool)
+
+    async def main():
+        conn = await db.begin()
+        assert await db.begin() is conn
+        assert db.in_transaction
+        await db.close(commit=True)
+        return conn
+
+    conn = asyncio.run(main())
+
+    assert conn.events == [('begin',), ('commit',)]
+    assert not db.in_transaction
+
+
+def test_transaction_rolls_back_when_the_request_fails(pool):
+    db = request_db(pool)
+
+    async def main():
+        conn = await db.begin()
+        await db.close(commit=False)
+        return conn
+
+    assert asyncio.run(main()).events == [('begin',), ('rollback',)]
+    assert len(pool.released) == 1
+
+
+def test_release_hands_the_connection_back_and_a_later_acquire_takes_a_new_one(pool):
+    db = request_db(pool)
+
+    async def main():
+        await db.begin()
+        await db.release()
+        async with db.acquire() as conn:
+            pass
+        await db.close(commit=True)
+        return conn
+
+    later = asyncio.run(main())
+
+    first = pool.acquired[0]
+    assert first.events == [('begin',), ('commit',)]
+    assert later is not first
+    assert pool.released == [first, later]
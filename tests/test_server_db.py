@@ -0,0 +1,280 @@
+import os
+import asyncio
+
+import pytest
+from fastapi import HTTPException
+
+pytest.importorskip("emergentintegrations")
+
+# server builds its GeminiService at import time
+os.environ.setdefault("GEMINI_API_KEY", "test-key")
+
+import server
+from services.request_db import RequestConnection
+from tests.fakes import FakeConnection
+
+USER = {'id': 'u1', 'role': 'tourist', 'name': 'Asha'}
+
+
+class Pool:
+    def __init__(self, respond):
+        self.respond = respond
+        self.acquired = []
+        self.released = []
+
+    async def acquire(self):
+        conn = FakeConnection(self.respond)
+        self.acquired.append(conn)
+        return conn
+
+    def release(self, conn):
+        self.released.append(conn)
+
+
+@pytest.fixture
+def pool():
+    server.user_cache.clear()
+    yield Pool(lambda sql, params: ([dict(USER)] if params == ('u1',) else [], 1))
+    server.user_cache.clear()
+
+
+def request_db(pool):
+    async def get_pool():
+        return pool
+
+    return RequestConnection(get_pool)
+
+
+def test_user_lookup_returns_the_connection_before_the_handler_runs(pool):
+    user = asyncio.run(server.load_user('u1', request_db(pool)))
+
+    assert user['role'] == 'tourist'
+    assert pool.released == pool.acquired and len(pool.acquired) == 1
+
+
+def test_user_lookup_keeps_the_connection_inside_a_transaction(pool):
+    db = request_db(pool)
+
+    async def main():
+        await db.begin()
+        await server.load_user('u1', db)
+
+    asyncio.run(main())
+
+    assert pool.released == []
+    assert db.in_transaction
+
+
+def test_cached_user_skips_the_database(pool):
+    asyncio.run(server.load_user('u1', request_db(pool)))
+
+    asyncio.run(server.load_user('u1', request_db(pool)))
+
+    assert len(pool.acquired) == 1
+
+
+def test_unknown_user_is_rejected_after_releasing_the_connection(pool):
+    with pytest.raises(HTTPException) as raised:
+        asyncio.run(server.load_user('ghost', request_db(pool)))
+
+    assert raised.value.status_code == 401
+    assert pool.released == pool.acquired
+
+
+BOOKING_DETAILS = {'provider_name': 'Hill View Stay', 'provider_price': 2000,
+                   'destination_name': 'Netarhat', 'destination_price': 500}
+
+
+def booking_database(fail_on=None, loyalty_balance_exists=True):
+    def respond(sql, params):
+        if fail_on and sql.startswith(fail_on):
+            return RuntimeError(f'{fail_on} failed')
+        if sql.startswith('SELECT p.name'):
+            return [dict(BOOKING_DETAILS)], 1
+        if sql.startswith('SELECT id FROM loyalty_points'):
+            return ([{'id': 'lp1'}] if loyalty_balance_exists else []), 1
+        return [], 1
+
+    return Pool(respond)
+
+
+def book(pool, blockchain=True, price=5000):
+    booking = server.BookingCreate(
+        provider_id='p1', destination_id='d1', booking_date='2030-01-01', check_in='2030-01-10',
+        check_out='2030-01-12', guests=2, calculated_price=price, booking_full_name='Asha Oraon',
+        booking_email='asha@example.com', booking_phone='9000000000', blockchain_verification=blockchain
+    )
+    db = request_db(pool)
+
+    async def main():
+        await db.begin()
+        try:
+            response = await server.create_booking(booking, dict(USER), db)
+        except Exception:
+            await db.close(commit=False)
+            raise
+        await db.close(commit=True)
+        return response
+
+    return asyncio.run(main())
+
+
+def statements(pool):
+    return pool.acquired[0].cur.statements()
+
+
+def test_credit_updates_the_locked_balance_row_and_logs_the_award():
+    conn = FakeConnection(lambda sql, params: ([{'id': 'lp1'}], 1))
+
+    asyncio.run(server.credit_loyalty_points(conn.cur, 'u1', 50, 'Review bonus', 'b1'))
+
+    (lookup, lookup_params), (update, update_params), (log, log_params) = conn.cur.executed
+    assert lookup.endswith('FOR UPDATE') and lookup_params == ('u1',)
+    assert update.startswith('UPDATE loyalty_points SET points_balance = points_balance + %s')
+    assert update_params == (50, 50, 'lp1')
+    assert log.startswith('INSERT INTO loyalty_transactions')
+    assert log_params[1:] == ('u1', 50, 'b1', 'Review bonus')
+
+
+def test_credit_creates_the_balance_row_for_a_first_award():
+    conn = FakeConnection(lambda sql, params: ([], 0))
+
+    asyncio.run(server.credit_loyalty_points(conn.cur, 'u1', 50, 'Review bonus'))
+
+    insert, params = conn.cur.executed[1]
+    assert insert.startswith('INSERT INTO loyalty_points')
+    assert 'FROM users WHERE id = %s' in insert
+    assert params[1:3] == (50, 50) and params[-1] == 'u1'
+    assert conn.cur.statements('UPDATE') == []
+
+
+def test_zero_point_credit_writes_nothing():
+    conn = FakeConnection()
+
+    asyncio.run(server.credit_loyalty_points(conn.cur, 'u1', 0, 'Booking reward'))
+
+    assert conn.cur.executed == []
+
+
+def test_booking_commits_once_with_its_loyalty_reward():
+    pool = booking_database()
+
+    response = book(pool)
+
+    assert response['loyalty_points_awarded'] == 500
+    events = pool.acquired[0].events
+    assert [event for event in events if event[0] != 'execute'] == [('begin',), ('commit',)]
+    executed = statements(pool)
+    assert executed.index('SAVEPOINT loyalty_award') < executed.index(
+        next(sql for sql in executed if sql.startswith('INSERT INTO loyalty_transactions')))
+    assert not any(sql.startswith('ROLLBACK TO SAVEPOINT') for sql in executed)
+    assert len(pool.acquired) == len(pool.released) == 1
+
+
+def test_failed_loyalty_award_is_rolled_back_to_the_savepoint_only():
+    pool = booking_database(fail_on='INSERT INTO loyalty_transactions')
+
+    response = book(pool)
+
+    assert response['loyalty_points_awarded'] == 0
+    assert 'ROLLBACK TO SAVEPOINT loyalty_award' in statements(pool)
+    assert pool.acquired[0].events[-1] == ('commit',)
+
+
+def test_booking_under_ten_rupees_adds_no_balance_row():
+    pool = booking_database(loyalty_balance_exists=False)
+
+    response = book(pool, price=9)
+
+    assert response['loyalty_points_awarded'] == 0
+    assert not any('loyalty_points' in sql or 'loyalty_transactions' in sql for sql in statements(pool))
+    assert pool.acquired[0].events[-1] == ('commit',)
+
+
+def test_booking_without_blockchain_skips_the_reward():
+    pool = booking_database()
+
+    response = book(pool, blockchain=False)
+
+    assert response['loyalty_points_awarded'] == 0
+    assert not any('loyalty' in sql for sql in statements(pool))
+
+
+def test_failed_booking_write_rolls_everything_back():
+    pool = booking_database(fail_on='INSERT INTO bookings')
+
+    with pytest.raises(HTTPException) as raised:
+        book(pool)
+
+    assert raised.value.status_code == 500
+    assert pool.acquired[0].events[-1] == ('rollback',)
+
+
+def review_database(fail_on=None):
+    def respond(sql, params):
+        if fail_on and sql.startswith(fail_on):
+            return RuntimeError(f'{fail_on} failed')
+        if sql.startswith('SELECT * FROM bookings'):
+            return [{'id': 'b1', 'destination_id': 'd1', 'destination_name': 'Netarhat'}], 1
+        if sql.startswith('SELECT wallet_address'):
+            return [{'wallet_address': '0xuser'}], 1
+        if sql.startswith('SELECT id FROM loyalty_points'):
+            return [{'id': 'lp1'}], 1
+        return [], 1
+
+    return Pool(respond)
+
+
+def review(pool):
+    review_data = server.ReviewCreate(destination_id='d1', booking_id='b1', rating=5, comment='Lovely',
+                                      blockchain_verification=True)
+    claims = {'id': 'u1', 'role': 'tourist', 'provider_ids': []}
+    db = request_db(pool)
+
+    async def main():
+        await db.begin()
+        response = await server.create_review(review_data, claims, db)
+        await db.close(commit=True)
+        return response
+
+    return asyncio.run(main())
+
+
+def test_verified_review_records_and_rewards_inside_a_savepoint():
+    pool = review_database()
+
+    response = review(pool)
+
+    assert response['blockchain_verified'] is True
+    assert response['loyalty_bonus_awarded'] == 25
+    executed = statements(pool)
+    assert executed.index('SAVEPOINT blockchain_review') < next(
+        index for index, sql in enumerate(executed) if sql.startswith('INSERT INTO blockchain_reviews'))
+    assert 'ROLLBACK TO SAVEPOINT blockchain_review' not in executed
+
+
+def test_failed_review_award_is_rolled_back_to_the_savepoint():
+    pool = review_database(fail_on='INSERT INTO loyalty_transactions')
+
+    response = review(pool)
+
+    assert response['blockchain_verified'] is False
+    assert response['loyalty_bonus_awarded'] == 0
+    executed = statements(pool)
+    assert executed.index('ROLLBACK TO SAVEPOINT blockchain_review') > next(
+        index for index, sql in enumerate(executed) if sql.startswith('INSERT INTO blockchain_reviews'))
+    assert any(sql.startswith('INSERT INTO reviews') for sql in executed)
+    assert pool.acquired[0].events[-1] == ('commit',)
+
+
+def test_catalog_is_invalidated_only_after_the_review_commits(monkeypatch):
+    pool = review_database()
+    seen_at_invalidation = []
+    monkeypatch.setattr(server.destination_catalog, 'invalidate',
+                        lambda: seen_at_invalidation.append(list(pool.acquired[0].events)))
+
+    review(pool)
+
+    events, = seen_at_invalidation
+    assert events[-1] == ('commit',)
+    assert pool.released == pool.acquired
@@ -0,0 +1,113 @@
+import asyncio
+from decimal import Decimal
+
+import pytest
+
+from services.stats_service import AdminStatsService
+from tests.fakes import FakeConnection
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_booking_created_counts_revenue_only_when_paid():
+    conn = FakeConnection()
+    stats = AdminStatsService()
+
+    run(stats.record_booking_created(conn.cur, 500.0))
+    run(stats.record_booking_created(conn.cur, 800.0, status='paid'))
+
+    (_, pending), (_, paid) = conn.cur.executed
+    assert pending[1:] == (0, 0)
+    assert paid[1:] == (800.0, 1)
+
+
+@pytest.mark.parametrize('old_status,new_status,expected', [
+    ('pending', 'confirmed', None),
+    ('completed', 'paid', None),
+    ('pending', 'completed', (250.0, 1)),
+    ('paid', 'cancelled', (-250.0, -1)),
+])
+def test_status_change_moves_revenue_across_the_paid_boundary(old_status, new_status, expected):
+    conn = FakeConnection()
+    run(AdminStatsService().record_booking_status_change(conn.cur, None, Decimal('250'), old_status, new_status))
+
+    if expected is None:
+        assert conn.cur.executed == []
+    else:
+        (_, params), = conn.cur.executed
+        assert params[1:] == expected
+
+
+def test_rebuild_upserts_in_one_transaction():
+    conn = FakeConnection()
+    run(AdminStatsService().rebuild_rollups(conn.cur))
+
+    statements = conn.cur.statements()
+    assert not any(sql.startswith('DELETE') for sql in statements)
+    assert all('ON DUPLICATE KEY UPDATE' in sql for sql in statements if sql.startswith('INSERT'))
+    assert conn.events[0] == ('begin',)
+    assert conn.events[-1] == ('commit',)
+
+
+def test_rebuild_rolls_back_on_failure():
+    def respond(sql, params):
+        if 'FROM users' in sql:
+            return RuntimeError('lost connection')
+        return [], 1
+
+    conn = FakeConnection(respond)
+    with pytest.raises(RuntimeError):
+        run(AdminStatsService().rebuild_rollups(conn.cur))
+    assert conn.events[-1] == ('rollback',)
+
+
+def test_user_deleted_subtracts_bookings_and_registration():
+    conn = FakeConnection()
+    run(AdminStatsService().record_user_deleted(conn.cur, 'u1'))
+
+    (remove_sql, remove_params), (users_sql, users_params) = conn.cur.executed
+    assert 'WHERE user_id = %s' in remove_sql
+    assert '-COUNT(*)' in remove_sql
+    assert remove_params == ('u1',)
+    assert 'new_users = new_users - 1' in users_sql
+    assert users_params == ('u1',)
+
+
+def test_provider_deleted_subtracts_its_bookings():
+    conn = FakeConnection()
+    run(AdminStatsService().record_provider_deleted(conn.cur, 'p1'))
+
+    (sql, params), = conn.cur.executed
+    assert 'WHERE provider_id = %s' in sql
+    assert params == ('p1',)
+
+
+def test_get_stats_folds_status_rows_and_monthly_rollups():
+    def respond(sql, params):
+        if 'total_users' in sql:
+            return [{'total_users': 3, 'total_destinations': 2, 'total_providers': 4, 'active_providers': Decimal('3')}], 1
+        if 'GROUP BY status' in sql:
+            return [
+                {'status': 'pending', 'count': 2, 'priced': 2, 'revenue': Decimal('100')},
+                {'status': 'completed', 'count': 3, 'priced': 3, 'revenue': Decimal('900')},
+                {'status': 'paid', 'count': 1, 'priced': 1, 'revenue': Decimal('300')},
+            ], 3
+        if 'FROM monthly_stats' in sql:
+            return [
+                {'month': '2026-09', 'revenue': Decimal('0'), 'paid_bookings': 0, 'bookings': 2, 'new_users': 1},
+                {'month': '2026-10', 'revenue': Decimal('1200'), 'paid_bookings': 4, 'bookings': 4, 'new_users': 0},
+            ], 2
+        return [], 0
+
+    stats = run(AdminStatsService().get_stats(FakeConnection(respond).cur))
+
+    assert stats['active_providers'] == 3
+    assert stats['total_bookings'] == 6
+    assert stats['booking_by_status'] == {'pending': 2, 'completed': 3, 'paid': 1}
+    assert stats['total_revenue'] == 1200.0
+    assert stats['avg_booking_value'] == 300.0
+    assert stats['monthly_revenue'] == [{'month': '2026-10', 'revenue': 1200.0, 'bookings': 4}]
+    assert stats['user_growth'] == [{'month': '2026-09', 'new_users': 1}]
+    assert [m['month'] for m in stats['booking_growth']] == ['2026-09', '2026-10']
@@ -0,0 +1,243 @@
+import asyncio
+import json
+
+import pytest
+from hexbytes import HexBytes
+
+from services.blockchain_service import TransactionSubmissionQueue
+from tests.fakes import FakeConnection, FakePool
+
+
+class FakeService:
+    wallet_address = '0xservice'
+    contracts = {'booking': '0xbooking'}
+
+    def __init__(self, fail=None):
+        self.fail = fail
+        self.sent = []
+
+    def _award_points_call(self, user_wallet, points, booking_id):
+        return ('earnPoints', user_wallet, points)
+
+    async def get_dynamic_gas_limit(self, operation):
+        return 100000
+
+    async def get_dynamic_gas_price(self):
+        return 1
+
+    async def _transact(self, call, params):
+        if self.fail:
+            raise self.fail
+        self.sent.append(call)
+        return HexBytes('0x' + 'ab' * 32)
+
+
+def award_job(queue, cur, **overrides):
+    return asyncio.run(queue.create_job(
+        cur, 'award_points', record_id='tx1', user_id='u1',
+        call_args={'user_wallet': '0xuser', 'points': 10, 'booking_id': 'b1'},
+        context={'booking_id': 'b1', 'points': 10}
+    ))
+
+
+def test_create_job_records_a_queued_row():
+    conn = FakeConnection()
+    queue = TransactionSubmissionQueue(FakeService())
+    job = award_job(queue, conn.cur)
+
+    (sql, params), = conn.cur.executed
+    assert sql.startswith('INSERT INTO blockchain_jobs')
+    assert params[:4] == (job['job_id'], 'award_points', 'tx1', 'u1')
+    assert json.loads(params[4]) == {'user_wallet': '0xuser', 'points': 10, 'booking_id': 'b1'}
+    assert job['status'] == 'queued'
+
+
+def test_create_job_rejects_unknown_kinds_and_enqueue_needs_a_running_queue():
+    queue = TransactionSubmissionQueue(FakeService())
+    with pytest.raises(ValueError):
+        asyncio.run(queue.create_job(FakeConnection().cur, 'burn', 'r', 'u', {}))
+    with pytest.raises(RuntimeError):
+        queue.enqueue({'job_id': 'j'})
+
+
+def test_submit_claims_sends_and_writes_back_the_hash():
+    pool = FakePool()
+    service = FakeService()
+    queue = TransactionSubmissionQueue(service)
+    queue.db_pool = pool
+    job = award_job(queue, FakeConnection().cur)
+
+    async def main():
+        assert await queue._claim(job)
+        await queue._submit(job)
+
+    asyncio.run(main())
+
+    assert service.sent == [('earnPoints', '0xuser', 10)]
+    assert job['status'] == 'submitted'
+    assert queue._in_flight[job['transaction_hash']] is job
+    statements = pool.conn.cur.statements('UPDATE')
+    assert "status = 'submitting'" in statements[0]
+    assert statements[1].startswith('UPDATE blockchain_jobs SET status = %s')
+    assert statements[2] == 'UPDATE loyalty_transactions SET transaction_hash = %s WHERE id = %s'
+
+
+def test_job_claimed_elsewhere_is_not_sent():
+    pool = FakePool(lambda sql, params: ([], 0))
+    service = FakeService()
+    queue = TransactionSubmissionQueue(service)
+    queue.db_pool = pool
+    job = award_job(queue, FakeConnection().cur)
+
+    async def main():
+        queue._queue = asyncio.Queue()
+        queue.enqueue(job)
+        task = asyncio.create_task(queue._submit_loop())
+        await queue._queue.join()
+        task.cancel()
+
+    asyncio.run(main())
+    assert service.sent == []
+
+
+def test_failed_send_marks_the_record_failed():
+    pool = FakePool()
+    queue = TransactionSubmissionQueue(FakeService(fail=RuntimeError('insufficient funds')))
+    queue.db_pool = pool
+    job = award_job(queue, FakeConnection().cur)
+
+    asyncio.run(queue._submit(job))
+
+    assert job['status'] == 'failed'
+    assert job['error'] == 'insufficient funds'
+    assert any("blockchain_status = 'failed'" in sql for sql in pool.conn.cur.statements())
+
+
+def test_write_back_skips_the_record_when_the_job_was_already_settled():
+    pool = FakePool(lambda sql, params: ([], 0 if sql.startswith('UPDATE blockchain_jobs') else 1))
+    queue = TransactionSubmissionQueue(FakeService())
+    queue.db_pool = pool
+    job = award_job(queue, FakeConnection().cur)
+    job['transaction_hash'] = '0xhash'
+
+    asyncio.run(queue._write_back(job, 'confirmed'))
+
+    statements = pool.conn.cur.statements()
+    assert len(statements) == 1
+    assert not any('loyalty_points' in sql for sql in statements)
+    assert pool.conn.events[-1] == ('commit',)
+
+
+def test_confirmed_award_credits_the_balance_once():
+    pool = FakePool()
+    queue = TransactionSubmissionQueue(FakeService())
+    queue.db_pool = pool
+    job = award_job(queue, FakeConnection().cur)
+    job['transaction_hash'] = '0xhash'
+
+    asyncio.run(queue._write_back(job, 'confirmed'))
+
+    credits = [params for sql, params in pool.executed if sql.startswith('UPDATE loyalty_points')]
+    assert credits == [(10, 10, 'u1')]
+
+
+def test_recovery_requeues_fails_and_tracks_jobs_by_state():
+    def job_row(job_id, status, tx_hash=None):
+        return {
+            'job_id': job_id, 'kind': 'award_points', 'record_id': f'rec-{job_id}', 'user_id': 'u1',
+            'status': status, 'transaction_hash': tx_hash, 'error': None,
+            'call_args': json.dumps({'user_wallet': '0xuser', 'points': 5, 'booking_id': 'b1'}),
+            'context': json.dumps({'booking_id': 'b1', 'points': 5})
+        }
+
+    rows = [job_row('queued', 'queued'), job_row('cut', 'submitting'), job_row('sent', 'submitted', '0xsent')]
+
+    def respond(sql, params):
+        if sql.startswith('SELECT job_id'):
+            return rows, len(rows)
+        return [], 1
+
+    pool = FakePool(respond)
+    queue = TransactionSubmissionQueue(FakeService())
+    queue.db_pool = pool
+
+    async def main():
+        queue._queue = asyncio.Queue()
+        await queue._recover_jobs(startup=True)
+        return queue._queue.get_nowait()
+
+    requeued = asyncio.run(main())
+
+    assert requeued['job_id'] == 'queued'
+    assert requeued['call_args']['points'] == 5
+    assert list(queue._in_flight) == ['0xsent']
+    orphan_sweeps = [sql for sql in pool.conn.cur.statements('UPDATE') if 'NOT EXISTS' in sql]
+    assert len(orphan_sweeps) == 3
+    failed = [params for sql, params in pool.executed
+              if sql.startswith('UPDATE blockchain_jobs SET status = %s') and params[-1] == 'cut']
+    assert failed and failed[0][0] == 'failed'
+
+
+class RecordTables:
+    """Certificates, bookings and jobs the recovery sweep runs against
+
+    Each sweep UPDATE is applied to the rows its guards select: a join on a
+    failed job, a pending status and (for certificates) no mint yet.
+    """
+
+    STATUS_COLUMNS = {'certificates': 'mint_status', 'blockchain_bookings': 'transaction_status',
+                      'loyalty_transactions': 'blockchain_status'}
+
+    def __init__(self, rows, failed_jobs):
+        self.rows = rows
+        self.failed_jobs = failed_jobs
+
+    def __call__(self, sql, params):
+        if not sql.startswith('UPDATE') or sql.split()[1] not in self.STATUS_COLUMNS:
+            return [], 0
+        table = sql.split()[1]
+        column = self.STATUS_COLUMNS[table]
+        matched = [
+            row for row in self.rows[table]
+            if row[column] == 'pending'
+            and ('JOIN blockchain_jobs j' not in sql or row['id'] in self.failed_jobs)
+            and ('is_minted = FALSE' not in sql or not row.get('is_minted'))
+        ]
+        for row in matched:
+            row[column] = 'failed'
+        return [], len(matched)
+
+
+def test_sweep_leaves_historical_records_alone_and_fails_lost_jobs():
+    minted = {'id': 'cert-old', 'mint_status': 'pending', 'is_minted': True}
+    lost = {'id': 'cert-lost', 'mint_status': 'pending', 'is_minted': False}
+    verified = {'id': 'bb-old', 'transaction_status': 'pending', 'verification_status': 'verified'}
+    tables = RecordTables(
+        {'certificates': [minted, lost], 'blockchain_bookings': [verified], 'loyalty_transactions': []},
+        failed_jobs={'cert-lost'}
+    )
+    queue = TransactionSubmissionQueue(FakeService())
+    queue.db_pool = FakePool(tables)
+
+    async def main():
+        queue._queue = asyncio.Queue()
+        await queue._recover_jobs(startup=True)
+
+    asyncio.run(main())
+
+    assert minted['mint_status'] == 'pending'
+    assert verified['transaction_status'] == 'pending'
+    assert verified['verification_status'] == 'verified'
+    assert lost['mint_status'] == 'failed'
+
+
+def test_schema_backfills_statuses_of_historical_rows():
+    conn = FakeConnection()
+
+    asyncio.run(TransactionSubmissionQueue(FakeService()).ensure_schema(conn.cur))
+
+    updates = conn.cur.statements('UPDATE')
+    assert "UPDATE certificates SET mint_status = 'minted' WHERE is_minted = TRUE" in updates[0]
+    assert any("SET transaction_status = 'confirmed' WHERE verification_status IN ('verified', 'completed')" in sql
+               for sql in updates)
+    assert any("verification_status = 'failed' AND verified_at IS NOT NULL" in sql for sql in updates)
@@ -0,0 +1,74 @@
+import asyncio
+
+from services.token_service import TokenRevocations, load_provider_ids, token_claims
+from tests.fakes import FakeCursor
+
+
+def test_floors_are_loaded_from_the_revocations_table():
+    cur = FakeCursor(lambda sql, params: ([('u1', 3), ('u2', 1)], 2))
+    revocations = TokenRevocations()
+
+    asyncio.run(revocations.load(cur))
+
+    assert cur.statements() == ['SELECT user_id, min_version FROM token_revocations']
+    assert revocations.is_revoked('u1', 2)
+    assert not revocations.is_revoked('u1', 3)
+    assert not revocations.is_revoked('never-revoked', 0)
+    assert revocations.stats() == {'revoked_users': 2}
+
+
+def test_revoking_bumps_the_version_and_persists_the_floor():
+    def respond(sql, params):
+        if sql.startswith('SELECT token_version'):
+            return [{'token_version': 4}], 1
+        return [], 1
+
+    cur = FakeCursor(respond)
+    revocations = TokenRevocations()
+
+    asyncio.run(revocations.revoke_user(cur, 'u1'))
+
+    assert cur.executed[0] == ('UPDATE users SET token_version = token_version + 1 WHERE id = %s', ('u1',))
+    upsert, params = cur.executed[2]
+    assert upsert.startswith('INSERT INTO token_revocations')
+    assert 'GREATEST(min_version, VALUES(min_version))' in upsert
+    assert params == ('u1', 4)
+    assert revocations.is_revoked('u1', 3)
+    assert not revocations.is_revoked('u1', 4)
+
+
+def test_floor_never_moves_backwards():
+    revocations = TokenRevocations()
+    asyncio.run(revocations.load(FakeCursor(lambda sql, params: ([('u1', 9)], 1))))
+
+    cur = FakeCursor(lambda sql, params: ([(2,)], 1) if sql.startswith('SELECT') else ([], 1))
+    asyncio.run(revocations.revoke_user(cur, 'u1'))
+
+    assert revocations.is_revoked('u1', 8)
+
+
+def test_revoking_a_missing_user_records_nothing():
+    cur = FakeCursor(lambda sql, params: ([], 0))
+    revocations = TokenRevocations()
+
+    asyncio.run(revocations.revoke_user(cur, 'ghost'))
+
+    assert cur.statements('INSERT') == []
+    assert revocations.stats() == {'revoked_users': 0}
+
+
+def test_claims_carry_role_version_and_owned_providers():
+    provider = {'id': 'u1', 'role': 'provider', 'token_version': 2}
+
+    assert token_claims(provider, ['p1', 'p2']) == {'sub': 'u1', 'role': 'provider', 'ver': 2, 'pids': ['p1', 'p2']}
+    assert token_claims({'id': 'u2', 'role': 'tourist', 'token_version': None}) == {
+        'sub': 'u2', 'role': 'tourist', 'ver': 0
+    }
+
+
+def test_provider_ids_accept_dict_and_tuple_rows():
+    dict_rows = FakeCursor(lambda sql, params: ([{'id': 'p1'}], 1))
+    tuple_rows = FakeCursor(lambda sql, params: ([('p2',)], 1))
+
+    assert asyncio.run(load_provider_ids(dict_rows, 'u1')) == ['p1']
+    assert asyncio.run(load_provider_ids(tuple_rows, 'u1')) == ['p2']
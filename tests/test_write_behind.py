@@ -0,0 +1,104 @@
+import asyncio
+
+import aiomysql
+
+from services.write_behind import WriteBehindBuffer, is_transient_error
+from tests.fakes import FakePool
+
+SQL = "INSERT INTO chat_logs (id, message) VALUES (%s, %s)"
+
+
+class Database:
+    """FakePool responder: rows with id 'bad' are rejected, everything fails while down"""
+
+    def __init__(self):
+        self.down = False
+        self.rows = []
+
+    def __call__(self, sql, params):
+        if self.down:
+            return aiomysql.OperationalError(2013, 'Lost connection to MySQL server during query')
+        if params[0] == 'bad':
+            return aiomysql.DataError(1406, "Data too long for column 'message'")
+        self.rows.append(params)
+        return [], 1
+
+
+def make_buffer(batch_size=3, max_pending=100):
+    database = Database()
+    buffer = WriteBehindBuffer('chat_logs', SQL, batch_size=batch_size, flush_interval_ms=10,
+                               max_pending=max_pending)
+    buffer._db_pool = FakePool(database)
+    return buffer, database
+
+
+def test_error_classification():
+    assert is_transient_error(aiomysql.OperationalError(2006, 'MySQL server has gone away'))
+    assert is_transient_error(ConnectionResetError())
+    assert not is_transient_error(aiomysql.OperationalError(1054, "Unknown column"))
+    assert not is_transient_error(aiomysql.IntegrityError(1452, 'foreign key constraint fails'))
+
+
+def test_flush_writes_in_batches():
+    buffer, database = make_buffer(batch_size=3)
+    for index in range(7):
+        buffer.add((f'id{index}', 'hello'))
+
+    asyncio.run(buffer.flush())
+
+    assert [row[0] for row in database.rows] == [f'id{index}' for index in range(7)]
+    stats = buffer.stats()
+    assert (stats['pending'], stats['written'], stats['batches']) == (0, 7, 3)
+
+
+def test_transient_failure_keeps_rows_for_the_next_flush():
+    buffer, database = make_buffer()
+    for index in range(4):
+        buffer.add((f'id{index}', 'hello'))
+    database.down = True
+
+    asyncio.run(buffer.flush())
+    assert buffer.stats()['pending'] == 4
+    assert buffer.errors == 1
+
+    database.down = False
+    asyncio.run(buffer.flush())
+    assert [row[0] for row in database.rows] == ['id0', 'id1', 'id2', 'id3']
+
+
+def test_rejected_batch_drops_only_the_bad_row():
+    buffer, database = make_buffer(batch_size=3)
+    for row_id in ('id0', 'bad', 'id2', 'id3'):
+        buffer.add((row_id, 'hello'))
+
+    asyncio.run(buffer.flush())
+
+    assert {row[0] for row in database.rows} == {'id0', 'id2', 'id3'}
+    stats = buffer.stats()
+    assert (stats['pending'], stats['written'], stats['rejected']) == (0, 3, 1)
+
+
+def test_oldest_rows_are_dropped_beyond_max_pending():
+    buffer, _ = make_buffer(batch_size=100, max_pending=2)
+    for index in range(4):
+        buffer.add((f'id{index}', 'hello'))
+
+    assert [row[0] for row in buffer._pending] == ['id2', 'id3']
+    assert buffer.dropped == 2
+
+
+def test_background_flush_and_stop_write_everything():
+    buffer, database = make_buffer(batch_size=2)
+
+    async def main():
+        await buffer.start(buffer._db_pool)
+        buffer.add(('id0', 'a'))
+        buffer.add(('id1', 'b'))
+        await asyncio.sleep(0.05)
+        written_in_background = len(database.rows)
+        buffer.add(('id2', 'c'))
+        await buffer.stop()
+        return written_in_background
+
+    assert asyncio.run(main()) == 2
+    assert [row[0] for row in database.rows] == ['id0', 'id1', 'id2']